@@ -1,15 +1,65 @@
-import requests
+import asyncio
 import config
 import json
 import time
 from dotenv import load_dotenv
 
+import prompt_encoding
+from ai_client import AIClient
+
 load_dotenv()
 
 class AIAnalyst:
-    def __init__(self):
+    def __init__(self, cache=None):
         self.api_key = config.ASKSURF_API_KEY
-        self.url = "https://api.asksurf.ai/surf-ai/v1/chat/completions"
+        self.url = config.AI_API_URL
+        # Shared keep-alive pool for every AI call (see ai_client.py)
+        self.http = AIClient(self.url, self.api_key)
+        # Optional SignalCache: unchanged closed candles -> reuse the last decision
+        self.cache = cache
+        self.batch_stats = {'batches': 0, 'symbols': 0, 'fallbacks': 0}
+
+    def close(self):
+        self.http.close()
+        if self.cache:
+            self.cache.close()
+
+    def circuit(self):
+        """Circuit breaker state of the AI dependency (see ai_client.CircuitBreaker.snapshot)."""
+        return self.http.breaker.snapshot()
+
+    def _cached_signal(self, symbol, candles, last_exit):
+        """(cache key, cached signal or None); the key is None without a cache."""
+        if self.cache is None:
+            return None, None
+        key = self.cache.key(symbol, candles, last_exit)
+        signal = self.cache.get(key)
+        if signal is not None:
+            print(f"♻️ {symbol}: reusing cached AI signal (hit rate {self.cache.hit_rate():.0%})")
+        return key, signal
+
+    def _remember(self, key, symbol, signal):
+        if key and signal:
+            self.cache.put(key, symbol, signal)
+        return signal
+
+    @staticmethod
+    def _payload(system, user):
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": system
+                },
+                {
+                    "role": "user",
+                    "content": user
+                }
+            ],
+            "model": "surf-ask",
+            "stream": False,
+            "response_format": {"type": "json_object"} 
+        }
 
     def evaluate_stale_position(self, symbol, current_pnl_pct, hours_held, candles):
         """
@@ -24,110 +74,146 @@ class AIAnalyst:
             f"Output JSON: {{\"action\": \"CLOSE\"}} or {{\"action\": \"HOLD\"}}, with reasoning.\n\n"
         )
         # Add Candle Data
-        prompt += self._create_prompt(candles, None)
+        prompt += self._create_prompt(symbol, candles, None)
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a Risk Manager AI. Your job is to cut dead money. If a trend is dead or reversing against us, CLOSE it. Output valid JSON: {\"action\": \"CLOSE\"/\"HOLD\", \"reasoning\": \"...\"}"
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "model": "surf-ask",
-            "stream": False,
-            "response_format": {"type": "json_object"} 
-        }
+        content = self.http.post_sync(self._payload(
+            "You are a Risk Manager AI. Your job is to cut dead money. If a trend is dead or reversing against us, CLOSE it. Output valid JSON: {\"action\": \"CLOSE\"/\"HOLD\", \"reasoning\": \"...\"}",
+            prompt))
+        if content is None:
+            return "HOLD"
+        try:
+            if "```json" in content:
+                content = content.split("```json")[1].split("```")[0]
+            data = json.loads(content.strip())
+            return data.get("action", "HOLD").upper()
+        except Exception:
+            return "HOLD"
+
+    def _market_payload(self, symbol, candles, indicators=None, last_exit=None):
+        if config.AI_PROMPT_COMPACT:
+            # Static system prefix (legend + instructions), only the encoded data varies per call
+            return self._payload(prompt_encoding.market_system_prompt(),
+                                 prompt_encoding.encode_symbol(symbol, candles, indicators, last_exit))
 
-        # Reuse Simple Retry Logic
-        for attempt in range(3):
-            try:
-                response = requests.post(self.url, headers=headers, json=payload, timeout=20)
-                if response.status_code == 200:
-                    try:
-                        res = response.json()
-                        content = res['choices'][0]['message']['content']
-                        if "```json" in content:
-                            content = content.split("```json")[1].split("```")[0]
-                        data = json.loads(content.strip())
-                        return data.get("action", "HOLD").upper()
-                    except:
-                        return "HOLD"
-            except:
-                time.sleep(1)
-        return "HOLD"
+        prompt = self._create_prompt(symbol, candles, indicators, last_exit)
+        return self._payload(
+            "You are a trading bot backend. You MUST output ONLY valid JSON. Do not use Markdown, tables, or bold text. Format: {\"action\": \"BUY/SELL/HOLD\", \"confidence\": 0.8, \"entry_price\": 0.0, \"stop_loss\": 0.0, \"take_profit\": 0.0, \"reasoning\": \"string\"}",
+            prompt)
+
+    @staticmethod
+    def _market_signal(content):
+        """Signal dict (as consumed by Execution.validate_signal) from the message content, None if unusable."""
+        if content is None:
+            return None # ai_client already logged why
+        try:
+            # parsing logic...
+            if "```json" in content:
+                content = content.split("```json")[1].split("```")[0]
+            elif "```" in content:
+                content = content.split("```")[1].split("```")[0]
+            return json.loads(content.strip())
+        except Exception as e:
+            print(f"⚠️ Error parsing AI response: {e}")
+            print(f"   Raw Content: {content[:200]}...") # Debug raw
+            return None
 
     def analyze_market(self, symbol, candles, indicators=None, last_exit=None):
         """
         Sends market data to Surf AI and returns a trading signal.
         """
-        prompt = self._create_prompt(symbol, candles, indicators, last_exit)
-        
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a trading bot backend. You MUST output ONLY valid JSON. Do not use Markdown, tables, or bold text. Format: {\"action\": \"BUY/SELL/HOLD\", \"confidence\": 0.8, \"entry_price\": 0.0, \"stop_loss\": 0.0, \"take_profit\": 0.0, \"reasoning\": \"string\"}"
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "model": "surf-ask",
-            "stream": False,
-            "response_format": {"type": "json_object"} 
-        }
+        key, signal = self._cached_signal(symbol, candles, last_exit)
+        if signal is not None:
+            return signal
+        signal = self._market_signal(self.http.post_sync(self._market_payload(symbol, candles, indicators, last_exit)))
+        return self._remember(key, symbol, signal)
 
-        # Retry Logic (Backoff)
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(self.url, headers=headers, json=payload, timeout=20)
-                
-                if response.status_code == 200:
-                    try:
-                        result = response.json()
-                        content = result['choices'][0]['message']['content']
-                        # parsing logic...
-                        if "```json" in content:
-                            content = content.split("```json")[1].split("```")[0]
-                        elif "```" in content:
-                            content = content.split("```")[1].split("```")[0]
-                        return json.loads(content.strip())
-                    except Exception as e:
-                        print(f"⚠️ Error parsing AI response: {e}")
-                        print(f"   Raw Content: {content[:200]}...") # Debug raw
-                        return None
-                        
-                elif response.status_code in [429, 500, 502, 503, 504]:
-                    wait_time = 2 ** (attempt + 1) # 2s, 4s, 8s
-                    print(f"⚠️ AI Server Error ({response.status_code}). Retrying in {wait_time}s... (Attempt {attempt+1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    print(f"❌ AI Request failed: {response.status_code} - {response.text}")
-                    return None
-                    
-            except Exception as e:
-                print(f"❌ AI Connection Error: {e}")
-                time.sleep(2)
-        
-        print("❌ AI Analysis failed after retries.")
-        return None
+    async def analyze_market_async(self, symbol, candles, indicators=None, last_exit=None, timeout=None):
+        """
+        Non-blocking analyze_market: awaits the pooled client instead of holding a thread.
+        `timeout` caps this call below AI_DEADLINE (the engine's per-pass AI budget).
+        """
+        key, signal = self._cached_signal(symbol, candles, last_exit)
+        if signal is not None:
+            return signal
+        signal = self._market_signal(await self.http.post(self._market_payload(symbol, candles, indicators, last_exit), timeout))
+        return self._remember(key, symbol, signal)
+
+    # --- Batch mode: several symbols per chat completion ---
+
+    def _batch_payload(self, items):
+        blocks = "\n\n".join(
+            prompt_encoding.encode_symbol(i['symbol'], i['candles'], i.get('indicators'), i.get('last_exit'),
+                                          rows=config.AI_BATCH_CANDLES)
+            for i in items)
+        return self._payload(prompt_encoding.batch_system_prompt(),
+                             f"Analyze each of the following {len(items)} symbols.\n\n{blocks}")
+
+    @staticmethod
+    def _batch_signals(content, symbols):
+        """{symbol: signal} for every well-formed entry of a batched answer (same dict shape as analyze_market)."""
+        parsed = AIAnalyst._market_signal(content) if content else None
+        entries = parsed.get('signals') if isinstance(parsed, dict) else parsed
+        signals = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            signal = dict(entry)
+            symbol = signal.pop('symbol', None)
+            if symbol in symbols and str(signal.get('action', '')).upper() in ("BUY", "SELL", "HOLD"):
+                signals[symbol] = signal
+        return signals
+
+    async def analyze_batch_async(self, items, timeout=None):
+        """
+        Batched analyze_market_async. items: [{'symbol', 'candles', 'indicators', 'last_exit'}].
+        Uncached symbols go out AI_BATCH_SIZE per request; any symbol whose entry is
+        missing or malformed falls back to its own per-symbol call.
+        `timeout` bounds the whole batch, fallbacks included. Returns {symbol: signal or None}.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def left():
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        results, pending = {}, []
+        for item in items:
+            key, signal = self._cached_signal(item['symbol'], item['candles'], item.get('last_exit'))
+            if signal is not None:
+                results[item['symbol']] = signal
+            else:
+                pending.append((key, item))
+
+        async def ask_batch(chunk):
+            symbols = {item['symbol'] for _, item in chunk}
+            signals = self._batch_signals(await self.http.post(self._batch_payload([i for _, i in chunk]), left()), symbols)
+            self.batch_stats['batches'] += 1
+            self.batch_stats['symbols'] += len(chunk)
+            return signals
+
+        async def ask_one(key, item):
+            self.batch_stats['fallbacks'] += 1
+            signal = self._market_signal(await self.http.post(self._market_payload(
+                item['symbol'], item['candles'], item.get('indicators'), item.get('last_exit')), left()))
+            return self._remember(key, item['symbol'], signal)
+
+        size = max(1, config.AI_BATCH_SIZE)
+        chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+        answered = {}
+        for signals in await asyncio.gather(*(ask_batch(chunk) for chunk in chunks)):
+            answered.update(signals)
+
+        missing = []
+        for key, item in pending:
+            signal = answered.get(item['symbol'])
+            if signal is None:
+                missing.append((key, item))
+            else:
+                results[item['symbol']] = self._remember(key, item['symbol'], signal)
+        if missing:
+            print(f"⚠️ Batched AI answer incomplete for {len(missing)} symbols; asking them one by one.")
+            for (key, item), signal in zip(missing, await asyncio.gather(*(ask_one(k, i) for k, i in missing))):
+                results[item['symbol']] = signal
+        return results
 
     def _create_prompt(self, symbol, candles, indicators, last_exit=None):
         data_str = "Timestamp | Open | High | Low | Close | Volume\n"
@@ -146,6 +232,14 @@ class AIAnalyst:
                 f"- MA{config.MA_LONG}: {indicators.get('MA_LONG')}\n"
                 f"- Current Price: {indicators.get('current_price')}\n"
             )
+            if indicators.get('RSI') is not None:
+                ma_context += (
+                    f"- RSI{config.RSI_PERIOD}: {indicators.get('RSI'):.2f}\n"
+                    f"- ATR{config.ATR_PERIOD}: {indicators.get('ATR')}\n"
+                    f"- Bollinger({config.BB_PERIOD}): {indicators.get('BB_LOWER')} / {indicators.get('BB_MIDDLE')} / {indicators.get('BB_UPPER')}\n"
+                    f"- VWAP: {indicators.get('VWAP')}\n"
+                    f"- Volume Z-Score: {indicators.get('VOLUME_Z')}\n"
+                )
 
         exit_context = ""
         if last_exit:
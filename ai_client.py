@@ -0,0 +1,243 @@
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import deque
+
+import aiohttp
+
+import config
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for the AI dependency.
+
+    Every HTTP attempt is recorded as (healthy, latency) in a window of the
+    last AI_BREAKER_WINDOW attempts. Once it holds AI_BREAKER_MIN_SAMPLES, the
+    breaker OPENs when the error rate reaches AI_BREAKER_ERROR_RATE or the p95
+    latency exceeds AI_BREAKER_P95. While OPEN every call is refused at once.
+    After AI_BREAKER_COOLDOWN seconds it goes HALF_OPEN and lets a single
+    probe through: a fast healthy probe closes it, anything else re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "CLOSED", "OPEN", "HALF_OPEN"
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=config.AI_BREAKER_WINDOW) # (healthy, latency seconds)
+        self.state = self.CLOSED
+        self.reason = ""
+        self.since = time.time()  # wall time of the last state change (shown by /status)
+        self._opened_at = 0.0
+        self._probe_at = None     # monotonic time the half-open probe was let through
+        self.stats = {'opened': 0, 'rejected': 0}
+
+    def _set(self, state, reason=""):
+        self.state, self.reason, self.since = state, reason, time.time()
+
+    def _open(self, reason):
+        self._set(self.OPEN, reason)
+        self._opened_at = self._clock()
+        self._probe_at = None
+        self.stats['opened'] += 1
+        print(f"🔴 AI circuit OPEN: {reason}. Skipping AI calls for {config.AI_BREAKER_COOLDOWN}s.")
+
+    def allow(self):
+        with self._lock:
+            now = self._clock()
+            if self.state == self.OPEN and now - self._opened_at >= config.AI_BREAKER_COOLDOWN:
+                self._set(self.HALF_OPEN, "probing")
+            if self.state == self.HALF_OPEN:
+                # One probe at a time (a lost probe is replaced after one request timeout)
+                if self._probe_at is None or now - self._probe_at > config.AI_REQUEST_TIMEOUT:
+                    self._probe_at = now
+                    return True
+            if self.state == self.CLOSED:
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record(self, healthy, latency):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_at = None
+                if healthy and latency <= config.AI_BREAKER_P95:
+                    self._samples.clear()
+                    self._set(self.CLOSED)
+                    print("🟢 AI circuit CLOSED: probe succeeded.")
+                else:
+                    self._open("half-open probe failed")
+                return
+            if self.state == self.OPEN:
+                return # Late result of a call let through before opening
+            self._samples.append((healthy, latency))
+            if len(self._samples) < config.AI_BREAKER_MIN_SAMPLES:
+                return
+            error_rate, p95 = self._error_rate(), self._p95()
+            if error_rate >= config.AI_BREAKER_ERROR_RATE:
+                self._open(f"error rate {error_rate:.0%}")
+            elif p95 > config.AI_BREAKER_P95:
+                self._open(f"p95 latency {p95:.1f}s")
+
+    def _error_rate(self):
+        return sum(1 for healthy, _ in self._samples if not healthy) / len(self._samples) if self._samples else 0.0
+
+    def _p95(self):
+        latencies = sorted(latency for _, latency in self._samples)
+        return latencies[max(0, math.ceil(0.95 * len(latencies)) - 1)] if latencies else 0.0
+
+    def snapshot(self):
+        """JSON-serialisable state for the engine and Telegram /status."""
+        with self._lock:
+            if self.state == self.OPEN and self._clock() - self._opened_at >= config.AI_BREAKER_COOLDOWN:
+                self._set(self.HALF_OPEN, "probing")
+            return {'state': self.state, 'reason': self.reason, 'since': self.since,
+                    'error_rate': round(self._error_rate(), 3), 'p95': round(self._p95(), 3),
+                    'samples': len(self._samples)}
+
+
+class AIClient:
+    """
+    Pooled async HTTP client for the Surf AI chat completions endpoint.
+
+    One aiohttp session (keep-alive connection pool) lives on a private event
+    loop thread, so coroutines on the engine loop and blocking callers in
+    worker threads share the same warm TLS connections. At most
+    AI_MAX_CONCURRENCY requests are in flight. Each call has an overall
+    AI_DEADLINE covering its retries; retries use jittered exponential backoff
+    with asyncio.sleep, so nothing blocks while waiting.
+    """
+
+    def __init__(self, url, api_key, max_concurrency=None):
+        self.url = url
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency or config.AI_MAX_CONCURRENCY
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._sem = None
+        # Mutated only on the client loop thread
+        self.stats = {'requests': 0, 'ok': 0, 'retries': 0, 'failed': 0, 'deadline_exceeded': 0,
+                      'short_circuited': 0, 'latency_total': 0.0, 'latency_max': 0.0}
+        self.breaker = CircuitBreaker()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="ai-http", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=config.AI_KEEPALIVE)
+            self._session = aiohttp.ClientSession(connector=connector, headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            })
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    def _record(self, started, ok):
+        latency = time.monotonic() - started
+        self.stats['ok' if ok else 'failed'] += 1
+        self.stats['latency_total'] += latency
+        self.stats['latency_max'] = max(self.stats['latency_max'], latency)
+
+    async def _request(self, payload, deadline):
+        """Message content of the first choice, or None once retries / the deadline are exhausted."""
+        session = self._get_session()
+        started = time.monotonic()
+        self.stats['requests'] += 1
+        expired = False
+        for attempt in range(1, config.AI_MAX_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                expired = True
+                break
+            if not self.breaker.allow():
+                self.stats['short_circuited'] += 1
+                print(f"⛔ AI circuit {self.breaker.state}: call skipped ({self.breaker.reason}).")
+                return None
+            try:
+                async with self._sem:
+                    timeout = aiohttp.ClientTimeout(total=min(config.AI_REQUEST_TIMEOUT, remaining))
+                    sent, healthy = time.monotonic(), False
+                    try:
+                        async with session.post(self.url, json=payload, timeout=timeout) as response:
+                            # Any answer but a retryable status means the service itself is up
+                            healthy = response.status not in RETRY_STATUSES
+                            if response.status == 200:
+                                result = await response.json(content_type=None)
+                                self._record(started, True)
+                                return result['choices'][0]['message']['content']
+                            if healthy:
+                                text = await response.text()
+                                print(f"❌ AI Request failed: {response.status} - {text[:200]}")
+                                self._record(started, False)
+                                return None
+                            reason = f"AI Server Error ({response.status})"
+                    finally:
+                        self.breaker.record(healthy, time.monotonic() - sent)
+            except asyncio.TimeoutError:
+                reason = "AI request timed out"
+            except aiohttp.ClientError as e:
+                reason = f"AI Connection Error: {e}"
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                print(f"⚠️ Malformed AI response: {e}")
+                self._record(started, False)
+                return None
+
+            if attempt == config.AI_MAX_RETRIES:
+                break
+            # Full jitter: spreads retries from concurrent callers instead of synchronising them
+            delay = random.uniform(0, min(config.AI_BACKOFF_MAX, config.AI_BACKOFF_BASE * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                expired = True
+                break
+            print(f"⚠️ {reason}. Retrying in {delay:.1f}s... (Attempt {attempt}/{config.AI_MAX_RETRIES})")
+            self.stats['retries'] += 1
+            await asyncio.sleep(delay)
+
+        if expired:
+            self.stats['deadline_exceeded'] += 1
+            print("❌ AI request exceeded its deadline.")
+        else:
+            print("❌ AI request failed after retries.")
+        self._record(started, False)
+        return None
+
+    def submit(self, payload, timeout=None):
+        """
+        Schedules the request on the client loop; returns a concurrent.futures.Future with the content.
+        `timeout` (default AI_DEADLINE) bounds the whole call, retries included.
+        """
+        deadline = time.monotonic() + (config.AI_DEADLINE if timeout is None else timeout)
+        return asyncio.run_coroutine_threadsafe(self._request(payload, deadline), self._ensure_loop())
+
+    async def post(self, payload, timeout=None):
+        """Awaitable from any event loop."""
+        return await asyncio.wrap_future(self.submit(payload, timeout))
+
+    def post_sync(self, payload, timeout=None):
+        """Blocking variant for callers running in worker threads."""
+        return self.submit(payload, timeout).result()
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(timeout=5)
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=5)
+        loop.close()
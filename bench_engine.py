@@ -0,0 +1,149 @@
+"""
+Benchmark: tick latency of the asyncio TradingEngine vs the old serial run_bot() loop.
+
+Uses fake Orderly / AI / DB objects with fixed simulated latencies, so it runs offline.
+Usage: python bench_engine.py
+"""
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+import config
+import indicators
+from engine import TradingEngine
+
+REST_LATENCY = 0.03   # Orderly REST round-trip (s)
+AI_LATENCY = 0.40     # Surf AI round-trip (s)
+DB_LATENCY = 0.002    # psycopg2 round-trip (s)
+HELD = ["PERP_ETH_USDC", "PERP_BTC_USDC", "PERP_SOL_USDC"]
+
+
+class FakeMarketData:
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.client = self
+
+    def get_positions(self):
+        time.sleep(REST_LATENCY)
+        rows = [{'symbol': s, 'position_qty': 1.0, 'average_open_price': 100.0, 'mark_price': 100.0} for s in HELD]
+        return {'data': {'rows': rows}}
+
+    def get_ohlcv(self, symbol, timeframe="15m", limit=100):
+        time.sleep(REST_LATENCY)
+        return [{'open': 100, 'high': 101, 'low': 99, 'close': 100, 'volume': 10,
+                 'end_timestamp': 1700000000000 + i * 900000} for i in range(limit)]
+
+    def get_indicators(self, symbol, timeframe="15m", limit=100):
+        return indicators.calculate_indicators(self.get_ohlcv(symbol, timeframe, limit))
+
+    def get_top_10_symbols(self):
+        time.sleep(REST_LATENCY)
+        return list(self.symbols)
+
+
+class FakeAI:
+    def analyze_market(self, symbol, candles, indicators=None, last_exit=None):
+        time.sleep(AI_LATENCY)
+        return {'action': 'HOLD', 'confidence': 0.5, 'reasoning': 'bench'}
+
+    async def analyze_market_async(self, symbol, candles, indicators=None, last_exit=None, timeout=None):
+        await asyncio.sleep(AI_LATENCY)
+        return {'action': 'HOLD', 'confidence': 0.5, 'reasoning': 'bench'}
+
+    def circuit(self):
+        return {'state': 'CLOSED', 'reason': None}
+
+
+class FakeExecution:
+    def __init__(self, md):
+        self.md = md
+
+    def monitor_risks(self, positions, md):
+        # One price lookup per held position
+        for _ in positions:
+            time.sleep(REST_LATENCY)
+
+    def validate_signal(self, signal):
+        return False
+
+
+class FakeDB:
+    def listen(self, callback=None):
+        return None  # no LISTEN/NOTIFY: commands are polled
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            time.sleep(DB_LATENCY)
+            if name == 'get_config':
+                return args[1] if len(args) > 1 else kwargs.get('default')
+            if name == 'get_last_exit_info':
+                return None, None
+            return []
+        return call
+
+
+class FakeNotifier:
+    def send_message(self, message, priority=None):
+        pass
+
+
+def serial_tick(md, ai, exec_mod, db, symbols):
+    """Replica of one iteration of the old serial loop (without its fixed 4s/symbol sleeps)."""
+    db.get_config("is_paused", "false")
+    db.get_config("position_size", "30.0")
+    db.get_pending_commands()
+    positions = md.get_positions()['data']['rows']
+    db.get_all_open_symbols()
+    exec_mod.monitor_risks(positions, md)
+    for symbol in symbols:
+        db.get_last_exit_info(symbol)
+        candles = md.get_ohlcv(symbol, "15m", 100)
+        ai.analyze_market(symbol, candles)
+
+
+async def engine_run(engine, seconds):
+    try:
+        await asyncio.wait_for(engine.run(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+def bench(n_symbols, seconds=3.0):
+    symbols = [f"PERP_T{i}_USDC" for i in range(n_symbols)]
+    md = FakeMarketData(symbols)
+    ai, exec_mod, db, notifier = FakeAI(), FakeExecution(md), FakeDB(), FakeNotifier()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        serial_tick(md, ai, exec_mod, db, symbols)
+        serial = time.perf_counter() - started
+
+    config.RISK_INTERVAL = 0.25
+    config.COMMAND_POLL_INTERVAL = 0.25
+    config.POLL_INTERVAL = 0.25
+    config.MAX_OPEN_POSITIONS = len(HELD) + n_symbols
+    config.ENABLE_TOP_10 = True
+
+    engine = TradingEngine(md, ai, exec_mod, db, notifier)
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(engine_run(engine, seconds))
+    risk = list(engine.tick_stats.get("risk", []))
+    return serial, risk
+
+
+def main():
+    print(f"Simulated latencies: REST={REST_LATENCY*1000:.0f}ms AI={AI_LATENCY*1000:.0f}ms DB={DB_LATENCY*1000:.0f}ms, "
+          f"{len(HELD)} open positions")
+    print(f"{'symbols':>8} | {'serial tick (s)':>15} | {'engine risk p50 (ms)':>20} | {'engine risk max (ms)':>20} | {'risk ticks':>10}")
+    for n in (5, 20, 50):
+        serial, risk = bench(n)
+        p50 = statistics.median(risk) * 1000 if risk else float('nan')
+        worst = max(risk) * 1000 if risk else float('nan')
+        print(f"{n:>8} | {serial:>15.2f} | {p50:>20.1f} | {worst:>20.1f} | {len(risk):>10}")
+    print("Serial: risk checks wait for the whole tick. Engine: risk runs every RISK_INTERVAL regardless of N.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: trade_logs hot queries before / after migration 2 (hot-path indexes).
+
+Builds the schema with migrations.py in a scratch schema (bench_indexes) of
+the configured Postgres, seeds it with synthetic history (1M rows by
+default: mostly signals, ~15% closed trades, one open trade for a few
+symbols), then times each hot query of DatabaseHandler with only the
+baseline schema and again after migration 2. The scratch schema is dropped
+at the end.
+
+Usage: python bench_indexes.py [rows]
+"""
+import statistics
+import sys
+import time
+
+import psycopg2
+
+import config
+import migrations
+
+SCHEMA = "bench_indexes"
+SYMBOLS = 200
+RUNS = 30
+
+# (name, SQL as in database.py, params for run i)
+QUERIES = [
+    ("get_open_trade_state",
+     "SELECT log_id, highest_price, entry_price, timestamp FROM trade_logs "
+     "WHERE symbol = %s AND status = 'OPEN' ORDER BY id DESC LIMIT 1;",
+     lambda i: (f"PERP_S{i % 20}_USDC",)),
+    ("get_open_trade_states",
+     "SELECT DISTINCT ON (symbol) symbol, log_id, highest_price, entry_price, timestamp FROM trade_logs "
+     "WHERE status = 'OPEN' ORDER BY symbol, id DESC;",
+     lambda i: ()),
+    ("get_all_open_symbols",
+     "SELECT DISTINCT symbol FROM trade_logs WHERE status = 'OPEN';",
+     lambda i: ()),
+    ("get_last_exit_info",
+     "SELECT COALESCE(exit_timestamp, timestamp), status FROM trade_logs "
+     "WHERE symbol = %s AND status LIKE 'CLOSED%%' "
+     "ORDER BY COALESCE(exit_timestamp, timestamp) DESC, id DESC LIMIT 1;",
+     lambda i: (f"PERP_S{i % SYMBOLS}_USDC",)),
+    ("get_recent_signals",
+     "SELECT symbol, ai_action, ai_confidence, timestamp, ai_reasoning FROM trade_logs "
+     "WHERE status = 'SIGNAL_GENERATED' ORDER BY id DESC LIMIT %s;",
+     lambda i: (5,)),
+    ("get_closed_pnl_since (last hour)",
+     "SELECT id, COALESCE(exit_timestamp, timestamp) AS closed_at, pnl FROM trade_logs "
+     "WHERE status IN ('CLOSED', 'CLOSED_TP', 'CLOSED_SL', 'CLOSED_MANUAL', 'CLOSED_AI_STALE') "
+     "AND pnl IS NOT NULL AND (%s::float IS NULL OR COALESCE(exit_timestamp, timestamp) >= to_timestamp(%s::float)) "
+     "ORDER BY closed_at ASC, id ASC;",
+     lambda i: (time.time() - 3600,) * 2),
+]
+
+
+def seed(cur, rows):
+    # Bulk load without the trade_stats trigger (not what is measured here)
+    cur.execute("ALTER TABLE trade_logs DISABLE TRIGGER trade_stats_sync;")
+    cur.execute(f"""
+        INSERT INTO trade_logs (log_id, timestamp, symbol, ai_action, ai_confidence, ai_reasoning, ma_state,
+                                entry_price, exit_price, pnl, status, exit_timestamp)
+        SELECT 'bench_' || g,
+               NOW() - make_interval(secs => ({rows} - g) * 30),
+               'PERP_S' || (g % {SYMBOLS}) || '_USDC',
+               CASE WHEN g % 2 = 0 THEN 'BUY' ELSE 'SELL' END,
+               0.5 + (g % 50) / 100.0,
+               repeat('Trend and momentum aligned, volume confirms. ', 4),
+               '{{"RSI": 55.1, "ATR": 0.4, "MA_SHORT": 100.2}}'::jsonb,
+               CASE WHEN g % 100 < 15 THEN 100 END,
+               CASE WHEN g % 100 < 15 THEN 100 + (g % 7) - 3 END,
+               CASE WHEN g % 100 < 15 THEN (g % 7) - 3 END,
+               CASE WHEN g % 100 < 5 THEN 'CLOSED_TP' WHEN g % 100 < 10 THEN 'CLOSED_SL'
+                    WHEN g % 100 < 15 THEN 'CLOSED_MANUAL' WHEN g % 100 < 60 THEN 'SIGNAL_GENERATED'
+                    ELSE 'SKIPPED' END,
+               CASE WHEN g % 100 < 15 THEN NOW() - make_interval(secs => ({rows} - g) * 30 - 900) END
+        FROM generate_series(1, {rows}) g;
+    """)
+    # A handful of open trades, as in production (MAX_OPEN_POSITIONS)
+    cur.execute("""
+        UPDATE trade_logs SET status = 'OPEN', entry_price = 100
+        WHERE id IN (SELECT MAX(id) FROM trade_logs WHERE symbol IN
+                     (SELECT 'PERP_S' || n || '_USDC' FROM generate_series(0, 9) n) GROUP BY symbol);
+    """)
+    cur.execute("ALTER TABLE trade_logs ENABLE TRIGGER trade_stats_sync;")
+    cur.execute("ANALYZE trade_logs;")
+
+
+def measure(cur):
+    results = {}
+    for name, sql, params in QUERIES:
+        cur.execute("EXPLAIN " + sql, params(0))
+        plan = " ".join(r[0].strip() for r in cur.fetchall())
+        scan = "index-only" if "Index Only Scan" in plan else "index" if "Index" in plan else "seq scan"
+        timings = []
+        for i in range(RUNS):
+            started = time.perf_counter()
+            cur.execute(sql, params(i))
+            cur.fetchall()
+            timings.append(time.perf_counter() - started)
+        results[name] = (statistics.median(timings), scan)
+    return results
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    conn = psycopg2.connect(host=config.DB_HOST, port=config.DB_PORT, dbname=config.DB_NAME,
+                            user=config.DB_USER, password=config.DB_PASSWORD,
+                            options=f"-c search_path={SCHEMA}")
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+        migrations.apply(cur, target=1)
+
+        started = time.perf_counter()
+        seed(cur, rows)
+        print(f"Seeded {rows:,} trade_logs rows in {time.perf_counter() - started:.1f}s")
+        before = measure(cur)
+
+        started = time.perf_counter()
+        migrations.apply(cur, target=2)
+        cur.execute("ANALYZE trade_logs;")
+        print(f"Migration 2 (index builds) took {time.perf_counter() - started:.1f}s")
+        after = measure(cur)
+
+        print(f"\n{'query':<34} {'baseline':>20} {'migration 2':>24} {'speedup':>9}")
+        for name, _, _ in QUERIES:
+            (b, b_scan), (a, a_scan) = before[name], after[name]
+            print(f"{name:<34} {b * 1000:>8.2f} ms {b_scan:>8} {a * 1000:>10.3f} ms {a_scan:>10} {b / a:>8.0f}x")
+        print(f"(median of {RUNS} runs)")
+    finally:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
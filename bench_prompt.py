@@ -0,0 +1,92 @@
+"""
+Benchmark: legacy prompt table vs compact prompt encoding (prompt_encoding.py).
+
+Reports prompt size per symbol (bytes and estimated tokens, whole request and
+the per-call variable part) and end-to-end latency of analyze_market_async
+against the local stub AI server, which charges a simulated per-token prefill
+cost. Runs offline.
+
+Usage: python bench_prompt.py
+"""
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import config
+import indicators
+import prompt_encoding
+from ai_analyst import AIAnalyst
+from tests.test_ai_client import StubAIServer
+
+BASE_LATENCY = 0.05  # seconds per request at the stub
+PER_TOKEN = 0.0005   # seconds per prompt token (simulated prefill)
+
+
+def make_candles(start, n=100, seed=1):
+    rng = random.Random(seed)
+    candles, price = [], start
+    for i in range(n):
+        price *= 1 + rng.gauss(0, 0.004)
+        candles.append({'open': price * (1 + rng.gauss(0, 0.001)), 'high': price * 1.002, 'low': price * 0.997,
+                        'close': price, 'volume': rng.random() * 12345.678,
+                        'end_timestamp': 1700000000000 + i * 900000})
+    return candles
+
+
+def sizes(payload):
+    system, user = payload['messages'][0]['content'], payload['messages'][1]['content']
+    body = json.dumps(payload)
+    return len(body.encode()), prompt_encoding.estimate_tokens(system + user), \
+        len(user.encode()), prompt_encoding.estimate_tokens(user)
+
+
+def main():
+    universe = {f"PERP_T{i}_USDC": make_candles(start, seed=i)
+                for i, start in enumerate([0.00001234, 0.5, 1.23, 17.5, 2345.67, 65432.1] * 3)}
+    exit_ctx = {'reason': 'CLOSED_SL', 'candles_ago': 3}
+    ai = AIAnalyst()
+    original = config.AI_PROMPT_COMPACT
+
+    print(f"{'format':>8} | {'request bytes':>13} | {'tokens':>7} | {'variable bytes':>14} | {'variable tokens':>15}")
+    results = {}
+    for compact in (False, True):
+        config.AI_PROMPT_COMPACT = compact
+        rows = [sizes(ai._market_payload(s, c, indicators.calculate_indicators(c), exit_ctx)) for s, c in universe.items()]
+        means = [statistics.mean(col) for col in zip(*rows)]
+        results[compact] = means
+        print(f"{'compact' if compact else 'legacy':>8} | {means[0]:>13.0f} | {means[1]:>7.0f} | {means[2]:>14.0f} | {means[3]:>15.0f}")
+    saved = 1 - results[True][1] / results[False][1]
+    print(f"Per symbol: {saved:.0%} fewer tokens per request")
+
+    items = [{'symbol': s, 'candles': c, 'indicators': indicators.calculate_indicators(c), 'last_exit': None}
+             for s, c in universe.items()]
+    batch = sizes(ai._batch_payload(items))
+    print(f"Batch of {len(items)} (compact, {config.AI_BATCH_CANDLES} candles each): "
+          f"{batch[0] / len(items):.0f} bytes / {batch[1] / len(items):.0f} tokens per symbol")
+
+    # End-to-end latency against the stub server
+    server = StubAIServer(delay=BASE_LATENCY, per_token=PER_TOKEN).start()
+    config.AI_API_URL = server.url
+    ai = AIAnalyst()
+    try:
+        for compact in (False, True):
+            config.AI_PROMPT_COMPACT = compact
+            latencies = []
+            for s, c in universe.items():
+                started = time.monotonic()
+                asyncio.run(ai.analyze_market_async(s, c, indicators.calculate_indicators(c), exit_ctx))
+                latencies.append(time.monotonic() - started)
+            print(f"{'compact' if compact else 'legacy':>8} end-to-end: mean {statistics.mean(latencies) * 1000:.0f} ms, "
+                  f"max {max(latencies) * 1000:.0f} ms (stub: {BASE_LATENCY * 1000:.0f} ms + {PER_TOKEN * 1000:.1f} ms/token)")
+    finally:
+        config.AI_PROMPT_COMPACT = original
+        ai.close()
+        server.stop()
+
+    print("Tokens are estimated (letters / 3-digit groups / punctuation); the static system prefix is identical across calls.")
+
+
+if __name__ == "__main__":
+    main()
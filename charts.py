@@ -0,0 +1,39 @@
+"""
+Chart rendering for the Telegram bot.
+
+Runs inside tg_bot's process pool, so it must stay import-light and
+picklable: plain data in, PNG bytes out. matplotlib is imported on first
+use with the non-interactive Agg backend.
+"""
+import io
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def warm():
+    """Imports matplotlib in the worker ahead of the first /pnl."""
+    _pyplot()
+    return True
+
+
+def render_pnl_chart(times, cumulative):
+    """Cumulative PnL line chart as PNG bytes."""
+    plt = _pyplot()
+    fig = plt.figure(figsize=(10, 5))
+    try:
+        plt.plot(times, cumulative, marker='o', linestyle='-', color='g')
+        plt.title(f"Cumulative PnL (Last {len(cumulative)} Trades)")
+        plt.xlabel("Time")
+        plt.ylabel("USDC")
+        plt.grid(True)
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png')
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
@@ -14,6 +14,34 @@ POSITION_SIZE_USDC = 30.0 # Trade size in USDC
 
 INTERVAL = 300 # 5 minutes (Check 3 times per 15m candle) in seconds
 
+# Engine Cadences (seconds) - each stage runs as its own asyncio task
+RISK_INTERVAL = 5            # Risk monitor period (never delayed by AI / DB work)
+COMMAND_POLL_INTERVAL = 2    # Remote controls & command queue (when LISTEN/NOTIFY is down)
+COMMAND_SAFETY_POLL = 30     # Safety poll while LISTEN/NOTIFY pushes commands & config changes
+POLL_INTERVAL = 10           # Analysis pass & zombie reconciliation
+SCAN_INTERVAL = 3600         # Rescan Top N symbols
+STALE_CHECK_INTERVAL = 3600  # Stale position AI audit
+ENGINE_IO_WORKERS = 8        # Threads for blocking SDK / HTTP / DB calls
+ANALYSIS_WORKERS = 3         # Symbols analysed concurrently per pass (1 = serial)
+
+# Orderly REST Rate Limits: bucket -> (requests/sec, burst)
+# All SDK calls share these buckets (see rate_limiter.py) instead of fixed sleeps
+RATE_LIMITS = {
+    'market': (10, 10),   # Public market data (kline, orderbook, futures info)
+    'account': (10, 10),  # Private account (positions, holdings, order lookups)
+    'order': (10, 5),     # Order placement / cancel
+}
+RATE_LIMIT_RETRIES = 2          # Retries after a 429
+RATE_LIMIT_BACKOFF_START = 1.0  # Seconds; doubles on consecutive 429s
+RATE_LIMIT_BACKOFF_MAX = 30.0
+RATE_LIMIT_MIN_RATE = 1.0       # Floor for the adaptive rate (req/s)
+
+# Candle Store (in-memory klines per symbol/timeframe, see market_data.CandleStore)
+CANDLE_STORE_CAPACITY = 500  # Candles kept per (symbol, timeframe) ring buffer
+CANDLE_STORE_MAX_AGE = 30    # Seconds a buffer is served from memory before fetching the tail
+PRICE_MAX_AGE = 10           # Risk monitor: older quotes are refreshed from the orderbook
+SYMBOL_RULES_TTL = 6 * 3600  # Trading rules (base_tick, min_notional) refreshed in the background after this
+
 # API Keys (Loaded from env for security)
 ORDERLY_KEY = os.getenv("ORDERLY_KEY")
 ORDERLY_SECRET = os.getenv("ORDERLY_SECRET")
@@ -23,9 +51,47 @@ if ORDERLY_SECRET and not ORDERLY_SECRET.startswith("ed25519:"):
 ORDERLY_ACCOUNT_ID = os.getenv("ORDERLY_ACCOUNT_ID")
 ASKSURF_API_KEY = os.getenv("ASKSURF_API_KEY")
 
+# AI HTTP Client (ai_client.py: pooled aiohttp session, keep-alive)
+AI_API_URL = os.getenv("ASKSURF_API_URL", "https://api.asksurf.ai/surf-ai/v1/chat/completions")
+AI_MAX_CONCURRENCY = 4      # AI requests in flight at once (also the connection pool size)
+AI_REQUEST_TIMEOUT = 20     # Seconds per HTTP attempt
+AI_DEADLINE = 45            # Seconds per call, retries included
+AI_MAX_RETRIES = 3
+AI_BACKOFF_BASE = 1.0       # Retry n waits uniform(0, min(AI_BACKOFF_MAX, BASE * 2^n)) seconds
+AI_BACKOFF_MAX = 8.0
+AI_KEEPALIVE = 60           # Seconds an idle connection stays open for reuse
+AI_SIGNAL_CACHE_TTL = 900   # Reuse an AI decision while its closed-candle inputs are unchanged (one 15m candle)
+AI_SIGNAL_CACHE_SIZE = 512  # LRU bound on cached decisions
+AI_SIGNAL_CACHE_PERSIST = True # Write decisions through to Postgres so restarts start warm
+AI_BREAKER_WINDOW = 20      # Circuit breaker: rolling window of HTTP attempts...
+AI_BREAKER_MIN_SAMPLES = 5  # ...judged once it holds this many
+AI_BREAKER_ERROR_RATE = 0.5 # Open at this share of failed attempts (timeouts, 429/5xx, connection errors)
+AI_BREAKER_P95 = 15.0       # ...or when p95 attempt latency exceeds this many seconds
+AI_BREAKER_COOLDOWN = 60    # Seconds open before a single half-open probe
+AI_TICK_BUDGET = 90         # Max seconds of AI time per analysis pass; remaining symbols wait for the next pass
+AI_PROMPT_COMPACT = True    # prompt_encoding.py: relative prices/volumes + static system prefix (False = legacy table)
+AI_BATCH_MODE = False       # One chat completion for several symbols per analysis pass (see AIAnalyst.analyze_batch_async)
+AI_BATCH_SIZE = 10          # Symbols per batched request
+AI_BATCH_CANDLES = 10       # Candles per symbol in a batched prompt
+
 # Telegram Config
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_RATE = 1.0             # Sustained messages/s to one chat (Telegram allows ~1/s per chat)
+TELEGRAM_BURST = 3              # Messages that may go out back to back
+TELEGRAM_COALESCE_WINDOW = 1.0  # Seconds to gather a burst into one digest message
+TELEGRAM_QUEUE_SIZE = 50        # Pending messages before low-priority ones are dropped
+TELEGRAM_TIMEOUT = 5            # Seconds per sendMessage call (background thread)
+TG_IO_WORKERS = 8               # tg_bot.py threads for DB / exchange calls
+TG_DB_POOL_MAX = 3              # tg_bot.py's own DB connections (command bursts queue here, not on the server)
+TG_CHART_WORKERS = 1            # tg_bot.py processes rendering matplotlib charts
+PNL_CHART_POINTS = 50           # /pnl plots the cumulative PnL of the last N closed trades
+PNL_REVISION_WINDOW = 60        # Seconds re-read behind the last close (late fill confirmations revise PnL)
+
+# Dashboard (dashboard.py)
+DASHBOARD_REFRESH = 30          # Seconds between auto-refreshes (and st.cache_data TTL)
+DASHBOARD_FEED_ROWS = 20        # Rows in the recent AI analysis table
+DASHBOARD_PNL_POINTS = 500      # Closes plotted on the cumulative PnL curve
 
 # DB Config
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -33,6 +99,11 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "mydb")
 DB_USER = os.getenv("DB_USER", "myuser")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "mypassword")
+DB_POOL_MAX = 10                # Connections per process; each process (bot, tg_bot.py, dashboard) has its own pool
+DB_POOL_TIMEOUT = 10            # Seconds to wait for a free connection
+DB_HEALTHCHECK_IDLE = 30        # Ping (SELECT 1) connections idle longer than this before reuse
+DB_RECONNECT_BACKOFF_START = 1.0
+DB_RECONNECT_BACKOFF_MAX = 60.0
 
 # Risk Config
 
@@ -46,6 +117,22 @@ MA_SHORT = 30
 MA_MEDIUM = 45
 MA_LONG = 60
 
+# Extra Indicators (indicators.py, vectorized NumPy engine)
+EMA_FAST = 12
+EMA_SLOW = 26
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+BB_PERIOD = 20
+BB_STD = 2.0
+VWAP_PERIOD = 96      # 24h of 15m candles
+VOLUME_Z_PERIOD = 20
+
+# Pre-filter Gate (prefilter.py): skip the AI call for symbols that cannot set up a trade
+PREFILTER_ENABLED = True
+PREFILTER_MIN_ATR_PCT = 0.002     # ATR / price below this = too quiet to clear fees (hard requirement)
+PREFILTER_MIN_MA_DISTANCE = 0.003 # |price - MA_LONG| / MA_LONG at or above this counts as stretched
+PREFILTER_VOLUME_Z = 2.0          # Volume z-score at or above this counts as a spike
+
 # Stepped Trailing Stop Settings
 TS_ACTIVATION_1 = 0.015 # 1.5% profit triggers Tier 1
 TS_LOCK_1 = 0.002       # Lock 0.2% profit (Cover Fees) - Was 0.0 (Breakeven)
@@ -55,6 +142,11 @@ TS_LOCK_2 = 0.015       # Lock 1.5% profit
 
 # Dynamic Ratchet (Tier 2 Upgrade)
 TS_DYNAMIC_CALLBACK = 0.015 # 1.5% trailing distance once Tier 2 is hit
+FILL_POLL_START = 0.05      # Fill confirmation: first get_order poll after this many seconds, doubling...
+FILL_POLL_MAX = 1.0         # ...up to this interval
+FILL_TIMEOUT = 10           # Give up and keep the estimated price after this many seconds
+HWM_FLUSH_INTERVAL = 15     # Max seconds an HWM move stays in memory before the batched DB write
+PANIC_CLOSE_WORKERS = 8     # CLOSE_ALL: reduce-only orders in flight at once (still paced by the order rate limit)
 
 # Stale Position Re-evaluation
 MAX_HOLD_HOURS = 12     # Hours before AI re-evaluates a stagnant trade
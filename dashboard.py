@@ -1,9 +1,9 @@
-
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from database import DatabaseHandler
+from dashboard_data import CLOSED_STATUSES, TradeFeed, summarize
+from pnl_series import PnLSeries
 import config
 import time
 
@@ -17,93 +17,92 @@ st.set_page_config(
 
 # --- Database Connection ---
 @st.cache_resource
-def get_connection():
-    try:
-        conn = psycopg2.connect(
-            host=config.DB_HOST,
-            port=config.DB_PORT,
-            database=config.DB_NAME,
-            user=config.DB_USER,
-            password=config.DB_PASSWORD
-        )
-        return conn
-    except Exception as e:
-        st.error(f"Failed to connect to DB: {e}")
-        return None
-
-def fetch_data():
-    conn = get_connection()
-    if not conn: return pd.DataFrame()
-    
-    try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("SELECT * FROM trade_logs ORDER BY timestamp DESC LIMIT 500;")
-            data = cur.fetchall()
-            df = pd.DataFrame(data)
-            return df
-    except Exception as e:
-        st.error(f"Query failed: {e}")
-        # Re-connect if connection lost
-        return pd.DataFrame()
+def get_db():
+    # One pooled handler per Streamlit server, shared by all sessions / reruns
+    return DatabaseHandler()
+
+@st.cache_resource
+def get_feed():
+    return TradeFeed(get_db())
+
+@st.cache_resource
+def get_pnl_series():
+    # Same trades as the Realized PnL metric, so the curve ends on it
+    return PnLSeries(get_db(), points=config.DASHBOARD_PNL_POINTS, statuses=CLOSED_STATUSES)
+
+# --- Queries (each costs the same however large trade_logs grows) ---
+@st.cache_data(ttl=config.DASHBOARD_REFRESH)
+def load_stats():
+    # trade_stats: per-symbol totals over the whole history, kept current by a trigger
+    return summarize(get_db().get_trade_stats())
+
+@st.cache_data(ttl=config.DASHBOARD_REFRESH)
+def load_feed():
+    # Rows with id > last seen, plus the few in view that are not closed yet
+    return get_feed().refresh()
+
+@st.cache_data(ttl=config.DASHBOARD_REFRESH)
+def load_pnl_curve():
+    series = get_pnl_series()
+    series.refresh() # Only trades closed since the last refresh
+    times, cumulative = series.series()
+    return pd.DataFrame({'timestamp': times, 'cum_pnl': cumulative})
+
+@st.cache_data(ttl=3600)
+def load_detail(row_id):
+    return get_db().get_trade_detail(row_id)
 
 # --- Main Dashboard ---
 st.title("🤖 Orderly Trading Bot Monitor")
 
 # Auto-refresh toggle
-auto_refresh = st.sidebar.checkbox("Auto-refresh (30s)", value=True)
+auto_refresh = st.sidebar.checkbox(f"Auto-refresh ({config.DASHBOARD_REFRESH}s)", value=True)
 
-st.write("🔄 Fetching data...") # DEBUG
-df = fetch_data()
-st.write(f"✅ Data fetched. Rows: {len(df)}") # DEBUG
+if not get_db().pool.available():
+    st.error("Database unavailable, retrying on the next refresh.")
+    metrics, pnl_by_token = summarize([])
+else:
+    metrics, pnl_by_token = load_stats()
 
-if df.empty:
+if metrics['signals'] == 0:
     st.warning("No data found in trade_logs yet.")
-    # Debug: why empty?
-    st.write("Debug: DataFrame is empty.")
 else:
     # --- Metrics Row ---
     col1, col2, col3, col4 = st.columns(4)
-    
-    total_signals = len(df)
-    
-    # Filter for executed trades (where status is OPEN or CLOSED_*)
-    trades = df[df['status'].isin(['OPEN', 'CLOSED_TP', 'CLOSED_SL'])]
-    total_trades = len(trades)
-    
-    # PnL Calculation
-    realized_pnl = trades['pnl'].sum() if 'pnl' in trades.columns else 0.0
-    win_count = len(trades[trades['pnl'] > 0])
-    win_rate = (win_count / total_trades * 100) if total_trades > 0 else 0
-    
-    col1.metric("Total Signals", total_signals)
-    col2.metric("Executed Trades", total_trades)
-    col3.metric("Realized PnL (USDC)", f"${realized_pnl:.2f}", delta_color="normal")
-    col4.metric("Win Rate", f"{win_rate:.1f}%")
-    
+    col1.metric("Total Signals", metrics['signals'])
+    col2.metric("Executed Trades", metrics['trades'], help="OPEN, CLOSED_TP and CLOSED_SL trades")
+    col3.metric("Realized PnL (USDC)", f"${metrics['realized_pnl']:.2f}", delta_color="normal",
+                help="PnL of the executed trades (TP / SL closes)")
+    col4.metric("Win Rate", f"{metrics['win_rate']:.1f}%", help="Winning trades / executed trades")
+
     # --- Charts ---
     st.markdown("### 📈 Cumulative PnL")
-    if not trades.empty and 'pnl' in trades.columns:
-        trades_sorted = trades.sort_values('timestamp')
-        trades_sorted['cum_pnl'] = trades_sorted['pnl'].cumsum()
-        fig_pnl = px.line(trades_sorted, x='timestamp', y='cum_pnl', markers=True, title="Capital Growth")
+    curve = load_pnl_curve()
+    if not curve.empty:
+        fig_pnl = px.line(curve, x='timestamp', y='cum_pnl', markers=True, title="Capital Growth")
         st.plotly_chart(fig_pnl, use_container_width=True)
-    
+
     st.markdown("### 🚦 Recent AI Analysis")
-    # Show last 20 logs including skipped ones
-    st.dataframe(
-        df[['timestamp', 'symbol', 'ai_action', 'ai_confidence', 'status', 'pnl', 'ai_reasoning']].head(20),
-        use_container_width=True
-    )
-    
+    # Select a row to load its reasoning and indicator snapshot
+    feed = load_feed()
+    event = st.dataframe(feed, use_container_width=True, hide_index=True,
+                         on_select="rerun", selection_mode="single-row")
+    if event.selection.rows:
+        row = feed.iloc[event.selection.rows[0]]
+        reasoning, ma_state = load_detail(int(row['id']))
+        with st.expander(f"🧠 {row['symbol']} {row['ai_action']} (#{row['id']})", expanded=True):
+            st.write(reasoning or "_No reasoning logged._")
+            if ma_state:
+                st.json(ma_state)
+
     # --- Advanced Stats ---
     st.markdown("### 📊 Performance by Token")
-    if not trades.empty:
-        pnl_by_token = trades.groupby('symbol')['pnl'].sum().reset_index()
+    if not pnl_by_token.empty:
         fig_bar = px.bar(pnl_by_token, x='symbol', y='pnl', color='pnl', title="PnL Distribution by Token")
         st.plotly_chart(fig_bar, use_container_width=True)
 
 
 # --- Auto Refresh Handling ---
 if auto_refresh:
-    time.sleep(30)
+    time.sleep(config.DASHBOARD_REFRESH)
     st.rerun()
@@ -0,0 +1,80 @@
+"""
+Data layer of dashboard.py, kept free of Streamlit so it can be tested.
+
+Nothing here reads trade_logs in bulk:
+- metrics and per-token PnL come from the trade_stats summary table
+  (one row per symbol, maintained by a trigger, see schema/0003_*.sql),
+- the cumulative PnL curve comes from pnl_series.PnLSeries (closes since
+  the last refresh only),
+- the recent-activity table reads rows with id > last seen, plus the
+  current status of the few rows in view that have not closed yet,
+  without the ai_reasoning / ma_state columns (see DatabaseHandler.get_trade_detail).
+"""
+import threading
+
+import pandas as pd
+
+import config
+
+# What the dashboard has always counted as an executed trade / a realized close
+TRADE_STATUSES = ('OPEN', 'CLOSED_TP', 'CLOSED_SL')
+CLOSED_STATUSES = ('CLOSED_TP', 'CLOSED_SL')
+
+FEED_FIELDS = ('id', 'timestamp', 'symbol', 'ai_action', 'ai_confidence', 'status', 'pnl')
+STATS_FIELDS = ('symbol', 'signals', 'trades', 'closed', 'wins', 'pnl')
+
+
+def summarize(stats_rows):
+    """
+    trade_stats rows -> (headline metrics dict, per-symbol DataFrame).
+    Trades and PnL cover TRADE_STATUSES; win rate is winning trades / trades.
+    """
+    by_symbol = pd.DataFrame(stats_rows, columns=list(STATS_FIELDS))
+    totals = {field: by_symbol[field].sum() for field in STATS_FIELDS[1:]}
+    metrics = {
+        'signals': int(totals['signals']),
+        'trades': int(totals['trades']),
+        'closed': int(totals['closed']),
+        'realized_pnl': float(totals['pnl']),
+        'win_rate': float(totals['wins'] / totals['trades'] * 100) if totals['trades'] else 0.0,
+    }
+    return metrics, by_symbol[by_symbol['trades'] > 0][['symbol', 'pnl']].reset_index(drop=True)
+
+
+class TradeFeed:
+    """The newest `size` trade_logs rows (light columns), refreshed incrementally."""
+
+    def __init__(self, db, size=None):
+        self.db = db
+        self.size = config.DASHBOARD_FEED_ROWS if size is None else size
+        self.last_seen = 0
+        self._rows = {}     # id -> row tuple (FEED_FIELDS)
+        self._lock = threading.Lock()
+        self.stats = {'refreshes': 0, 'rows_read': 0}
+
+    def refresh(self):
+        """Reads new rows and re-reads rows in view that may still change. Returns frame()."""
+        with self._lock:
+            new = self.db.get_trade_feed(self.last_seen, self.size)
+            # A signal can still be executed, an OPEN trade closed or its exit fill revised
+            pending = [row_id for row_id, row in self._rows.items()
+                       if not str(row[5] or '').startswith('CLOSED')]
+            updated = self.db.get_trade_rows(pending) if pending else []
+            for row in list(updated) + list(new):
+                self._rows[row[0]] = tuple(row)
+            if new:
+                self.last_seen = max(self.last_seen, max(row[0] for row in new))
+            for row_id in sorted(self._rows)[:-self.size]:
+                del self._rows[row_id]
+            self.stats['refreshes'] += 1
+            self.stats['rows_read'] += len(new) + len(updated)
+            return self._frame()
+
+    def _frame(self):
+        rows = [self._rows[row_id] for row_id in sorted(self._rows, reverse=True)]
+        return pd.DataFrame(rows, columns=list(FEED_FIELDS))
+
+    def frame(self):
+        """Newest first."""
+        with self._lock:
+            return self._frame()
@@ -1,85 +1,309 @@
-
 import psycopg2
-from psycopg2.extras import Json
+from psycopg2.extras import Json, execute_values
+from contextlib import contextmanager
 import config
 import datetime
+import migrations
+import select
+import threading
+import time
+
+# LISTEN/NOTIFY channels (payload: config key / command id)
+CONFIG_CHANNEL = "bot_config_changed"
+COMMAND_CHANNEL = "bot_command_added"
+
+
+class DatabaseUnavailable(Exception):
+    """No connection could be checked out (DB down / in reconnect backoff / pool exhausted)."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of autocommit psycopg2 connections.
+
+    Connections are opened lazily up to `maxconn`. Idle connections are
+    health-checked on checkout (closed flag, plus SELECT 1 after
+    DB_HEALTHCHECK_IDLE), broken ones are discarded and replaced. Failed
+    connects back off exponentially so a DB outage does not hammer the server.
+    """
+
+    def __init__(self, connect, maxconn=None, timeout=None):
+        self._connect = connect
+        self.maxconn = maxconn or config.DB_POOL_MAX
+        self.timeout = config.DB_POOL_TIMEOUT if timeout is None else timeout
+        self._idle = []   # [(conn, monotonic time returned)]
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self.stats = {'checkouts': 0, 'connects': 0, 'connect_failures': 0, 'discarded': 0, 'waits': 0}
+
+    def available(self):
+        """False only while there is no idle connection and reconnects are backing off."""
+        with self._cond:
+            return bool(self._idle) or self._in_use > 0 or time.monotonic() >= self._retry_at
+
+    def _open(self):
+        with self._cond:
+            wait = self._retry_at - time.monotonic()
+        if wait > 0:
+            raise DatabaseUnavailable(f"reconnecting in {wait:.1f}s")
+        try:
+            conn = self._connect()
+            conn.autocommit = True
+        except Exception as e:
+            with self._cond:
+                self._backoff = min(max(self._backoff * 2, config.DB_RECONNECT_BACKOFF_START),
+                                    config.DB_RECONNECT_BACKOFF_MAX)
+                self._retry_at = time.monotonic() + self._backoff
+                self.stats['connect_failures'] += 1
+            raise DatabaseUnavailable(f"connect failed, retry in {self._backoff:.0f}s: {e}") from e
+
+        with self._cond:
+            if self._backoff:
+                print("✅ Reconnected to PostgreSQL database.")
+            self._backoff = 0.0
+            self._retry_at = 0.0
+            self.stats['connects'] += 1
+        return conn
+
+    @staticmethod
+    def _healthy(conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < config.DB_HEALTHCHECK_IDLE:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                elif self._in_use < self.maxconn:
+                    conn, idle_since = None, None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DatabaseUnavailable(f"pool exhausted ({self.maxconn} connections in use)")
+                    self.stats['waits'] += 1
+                    self._cond.wait(remaining)
+                    continue
+                self._in_use += 1
+                self.stats['checkouts'] += 1
+
+            if conn is None:
+                try:
+                    return self._open()
+                except Exception:
+                    self._release()
+                    raise
+            if self._healthy(conn, idle_since):
+                return conn
+            self.putconn(conn, close=True)
+
+    def _release(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def putconn(self, conn, close=False):
+        if close or conn.closed:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._cond:
+                self.stats['discarded'] += 1
+            self._release()
+            return
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def reset(self, conns=()):
+        """Close idle connections and seed the pool with `conns` (already-open connections)."""
+        with self._cond:
+            old, self._idle = self._idle, [(c, time.monotonic()) for c in conns]
+        for conn, _ in old:
+            if conn not in conns:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def closeall(self):
+        self.reset()
+
+
+class NotificationListener(threading.Thread):
+    """
+    Background thread holding a dedicated connection that LISTENs on `channels`
+    and calls callback(channel, payload) for every NOTIFY.
+
+    After each (re)connect it calls callback(None, None): anything sent while we
+    were not listening was missed, so consumers should resync.
+    """
+
+    def __init__(self, connect, channels, callback):
+        super().__init__(daemon=True, name="pg-listen")
+        self._connect = connect
+        self.channels = list(channels)
+        self._callback = callback
+        self._stop_event = threading.Event()
+        self.connected = False
+
+    def run(self):
+        backoff = 0.0
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    for channel in self.channels:
+                        cur.execute(f"LISTEN {channel};")
+                self.connected = True
+                backoff = 0.0
+                self._callback(None, None)
+
+                while not self._stop_event.is_set():
+                    # Short timeout so stop() is noticed promptly
+                    if select.select([conn], [], [], 1.0)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            notify = conn.notifies.pop(0)
+                            self._callback(notify.channel, notify.payload)
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    print(f"❌ LISTEN connection lost: {e}")
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+            if not self._stop_event.is_set():
+                backoff = min(max(backoff * 2, config.DB_RECONNECT_BACKOFF_START), config.DB_RECONNECT_BACKOFF_MAX)
+                self._stop_event.wait(backoff)
+
+    def stop(self):
+        self._stop_event.set()
+
 
 class DatabaseHandler:
-    def __init__(self):
-        self.conn = None
+    def __init__(self, maxconn=None):
+        # maxconn: pool size for this process (default DB_POOL_MAX)
+        self.pool = ConnectionPool(self._new_connection, maxconn=maxconn)
+        self._listener = None
+        # bot_configs cache, only used while a listener keeps it fresh
+        self._config_cache = {}
+        self._config_gen = 0
+        self._cache_lock = threading.Lock()
         self.connect()
 
+    @staticmethod
+    def _new_connection():
+        return psycopg2.connect(
+            host=config.DB_HOST,
+            port=config.DB_PORT,
+            database=config.DB_NAME,
+            user=config.DB_USER,
+            password=config.DB_PASSWORD
+        )
+
     def connect(self):
         try:
-            self.conn = psycopg2.connect(
-                host=config.DB_HOST,
-                port=config.DB_PORT,
-                database=config.DB_NAME,
-                user=config.DB_USER,
-                password=config.DB_PASSWORD
-            )
-            self.conn.autocommit = True
+            with self.cursor():
+                pass
             print("✅ Connected to PostgreSQL database.")
             self.init_db()
         except Exception as e:
             print(f"❌ Database connection failed: {e}")
-            self.conn = None
 
-    def init_db(self):
-        if not self.conn: return
+    @contextmanager
+    def connection(self):
+        """
+        Checks a connection out of the pool for the duration of the block (for ad-hoc
+        scripts that need the raw connection). Nobody else can use it until the block exits;
+        connection-level errors discard it so the next checkout reconnects.
+        """
+        conn = self.pool.getconn()
         try:
-            with self.conn.cursor() as cur:
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS trade_logs (
-                        id SERIAL PRIMARY KEY,
-                        log_id TEXT UNIQUE,
-                        timestamp TIMESTAMPTZ DEFAULT NOW(),
-                        symbol TEXT,
-                        ai_action TEXT,
-                        ai_confidence FLOAT,
-                        ai_reasoning TEXT,
-                        ma_state JSONB,
-                        entry_price FLOAT,
-                        exit_price FLOAT,
-                        pnl FLOAT,
-                        status TEXT
-                    );
-                """)
-                try:
-                    cur.execute("ALTER TABLE trade_logs ADD COLUMN IF NOT EXISTS log_id TEXT UNIQUE;")
-                    cur.execute("ALTER TABLE trade_logs ADD COLUMN IF NOT EXISTS highest_price FLOAT DEFAULT 0;")
-                    cur.execute("ALTER TABLE trade_logs ADD COLUMN IF NOT EXISTS exit_timestamp TIMESTAMPTZ;")
-                except Exception as e:
-                    print(f"Migration note: {e}")
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.pool.putconn(conn, close=True)
+            raise
+        except BaseException:
+            self.pool.putconn(conn)
+            raise
+        else:
+            self.pool.putconn(conn)
 
-                # Create Bot Configs Table (Key-Value Store)
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS bot_configs (
-                        key TEXT PRIMARY KEY,
-                        value TEXT,
-                        updated_at TIMESTAMPTZ DEFAULT NOW()
-                    );
-                """)
-                # Insert Default Configs if not exist
-                cur.execute("""
-                    INSERT INTO bot_configs (key, value) VALUES 
-                    ('is_paused', 'false'),
-                    ('position_size', '30.0')
-                    ON CONFLICT (key) DO NOTHING;
-                """)
+    @contextmanager
+    def cursor(self, **kwargs):
+        """Cursor on a connection checked out for the duration of the block (see connection())."""
+        with self.connection() as conn:
+            with conn.cursor(**kwargs) as cur:
+                yield cur
 
-                # Create Command Queue Table (Phase 2)
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS command_queue (
-                        id SERIAL PRIMARY KEY,
-                        command TEXT NOT NULL,
-                        params JSONB DEFAULT '{}'::jsonb,
-                        status TEXT DEFAULT 'PENDING',
-                        created_at TIMESTAMPTZ DEFAULT NOW(),
-                        executed_at TIMESTAMPTZ
-                    );
-                """)
+    def close(self):
+        self.stop_listening()
+        self.pool.closeall()
+
+    # --- Push Notifications (LISTEN/NOTIFY) ---
 
+    def listen(self, callback=None):
+        """
+        Starts the LISTEN thread for config changes and new commands.
+        While it is connected, get_config() is served from memory and
+        invalidated by CONFIG_CHANNEL notifications. callback(channel, payload)
+        runs on the listener thread after the cache has been updated.
+        """
+        def dispatch(channel, payload):
+            if channel == CONFIG_CHANNEL:
+                self._invalidate_config(payload)
+            elif channel is None:
+                self._invalidate_config()
+            if callback:
+                callback(channel, payload)
+
+        self.stop_listening()
+        self._listener = NotificationListener(self._new_connection, [CONFIG_CHANNEL, COMMAND_CHANNEL], dispatch)
+        self._listener.start()
+        return self._listener
+
+    def stop_listening(self):
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
+        self._invalidate_config()
+
+    def _invalidate_config(self, key=None):
+        with self._cache_lock:
+            self._config_gen += 1
+            if key is None:
+                self._config_cache.clear()
+            else:
+                self._config_cache.pop(key, None)
+
+    def _config_cached(self):
+        return self._listener is not None and self._listener.connected
+
+    def init_db(self):
+        """Creates / upgrades the schema through the versioned migrations in migrations.py."""
+        if not self.pool.available(): return
+        try:
+            migrations.migrate(self)
             print("Verified trade_logs and bot_configs tables.")
         except Exception as e:
             print(f"❌ Failed to init DB schema: {e}")
@@ -88,9 +312,9 @@ class DatabaseHandler:
         # ... (Same as before) ...
         # Ensure we set highest_price = entry_price initially? 
         # Update INSERT to include highest_price if explicit, or default 0.
-        if not self.conn: return None
+        if not self.pool.available(): return None
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     INSERT INTO trade_logs (log_id, symbol, ai_action, ai_confidence, ai_reasoning, ma_state, status, highest_price)
                     VALUES (%s, %s, %s, %s, %s, %s, 'SIGNAL_GENERATED', 0)
@@ -110,9 +334,9 @@ class DatabaseHandler:
             return None
 
     def log_trade(self, log_id, entry_price, status="OPEN"):
-        if not self.conn or not log_id: return
+        if not log_id or not self.pool.available(): return
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     UPDATE trade_logs 
                     SET entry_price = %s, highest_price = %s, status = %s
@@ -123,10 +347,10 @@ class DatabaseHandler:
 
     def register_orphan_trade(self, symbol, entry_price, side):
         """Registers an existing position found on exchange that wasn't tracked by Bot."""
-        if not self.conn: return None
+        if not self.pool.available(): return None
         try:
             log_id = f"ORPHAN_{symbol}_{int(datetime.datetime.now().timestamp())}"
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     INSERT INTO trade_logs (log_id, symbol, ai_action, entry_price, highest_price, status)
                     VALUES (%s, %s, %s, %s, %s, 'OPEN')
@@ -140,9 +364,9 @@ class DatabaseHandler:
 
     def get_open_trade_state(self, symbol):
         """Fetches log_id, highest_price, entry_price, and timestamp for active open trade"""
-        if not self.conn: return None, 0, 0, None
+        if not self.pool.available(): return None, 0, 0, None
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     SELECT log_id, highest_price, entry_price, timestamp FROM trade_logs 
                     WHERE symbol = %s AND status = 'OPEN'
@@ -156,14 +380,33 @@ class DatabaseHandler:
             print(f"❌ DB Read Error: {e}")
             return None, 0, 0, None
 
+    def get_open_trade_states(self):
+        """
+        Bulk version of get_open_trade_state for every symbol with an OPEN trade:
+        { "SYMBOL": (log_id, highest_price, entry_price, timestamp) } (latest row per symbol).
+        """
+        if not self.pool.available(): return {}
+        try:
+            with self.cursor() as cur:
+                cur.execute("""
+                    SELECT DISTINCT ON (symbol) symbol, log_id, highest_price, entry_price, timestamp
+                    FROM trade_logs
+                    WHERE status = 'OPEN'
+                    ORDER BY symbol, id DESC;
+                """)
+                return {r[0]: (r[1], float(r[2] or 0), float(r[3] or 0), r[4]) for r in cur.fetchall()}
+        except Exception as e:
+            print(f"❌ DB Read Error (open states): {e}")
+            return {}
+
     def get_active_trade_details(self, symbol):
         """
         Returns full details for Status Display: 
         (entry_price, highest_price, ai_action, timestamp)
         """
-        if not self.conn: return None, 0, 0, None
+        if not self.pool.available(): return None, 0, 0, None
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     SELECT entry_price, highest_price, ai_action, timestamp 
                     FROM trade_logs 
@@ -180,18 +423,34 @@ class DatabaseHandler:
             return 0, 0, None, None
 
     def update_highest_price(self, log_id, price):
-        if not self.conn: return
+        if not self.pool.available(): return
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("UPDATE trade_logs SET highest_price = %s WHERE log_id = %s", (price, log_id))
         except Exception as e:
             print(f"❌ Failed to update HWM: {e}")
 
+    def update_highest_prices(self, updates):
+        """Batched HWM write: updates = [(log_id, price), ...] in one statement. Returns True on success."""
+        if not updates: return True
+        if not self.pool.available(): return False
+        try:
+            with self.cursor() as cur:
+                execute_values(cur, """
+                    UPDATE trade_logs AS t SET highest_price = v.price
+                    FROM (VALUES %s) AS v(log_id, price)
+                    WHERE t.log_id = v.log_id;
+                """, updates)
+            return True
+        except Exception as e:
+            print(f"❌ Failed to flush {len(updates)} HWM updates: {e}")
+            return False
+
     def update_entry_price(self, log_id, new_price):
         """Updates the entry price and resets HWM to new entry price to sync with Exchange."""
-        if not self.conn: return
+        if not self.pool.available(): return
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     UPDATE trade_logs 
                     SET entry_price = %s, highest_price = %s 
@@ -206,10 +465,11 @@ class DatabaseHandler:
         """
         Updates the latest OPEN trade for the symbol with PnL.
         Note: Simple approach, assumes only one open trade per symbol.
+        Returns the row id (for a later update_exit_fill), None if nothing was closed.
         """
-        if not self.conn: return
+        if not self.pool.available(): return
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 # Find the latest open trade for this symbol
                 cur.execute("""
                     SELECT id FROM trade_logs 
@@ -225,16 +485,40 @@ class DatabaseHandler:
                         WHERE id = %s;
                     """, (exit_price, pnl, status, log_id))
                     print(f"📝 PnL Logged to DB for ID {log_id}: {pnl:.4f}")
+                    return log_id
                 else:
                     print(f"⚠️ No open DB record found for {symbol} to log PnL.")
         except Exception as e:
             print(f"❌ Failed to log PnL: {e}")
 
+    def update_exit_fill(self, row_id, exit_price, pnl=None):
+        """
+        Replaces an estimated exit with the confirmed fill price.
+        Without an explicit pnl it is recomputed per unit from the stored entry (as close_zombie_trade does).
+        """
+        if not row_id or not self.pool.available(): return
+        try:
+            with self.cursor() as cur:
+                if pnl is not None:
+                    cur.execute("UPDATE trade_logs SET exit_price = %s, pnl = %s WHERE id = %s;", (exit_price, pnl, row_id))
+                else:
+                    cur.execute("""
+                        UPDATE trade_logs
+                        SET exit_price = %s,
+                            pnl = CASE WHEN COALESCE(entry_price, 0) = 0 THEN pnl
+                                       WHEN ai_action = 'BUY' THEN %s - entry_price
+                                       ELSE entry_price - %s END
+                        WHERE id = %s;
+                    """, (exit_price, exit_price, exit_price, row_id))
+            print(f"📝 Exit fill confirmed for ID {row_id}: {exit_price}")
+        except Exception as e:
+            print(f"❌ Failed to update exit fill: {e}")
+
     def get_all_open_symbols(self):
         """Returns a list of symbols that are currently 'OPEN' in the DB."""
-        if not self.conn: return []
+        if not self.pool.available(): return []
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("SELECT DISTINCT symbol FROM trade_logs WHERE status = 'OPEN';")
                 rows = cur.fetchall()
                 return [r[0] for r in rows]
@@ -246,10 +530,11 @@ class DatabaseHandler:
         """
         Marks a trade as CLOSED_MANUAL. 
         If estimated_price is provided, calculates per-unit PnL.
+        Returns the row id, None if nothing was closed.
         """
-        if not self.conn: return
+        if not self.pool.available(): return
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 # 1. Fetch Entry details
                 cur.execute("""
                     SELECT id, entry_price, ai_action FROM trade_logs 
@@ -284,32 +569,110 @@ class DatabaseHandler:
                 
                 note = f"(Est. PnL: {pnl:.4f})" if estimated_price else "(No Price Info)"
                 print(f"🧹 Zombie Trade Cleaned: {symbol} marked as CLOSED_MANUAL {note}")
-                
+                return log_id
+
         except Exception as e:
             print(f"❌ Failed to close zombie trade: {e}")
 
+    def close_trades(self, exits):
+        """
+        Batched close_zombie_trade: exits = {symbol: exit_price or None}.
+        Marks the latest OPEN row of every symbol CLOSED_MANUAL in one statement
+        (one transaction), with per-unit PnL where a price is known.
+        Returns {symbol: row id} for the rows closed.
+        """
+        if not exits or not self.pool.available(): return {}
+        try:
+            with self.cursor() as cur:
+                rows = execute_values(cur, """
+                    UPDATE trade_logs AS t
+                    SET status = 'CLOSED_MANUAL',
+                        exit_price = COALESCE(v.exit_price, 0),
+                        pnl = CASE WHEN v.exit_price IS NULL OR COALESCE(t.entry_price, 0) = 0 THEN 0
+                                   WHEN t.ai_action = 'BUY' THEN v.exit_price - t.entry_price
+                                   ELSE t.entry_price - v.exit_price END,
+                        exit_timestamp = NOW()
+                    FROM (VALUES %s) AS v(symbol, exit_price)
+                    WHERE t.id = (SELECT o.id FROM trade_logs o
+                                  WHERE o.symbol = v.symbol AND o.status = 'OPEN'
+                                  ORDER BY o.id DESC LIMIT 1)
+                    RETURNING t.symbol, t.id;
+                """, list(exits.items()), template="(%s, %s::float)", fetch=True)
+            closed = dict(rows)
+            print(f"🧹 Closed {len(closed)}/{len(exits)} trades as CLOSED_MANUAL in one batch.")
+            return closed
+        except Exception as e:
+            print(f"❌ Failed to batch close trades: {e}")
+            return {}
+
+    def save_cached_signal(self, cache_key, symbol, signal):
+        if not self.pool.available(): return
+        try:
+            with self.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO ai_signal_cache (cache_key, symbol, signal, created_at)
+                    VALUES (%s, %s, %s, NOW())
+                    ON CONFLICT (cache_key) DO UPDATE SET signal = EXCLUDED.signal, created_at = NOW();
+                """, (cache_key, symbol, Json(signal)))
+        except Exception as e:
+            print(f"❌ Failed to persist cached signal: {e}")
+
+    def load_cached_signals(self, max_age, limit):
+        """
+        Cached AI decisions younger than max_age seconds (newest `limit`), as
+        [(cache_key, symbol, signal, age_seconds)]. Expired rows are pruned.
+        """
+        if not self.pool.available(): return []
+        try:
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM ai_signal_cache WHERE created_at < NOW() - make_interval(secs => %s);", (max_age,))
+                cur.execute("""
+                    SELECT cache_key, symbol, signal, EXTRACT(EPOCH FROM NOW() - created_at)
+                    FROM ai_signal_cache ORDER BY created_at DESC LIMIT %s;
+                """, (limit,))
+                return [(k, sym, sig, float(age)) for k, sym, sig, age in cur.fetchall()]
+        except Exception as e:
+            print(f"❌ Failed to load cached signals: {e}")
+            return []
+
     def get_config(self, key, default=None):
-        """Fetches a dynamic config value from DB."""
-        if not self.conn: return default
+        """Fetches a dynamic config value from DB (from memory while LISTEN keeps it fresh)."""
+        cached = self._config_cached()
+        if cached:
+            with self._cache_lock:
+                if key in self._config_cache:
+                    value = self._config_cache[key]
+                    return default if value is None else value
+                gen = self._config_gen
+
+        if not self.pool.available(): return default
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("SELECT value FROM bot_configs WHERE key = %s", (key,))
                 row = cur.fetchone()
-                return row[0] if row else default
+                value = row[0] if row else None
+            if cached:
+                with self._cache_lock:
+                    # Skip if a notification invalidated the key while we were reading
+                    if gen == self._config_gen:
+                        self._config_cache[key] = value
+            return default if value is None else value
         except Exception as e:
             print(f"❌ DB Config Read Error ({key}): {e}")
             return default
 
     def set_config(self, key, value):
         """Sets a dynamic config value in DB."""
-        if not self.conn: return False
+        if not self.pool.available(): return False
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     INSERT INTO bot_configs (key, value, updated_at) 
                     VALUES (%s, %s, NOW())
                     ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = NOW();
                 """, (key, str(value)))
+                cur.execute("SELECT pg_notify(%s, %s);", (CONFIG_CHANNEL, key))
+                self._invalidate_config(key)
                 print(f"⚙️ Config Updated: {key} = {value}")
                 return True
         except Exception as e:
@@ -320,13 +683,16 @@ class DatabaseHandler:
 
     def add_command(self, command, params=None):
         """Adds a command to the queue (e.g. CLOSE_POSITION)"""
-        if not self.conn: return False
+        if not self.pool.available(): return False
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     INSERT INTO command_queue (command, params, status)
-                    VALUES (%s, %s, 'PENDING');
+                    VALUES (%s, %s, 'PENDING')
+                    RETURNING id;
                 """, (command, Json(params) if params else '{}'))
+                cmd_id = cur.fetchone()[0]
+                cur.execute("SELECT pg_notify(%s, %s);", (COMMAND_CHANNEL, str(cmd_id)))
             print(f"📥 Command Queued: {command} {params}")
             return True
         except Exception as e:
@@ -335,9 +701,9 @@ class DatabaseHandler:
 
     def get_pending_commands(self):
         """Fetches all PENDING commands."""
-        if not self.conn: return []
+        if not self.pool.available(): return []
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     SELECT id, command, params FROM command_queue
                     WHERE status = 'PENDING'
@@ -350,9 +716,9 @@ class DatabaseHandler:
 
     def mark_command_completed(self, cmd_id):
         """Marks a command as EXECUTED."""
-        if not self.conn: return
+        if not self.pool.available(): return
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     UPDATE command_queue 
                     SET status = 'EXECUTED', executed_at = NOW()
@@ -365,9 +731,9 @@ class DatabaseHandler:
 
     def get_recent_signals(self, limit=5):
         """Fetches recent AI signals."""
-        if not self.conn: return []
+        if not self.pool.available(): return []
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
                     SELECT symbol, ai_action, ai_confidence, timestamp, ai_reasoning 
                     FROM trade_logs 
@@ -380,34 +746,113 @@ class DatabaseHandler:
             return []
 
     def get_pnl_history(self, limit=50):
-        """Fetches closed trades for PnL plotting."""
-        if not self.conn: return []
+        """Fetches the last `limit` closed trades (oldest first) for PnL plotting."""
+        if not self.pool.available(): return []
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 cur.execute("""
-                    SELECT timestamp, pnl FROM trade_logs 
+                    SELECT timestamp, pnl FROM (
+                        SELECT timestamp, pnl, id FROM trade_logs 
+                        WHERE status IN ('CLOSED', 'CLOSED_TP', 'CLOSED_SL', 'CLOSED_MANUAL', 'CLOSED_AI_STALE')
+                        AND pnl IS NOT NULL
+                        ORDER BY timestamp DESC, id DESC LIMIT %s
+                    ) recent
+                    ORDER BY timestamp ASC, id ASC;
+                """, (limit,))
+                return cur.fetchall()
+        except Exception as e:
+            print(f"❌ Failed to fetch PnL history: {e}")
+            return []
+
+    CLOSED_STATUSES = ('CLOSED', 'CLOSED_TP', 'CLOSED_SL', 'CLOSED_MANUAL', 'CLOSED_AI_STALE')
+
+    def get_closed_pnl_since(self, since=None, statuses=None):
+        """
+        Closed trades with a PnL, in close order: [(id, closed_at, pnl)].
+        `since` (epoch seconds) limits it to trades closed at or after that time; None reads all.
+        `statuses` narrows CLOSED_STATUSES (e.g. the dashboard's TP / SL only).
+        """
+        if not self.pool.available(): return []
+        try:
+            with self.cursor() as cur:
+                cur.execute("""
+                    SELECT id, COALESCE(exit_timestamp, timestamp) AS closed_at, pnl FROM trade_logs
                     WHERE status IN ('CLOSED', 'CLOSED_TP', 'CLOSED_SL', 'CLOSED_MANUAL', 'CLOSED_AI_STALE')
+                    AND status = ANY(%s)
                     AND pnl IS NOT NULL
-                    ORDER BY timestamp ASC;
-                """)
+                    AND (%s::float IS NULL OR COALESCE(exit_timestamp, timestamp) >= to_timestamp(%s::float))
+                    ORDER BY closed_at ASC, id ASC;
+                """, (list(statuses or self.CLOSED_STATUSES), since, since))
                 return cur.fetchall()
         except Exception as e:
-            print(f"❌ Failed to fetch PnL history: {e}")
+            print(f"❌ Failed to fetch closed PnL: {e}")
             return []
 
+    # --- Dashboard ---
+
+    FEED_COLUMNS = "id, timestamp, symbol, ai_action, ai_confidence, status, pnl"
+
+    def get_trade_stats(self):
+        """Per-symbol totals from trade_stats: [(symbol, signals, trades, closed, wins, pnl)]."""
+        if not self.pool.available(): return []
+        try:
+            with self.cursor() as cur:
+                cur.execute("SELECT symbol, signals, trades, closed, wins, pnl FROM trade_stats ORDER BY symbol;")
+                return cur.fetchall()
+        except Exception as e:
+            print(f"❌ Failed to fetch trade stats: {e}")
+            return []
+
+    def get_trade_feed(self, after_id=0, limit=20):
+        """Newest rows with id > after_id (at most `limit`, oldest first), without the large text/JSONB columns."""
+        if not self.pool.available(): return []
+        try:
+            with self.cursor() as cur:
+                cur.execute(f"""
+                    SELECT * FROM (
+                        SELECT {self.FEED_COLUMNS} FROM trade_logs WHERE id > %s ORDER BY id DESC LIMIT %s
+                    ) newest ORDER BY id ASC;
+                """, (after_id, limit))
+                return cur.fetchall()
+        except Exception as e:
+            print(f"❌ Failed to fetch trade feed: {e}")
+            return []
+
+    def get_trade_rows(self, ids):
+        """Current feed columns of the given rows (to pick up status / PnL changes)."""
+        if not ids or not self.pool.available(): return []
+        try:
+            with self.cursor() as cur:
+                cur.execute(f"SELECT {self.FEED_COLUMNS} FROM trade_logs WHERE id = ANY(%s);", (list(ids),))
+                return cur.fetchall()
+        except Exception as e:
+            print(f"❌ Failed to fetch trade rows: {e}")
+            return []
+
+    def get_trade_detail(self, row_id):
+        """(ai_reasoning, ma_state) of one row, loaded only when a row is inspected."""
+        if not self.pool.available(): return None, None
+        try:
+            with self.cursor() as cur:
+                cur.execute("SELECT ai_reasoning, ma_state FROM trade_logs WHERE id = %s;", (row_id,))
+                return cur.fetchone() or (None, None)
+        except Exception as e:
+            print(f"❌ Failed to fetch trade detail: {e}")
+            return None, None
+
     def get_last_exit_info(self, symbol):
         """
         Returns (exit_timestamp, status/reason) of the last closed trade.
         Useful for preventing immediate re-entry (Cooldown).
         """
-        if not self.conn: return None, None
+        if not self.pool.available(): return None, None
         try:
-            with self.conn.cursor() as cur:
+            with self.cursor() as cur:
                 # Optimized query: Prefer timestamp, fallback to ID for sequence
                 cur.execute("""
                     SELECT COALESCE(exit_timestamp, timestamp), status 
                     FROM trade_logs 
-                    WHERE symbol = %s AND status LIKE 'CLOSED%'
+                    WHERE symbol = %s AND status LIKE 'CLOSED%%'
                     ORDER BY COALESCE(exit_timestamp, timestamp) DESC, id DESC
                     LIMIT 1;
                 """, (symbol,))
@@ -0,0 +1,559 @@
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import prefilter
+from rate_limiter import priority, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+
+
+class TradingEngine:
+    """
+    Asyncio orchestrator replacing the serial run_bot() loop.
+
+    Every stage (risk monitor, remote commands, Top N scan, zombie reconciliation,
+    stale audit, AI analysis) runs as its own task on its own cadence. Remote
+    commands and config changes are also pushed via Postgres LISTEN/NOTIFY and
+    handled as soon as they arrive; the command poll is only a fallback. Blocking
+    SDK / requests / psycopg2 calls are pushed to thread pools; the risk monitor
+    has a dedicated pool so slow AI or DB work can never delay it.
+    """
+
+    def __init__(self, md, ai, exec_mod, db, notifier):
+        self.md = md
+        self.ai = ai
+        self.exec = exec_mod
+        self.db = db
+        self.notifier = notifier
+
+        self._risk_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="risk")
+        self._io_pool = ThreadPoolExecutor(max_workers=config.ENGINE_IO_WORKERS, thread_name_prefix="io")
+
+        # Shared state (only mutated on the event loop thread)
+        self.is_paused = False
+        self.top_list = []
+        self.current_positions = []
+        self.active_symbols = set()
+        self._positions_at = 0.0        # monotonic time of the last positions snapshot
+        self._entries = {}              # { "SYMBOL": monotonic time of our last entry }
+        self._reserved = set()          # Symbols holding a position slot while their order is in flight
+        self.analysis_timers = {}       # { "SYMBOL": timestamp of last analysis }
+        self._positions_ready = asyncio.Event()
+        self._commands_wakeup = asyncio.Event()  # set by LISTEN/NOTIFY
+        self._listener = None
+
+        # Duration of recent ticks per stage, for monitoring / benchmarks
+        self.tick_stats = {}
+        self.last_analysis_pass = {}
+        self._circuit_state = None      # last AI circuit state written to bot_configs
+        self.last_prefilter = {}        # pass/skip counts of the last pre-filter gate
+
+    # --- Helpers ---
+
+    async def _run(self, pool, level, fn, *args, **kwargs):
+        def call():
+            # Orderly calls made inside inherit this rate-limit lane
+            with priority(level):
+                return fn(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, call)
+
+    async def _io(self, fn, *args, **kwargs):
+        """Runs a blocking call on the general I/O pool."""
+        return await self._run(self._io_pool, PRIORITY_NORMAL, fn, *args, **kwargs)
+
+    async def _analytics_io(self, fn, *args, **kwargs):
+        """Blocking call on the I/O pool in the low-priority rate-limit lane."""
+        return await self._run(self._io_pool, PRIORITY_LOW, fn, *args, **kwargs)
+
+    async def _risk_io(self, fn, *args, **kwargs):
+        """Runs a blocking call on the pool reserved for the risk monitor (high-priority lane)."""
+        return await self._run(self._risk_pool, PRIORITY_HIGH, fn, *args, **kwargs)
+
+    async def _every(self, name, period, fn):
+        """Runs `fn` on a fixed cadence. Errors are logged and the loop keeps going."""
+        stats = self.tick_stats.setdefault(name, deque(maxlen=200))
+        next_run = time.monotonic()
+        while True:
+            started = time.monotonic()
+            try:
+                await fn()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error in {name} loop: {e}")
+            stats.append(time.monotonic() - started)
+
+            next_run += period
+            delay = next_run - time.monotonic()
+            if delay < 0:
+                # Overran the period: start the next tick now, don't try to catch up
+                next_run = time.monotonic()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def _on_wakeup(self, name, event, period, fn):
+        """Like _every, but also runs `fn` as soon as `event` is set. `period` is re-read each tick."""
+        stats = self.tick_stats.setdefault(name, deque(maxlen=200))
+        while True:
+            try:
+                await asyncio.wait_for(event.wait(), timeout=period())
+            except asyncio.TimeoutError:
+                pass
+            event.clear()
+            started = time.monotonic()
+            try:
+                await fn()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error in {name} loop: {e}")
+            stats.append(time.monotonic() - started)
+
+    def _start_listener(self):
+        """Subscribes to DB notifications; they wake the command loop from the listener thread."""
+        loop = asyncio.get_running_loop()
+
+        def on_notify(channel, payload):
+            loop.call_soon_threadsafe(self._commands_wakeup.set)
+
+        try:
+            self._listener = self.db.listen(on_notify)
+        except Exception as e:
+            print(f"⚠️ LISTEN unavailable, polling commands every {config.COMMAND_POLL_INTERVAL}s: {e}")
+
+    def _command_poll_period(self):
+        if self._listener is not None and self._listener.connected:
+            return config.COMMAND_SAFETY_POLL
+        return config.COMMAND_POLL_INTERVAL
+
+    def held_symbols(self):
+        """Symbols held on exchange, plus entries placed after the last positions snapshot."""
+        recent = {s for s, t in self._entries.items() if t > self._positions_at}
+        return self.active_symbols | recent
+
+    def slots_full(self):
+        return len(self.held_symbols() | self._reserved) >= config.MAX_OPEN_POSITIONS
+
+    def _reserve_slot(self, symbol):
+        """
+        Claims one of MAX_OPEN_POSITIONS for an order about to be placed.
+        Check-and-claim has no await in between, so it is atomic on the event loop:
+        two workers can never both take the last slot.
+        """
+        if self.slots_full():
+            return False
+        self._reserved.add(symbol)
+        return True
+
+    # --- Stages ---
+
+    async def refresh_positions(self):
+        positions_resp = await self._risk_io(self.md.get_positions)
+        current_positions = []
+        if positions_resp and isinstance(positions_resp, dict) and 'data' in positions_resp and 'rows' in positions_resp['data']:
+            current_positions = positions_resp['data']['rows']
+
+        self.current_positions = current_positions
+        self.active_symbols = {p['symbol'] for p in current_positions if float(p.get('position_qty', 0)) != 0}
+        self._positions_at = time.monotonic()
+        self._positions_ready.set()
+        return current_positions
+
+    async def risk_tick(self):
+        """Fetch all open positions and check them against TP/SL (Mechanical Layer)."""
+        positions = await self.refresh_positions()
+        await self._risk_io(self.exec.monitor_risks, positions, self.md)
+
+    async def refresh_controls(self):
+        # Protocol: DB is the source of truth for controls
+        is_paused_str = await self._io(self.db.get_config, "is_paused", "false")
+        if is_paused_str == "true" and not self.is_paused:
+            print("⏸️ Bot is PAUSED by remote command.")
+        self.is_paused = (is_paused_str == "true")
+
+        # Sync Position Size
+        size_str = await self._io(self.db.get_config, "position_size", "30.0")
+        try:
+            config.POSITION_SIZE_USDC = float(size_str)
+        except:
+            pass
+
+    async def command_tick(self):
+        await self.refresh_controls()
+
+        pending_cmds = await self._io(self.db.get_pending_commands)
+        for cmd in pending_cmds:
+            cmd_id, command, params = cmd
+            print(f"📥 Processing Remote Command: {command} {params}")
+            await self.handle_command(command, params)
+            # Mark Complete
+            await self._io(self.db.mark_command_completed, cmd_id)
+
+    async def handle_command(self, command, params):
+        if command == "CLOSE_POSITION":
+            target_symbol = params.get('symbol')
+            try:
+                pos_info = await self._risk_io(self.md.client.get_one_position_info, target_symbol)
+                if pos_info and 'data' in pos_info:
+                    qty = float(pos_info['data'].get('position_qty', 0))
+                    if qty != 0:
+                        side = "SELL" if qty > 0 else "BUY"
+                        await self._risk_io(self.exec.close_position, target_symbol, abs(qty), side)
+                        self.notifier.send_message(f"✅ **Remote Close Executed**: {target_symbol}", priority=PRIORITY_HIGH)
+                    else:
+                        self.notifier.send_message(f"⚠️ **Remote Close Failed**: No open position for {target_symbol}")
+            except Exception as e:
+                print(f"❌ Failed to execute remote close: {e}")
+
+        elif command == "FORCE_ANALYZE":
+            print("🧠 Processing Force Audit Command...")
+            try:
+                positions = await self.refresh_positions()
+                active_p = [p for p in positions if float(p.get('position_qty', 0)) != 0]
+                if active_p:
+                    self.notifier.send_message(f"🧠 **Auditing {len(active_p)} Positions...**", priority=PRIORITY_LOW)
+                    await self._io(self.exec.audit_positions, active_p, self.md, self.ai, force=True)
+                else:
+                    self.notifier.send_message("⚠️ No active positions to audit.")
+            except Exception as e:
+                print(f"❌ Force Audit Error: {e}")
+
+        elif command == "CLOSE_ALL":
+            print("🚨 Processing PANIC CLOSE ALL...")
+            # 1. Pause Bot (update local state immediately)
+            self.is_paused = True
+            await self._io(self.db.set_config, "is_paused", "true")
+            self.notifier.send_message("⏸️ **Bot PAUSED by Panic Protocol**", priority=PRIORITY_HIGH)
+
+            # 2. Close All
+            try:
+                positions = await self.refresh_positions()
+                active_p = [p for p in positions if float(p.get('position_qty', 0)) != 0]
+
+                if not active_p:
+                    self.notifier.send_message("✅ No active positions to close.")
+                else:
+                    # Concurrent reduce-only closes, parallel fill checks, one DB write for all exits
+                    result = await self._risk_io(self.exec.close_all, active_p)
+                    msg = (f"✅ **Panic Complete**: Closed {len(result['closed'])}/{len(active_p)} positions "
+                           f"in {result['time_to_flat']:.2f}s and logged exits.")
+                    if result['failed']:
+                        msg += f"\n⚠️ Failed: {', '.join(result['failed'])}"
+                    self.notifier.send_message(msg, priority=PRIORITY_HIGH)
+            except Exception as e:
+                print(f"❌ Panic Close Failed: {e}")
+                self.notifier.send_message(f"❌ **Panic Failed**: {e}", priority=PRIORITY_HIGH)
+
+    async def scan_tick(self):
+        if not config.ENABLE_TOP_10:
+            self.top_list = [config.SYMBOL]
+            return
+
+        print("🔍 Scanning market for Top 5 Volume Tokens...")
+        new_top = await self._analytics_io(self.md.get_top_10_symbols)
+        if new_top:
+            self.top_list = new_top
+            print(f"✅ Top 5 Updated: {self.top_list}")
+        else:
+            print("⚠️ Failed to update Top 10. Using fallback/previous list.")
+            if not self.top_list: self.top_list = [config.SYMBOL]
+
+    async def reconcile_tick(self):
+        """
+        DB Reconciliation (Clean Manual Closes).
+        If a trade is OPEN in DB but has 0 qty on exchange, mark it as CLOSED_MANUAL.
+        """
+        # Read the DB *before* fetching positions: a row only becomes OPEN after its
+        # order filled, so any OPEN row we see here is already visible on the exchange.
+        db_open_symbols = await self._io(self.db.get_all_open_symbols)
+        if not db_open_symbols:
+            return
+        await self.refresh_positions()
+
+        for sym in db_open_symbols:
+            if sym not in self.active_symbols:
+                # Fetch current price to estimate PnL
+                est_price = 0
+                try:
+                    candles = await self._io(self.md.get_ohlcv, sym, "1m", 1)
+                    if candles: est_price = float(candles[-1]['close'])
+                except Exception as e:
+                    print(f"⚠️ Failed to fetch price for zombie {sym}: {e}")
+
+                await self._io(self.db.close_zombie_trade, sym, est_price)
+                # Notify
+                self.notifier.send_message(f"🧹 **Zombie Trade Closed**: {sym}\nPrice: {est_price}")
+
+    async def audit_tick(self):
+        """Periodically ask AI to review old trades (Cognitive Layer)."""
+        if self.is_paused:
+            return
+        await self._positions_ready.wait()
+        print("🧠 Running Stale Position AI Check...")
+        await self._io(self.exec.audit_positions, self.current_positions, self.md, self.ai, force=False)
+
+    async def analysis_tick(self):
+        if self.is_paused:
+            print("💤 Paused... skipping analysis.")
+            return
+        if not self._positions_ready.is_set() or not self.top_list:
+            return
+
+        # Rule: Only analyze if (No Position) AND (Interval Passed) AND (Max Positions Not Reached)
+        now = time.time()
+        held = self.held_symbols() | self._reserved
+        candidates = [(rank, symbol) for rank, symbol in enumerate(list(self.top_list), start=1)
+                      if symbol not in held and now - self.analysis_timers.get(symbol, 0) >= config.INTERVAL]
+        if not candidates or self.slots_full():
+            return
+
+        # Shed load while the AI dependency is failing: no AI calls at all while the
+        # circuit is open, a single symbol as the probe while it is half-open
+        circuit = self.ai.circuit()
+        await self._publish_circuit(circuit)
+        if circuit['state'] == "OPEN":
+            print(f"⛔ AI circuit open ({circuit['reason']}): skipping analysis of {len(candidates)} symbols.")
+            self.last_analysis_pass = {'symbols': 0, 'shed': len(candidates), 'workers': 0, 'wall': 0.0, 'serial': 0.0}
+            return
+        if circuit['state'] == "HALF_OPEN":
+            candidates = candidates[:1]
+
+        # Cheap rule-based gate for all candidates at once, before any AI call
+        fetched = await asyncio.gather(*(
+            self._analytics_io(self.md.get_indicators, symbol, timeframe="15m", limit=100)
+            for _, symbol in candidates), return_exceptions=True)
+        prefetched = {symbol: inds for (_, symbol), inds in zip(candidates, fetched) if isinstance(inds, dict)}
+        verdicts = prefilter.screen({symbol: prefetched.get(symbol) for _, symbol in candidates})
+
+        queue = asyncio.Queue()
+        for rank, symbol in candidates:
+            if verdicts.get(symbol):
+                print(f"🚧 {symbol} skipped by pre-filter: {verdicts[symbol]}")
+            else:
+                queue.put_nowait((rank, symbol))
+        self.last_prefilter = {'passed': queue.qsize(), 'skipped': len(candidates) - queue.qsize()}
+        print(f"🚧 Pre-filter: {self.last_prefilter['passed']} passed, {self.last_prefilter['skipped']} skipped")
+        if queue.empty():
+            return
+
+        # Per-pass AI time budget: calls are capped to what is left, the rest waits for the next pass
+        budget_end = time.monotonic() + config.AI_TICK_BUDGET
+
+        if config.AI_BATCH_MODE:
+            items = []
+            while not queue.empty():
+                rank, symbol = queue.get_nowait()
+                items.append((rank, symbol, prefetched.get(symbol)))
+            started = time.monotonic()
+            await self.analyze_batch(items, time.time(), timeout=config.AI_TICK_BUDGET)
+            wall = time.monotonic() - started
+            self.last_analysis_pass = {'symbols': len(items), 'shed': 0, 'workers': 1, 'wall': wall, 'serial': wall}
+            print(f"⏱️ Analysis pass (batch): {len(items)} symbols in {wall:.2f}s")
+            await self._publish_circuit(self.ai.circuit())
+            return
+
+        durations, shed = [], []
+
+        async def worker():
+            while not queue.empty():
+                rank, symbol = queue.get_nowait()
+                if self.slots_full():
+                    # Skip analysis if we are full
+                    continue
+                remaining = budget_end - time.monotonic()
+                if remaining <= 0 or self.ai.circuit()['state'] == "OPEN":
+                    shed.append(symbol)
+                    continue
+                started = time.monotonic()
+                await self.analyze_symbol(symbol, rank, time.time(), inds=prefetched.get(symbol),
+                                          ai_timeout=min(config.AI_DEADLINE, remaining))
+                durations.append(time.monotonic() - started)
+
+        workers = max(1, min(config.ANALYSIS_WORKERS, queue.qsize()))
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        wall = time.monotonic() - started
+
+        serial = sum(durations)
+        self.last_analysis_pass = {'symbols': len(durations), 'shed': len(shed), 'workers': workers, 'wall': wall, 'serial': serial}
+        if durations:
+            print(f"⏱️ Analysis pass: {len(durations)} symbols x {workers} workers in {wall:.2f}s (serial ≈ {serial:.2f}s)")
+        if shed:
+            print(f"⛔ AI budget/circuit: {len(shed)} symbols deferred to the next pass ({', '.join(shed)})")
+        await self._publish_circuit(self.ai.circuit())
+
+    async def _publish_circuit(self, circuit):
+        """Stores the AI circuit state in bot_configs ('ai_circuit') whenever it changes, for Telegram /status."""
+        if circuit['state'] == self._circuit_state:
+            return
+        self._circuit_state = circuit['state']
+        await self._io(self.db.set_config, "ai_circuit", json.dumps(circuit))
+
+    async def analyze_symbol(self, symbol, rank, current_time, inds=None, ai_timeout=None):
+        """
+        Cooldown check, indicators (unless already fetched for the pre-filter), AI signal and execution for one symbol.
+        Returns True if a position was opened, False if analysed without entry,
+        None if skipped before any API call (cooldown).
+        """
+        ctx = await self._prepare_symbol(symbol, rank, current_time, inds)
+        if not ctx:
+            return ctx
+
+        print(f"🧠 Asking AI for {symbol}...")
+        signal = await self.ai.analyze_market_async(symbol, ctx['candles'], indicators=ctx['indicators'],
+                                                    last_exit=ctx['last_exit'], timeout=ai_timeout)
+        return await self._act_on_signal(ctx, signal)
+
+    async def analyze_batch(self, items, current_time, timeout=None):
+        """
+        AI_BATCH_MODE: prepares every (rank, symbol) in `items`, asks the AI about all
+        of them in batched requests, then acts on the signals in rank order.
+        Returns the number of positions opened.
+        """
+        prepared = await asyncio.gather(*(
+            self._prepare_symbol(symbol, rank, current_time, inds) for rank, symbol, inds in items))
+        ready = [ctx for ctx in prepared if ctx]
+        if not ready:
+            return 0
+
+        print(f"🧠 Asking AI for {len(ready)} symbols in batch mode...")
+        signals = await self.ai.analyze_batch_async([
+            {'symbol': ctx['symbol'], 'candles': ctx['candles'], 'indicators': ctx['indicators'], 'last_exit': ctx['last_exit']}
+            for ctx in ready], timeout=timeout)
+
+        opened = 0
+        for ctx in ready:
+            if self.slots_full():
+                break
+            opened += bool(await self._act_on_signal(ctx, signals.get(ctx['symbol'])))
+        return opened
+
+    async def _prepare_symbol(self, symbol, rank, current_time, inds=None):
+        """
+        Cooldown check, candles and indicators for one symbol.
+        Returns the analysis context, None if in cooldown, False if data is incomplete.
+        """
+        # --- Cooldown Check (Mechanical Layer) ---
+        last_exit_ts, last_exit_reason = await self._io(self.db.get_last_exit_info, symbol)
+        current_exit_context = None
+
+        if last_exit_ts:
+            # Convert to timestamp
+            ts_val = last_exit_ts.timestamp()
+            CANDLE_SECONDS = 900 # 15m
+
+            last_candle_idx = int(ts_val // CANDLE_SECONDS)
+            curr_candle_idx = int(current_time // CANDLE_SECONDS)
+
+            diff = curr_candle_idx - last_candle_idx
+            if diff < config.REENTRY_COOLDOWN_CANDLES:
+                print(f"🧊 Cooldown Active for {symbol} | Diff: {diff} candles < {config.REENTRY_COOLDOWN_CANDLES} | Last Exit: {last_exit_ts.strftime('%H:%M')} | Reason: {last_exit_reason}")
+                self.analysis_timers[symbol] = current_time
+                return None
+            else:
+                print(f"✅ Cooldown Expired for {symbol} (Diff: {diff})")
+
+            # Prepare context for AI if recent (e.g. < 4 hours)
+            if diff < 16: # 4 hours = 16 candles
+                current_exit_context = {'time': last_exit_ts, 'reason': last_exit_reason, 'candles_ago': diff}
+
+        print(f"👉 Analyzing {symbol} (Rank #{rank})...")
+        # Update Last Analysis Time for this symbol
+        self.analysis_timers[symbol] = current_time
+
+        # Fetch 100 candles
+        candles_15m = await self._analytics_io(self.md.get_ohlcv, symbol, timeframe="15m", limit=100)
+        if not candles_15m:
+            print(f"⚠️ {symbol} Data incomplete.")
+            return False
+
+        # Indicators from the streaming state kept next to the candle buffer
+        if inds is None:
+            inds = await self._analytics_io(self.md.get_indicators, symbol, timeframe="15m", limit=100)
+        # Inject Rank for DB Logging
+        inds['market_rank'] = rank
+
+        print(f"📊 {symbol} Indicators: Price={inds['current_price']}, MA60={inds['MA_LONG']}")
+        return {'symbol': symbol, 'time': current_time, 'candles': candles_15m,
+                'indicators': inds, 'last_exit': current_exit_context}
+
+    async def _act_on_signal(self, ctx, signal):
+        """Logs, notifies and (if valid and a slot is free) executes one AI signal. Returns True if a position was opened."""
+        symbol, inds = ctx['symbol'], ctx['indicators']
+        if not signal:
+            print(f"⚠️ {symbol} AI analysis failed/empty.")
+            return False
+
+        # Inject Entry Price for Execution Logic
+        signal['entry_price'] = inds['current_price']
+        signal['log_id'] = f"{symbol}_{int(ctx['time'])}"
+
+        # Log signal to DB
+        await self._io(self.db.log_signal, symbol, signal, inds)
+
+        print(f"💡 {symbol} Signal: {signal.get('action')} (Conf: {signal.get('confidence')})")
+
+        # Notify Signal
+        self.notifier.send_message(
+            f"🧠 **AI Signal Generated**\n"
+            f"Symbol: `{symbol}`\n"
+            f"Action: **{signal.get('action')}**\n"
+            f"Confidence: {signal.get('confidence')}\n"
+            f"Reason: _{signal.get('reasoning')}_",
+            priority=PRIORITY_LOW
+        )
+
+        opened = False
+        if self.exec.validate_signal(signal):
+            if not self._reserve_slot(symbol):
+                print(f"🚫 {symbol} Signal skipped: MAX_OPEN_POSITIONS ({config.MAX_OPEN_POSITIONS}) reached")
+            else:
+                try:
+                    response = await self._io(self.exec.execute_trade, signal, symbol)
+                    if response and signal.get('action') in ["BUY", "SELL"]:
+                        self._entries[symbol] = time.monotonic()
+                        opened = True
+                finally:
+                    self._reserved.discard(symbol)
+        else:
+            print(f"⏸️ {symbol} Signal skipped")
+        return opened
+
+    # --- Lifecycle ---
+
+    async def run(self):
+        print(f"⚙️ Engine cadences: risk={config.RISK_INTERVAL}s commands={config.COMMAND_POLL_INTERVAL}s "
+              f"analysis={config.POLL_INTERVAL}s scan={config.SCAN_INTERVAL}s audit={config.STALE_CHECK_INTERVAL}s")
+        self._start_listener()
+        await self.refresh_controls()
+        await self.scan_tick()
+
+        tasks = [
+            asyncio.create_task(self._every("risk", config.RISK_INTERVAL, self.risk_tick)),
+            asyncio.create_task(self._on_wakeup("commands", self._commands_wakeup, self._command_poll_period, self.command_tick)),
+            asyncio.create_task(self._every("reconcile", config.POLL_INTERVAL, self.reconcile_tick)),
+            asyncio.create_task(self._every("analysis", config.POLL_INTERVAL, self.analysis_tick)),
+        ]
+        # First scan/audit already done (or due) at startup; delay their next run by one period
+        tasks.append(asyncio.create_task(self._delayed(config.SCAN_INTERVAL, "scan", config.SCAN_INTERVAL, self.scan_tick)))
+        tasks.append(asyncio.create_task(self._every("audit", config.STALE_CHECK_INTERVAL, self.audit_tick)))
+
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for t in tasks:
+                t.cancel()
+            if self._listener:
+                self.db.stop_listening()
+            self.close()
+
+    async def _delayed(self, delay, name, period, fn):
+        await asyncio.sleep(delay)
+        await self._every(name, period, fn)
+
+    def close(self):
+        self._risk_pool.shutdown(wait=False, cancel_futures=True)
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
@@ -1,13 +1,162 @@
 import config
 import decimal
+import threading
 import time
 import math
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from fill_tracker import FillTracker
+from market_data import PriceSnapshot, SymbolRules
+from notifier import get_notifier
+from rate_limiter import priority, PRIORITY_HIGH, PRIORITY_LOW
+
+
+class PositionStateCache:
+    """
+    In-memory open-trade state per symbol: (log_id, hwm_price, entry_price, entry_time).
+
+    Loaded from trade_logs once (one query for all symbols, warmed at startup
+    by main.py), then served from memory so the risk hot path makes no DB
+    round-trips. HWM moves are written behind: the latest price per log_id is
+    coalesced and flushed in one batched UPDATE at most HWM_FLUSH_INTERVAL
+    seconds later, and by Execution.flush_state() on shutdown.
+
+    DB reads never run under the state lock, so set_hwm() / flush_if_due()
+    on the risk threads are not held up by a query.
+    """
+
+    EMPTY = (None, 0, 0, None)
+
+    def __init__(self, db):
+        self.db = db
+        self._states = {}   # symbol -> (log_id, hwm, entry, entry_time)
+        self._dirty = {}    # log_id -> latest HWM not yet persisted
+        self._loaded = False
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()  # one bulk load at a time; _lock is only taken after the query
+        self.stats = {'hits': 0, 'misses': 0, 'flushes': 0, 'rows_flushed': 0}
+
+    def load(self):
+        """Bulk-loads every open trade. Returns the number of symbols loaded."""
+        with self._load_lock:
+            return self._load()
+
+    def _load(self):
+        states = (self.db.get_open_trade_states() if self.db else {}) or {}
+        with self._lock:
+            for symbol, state in states.items():
+                # A put() made while the query ran is newer than the row read
+                self._states.setdefault(symbol, state)
+            self._loaded = True
+        return len(states)
+
+    def get(self, symbol):
+        if not self._loaded:
+            # Double-checked: one thread queries, the others wait for it (not for _lock)
+            with self._load_lock:
+                if not self._loaded:
+                    self._load()
+        with self._lock:
+            state = self._states.get(symbol)
+            if state is not None:
+                self.stats['hits'] += 1
+                return state
+            self.stats['misses'] += 1
+
+        # Not in the bulk load (e.g. opened by another process): single-row fallback
+        state = self.db.get_open_trade_state(symbol) if self.db else self.EMPTY
+        if state[0]:
+            with self._lock:
+                # The DB may lag behind an HWM that is still waiting to be flushed
+                if state[0] in self._dirty:
+                    state = (state[0], self._dirty[state[0]], state[2], state[3])
+                state = self._states.setdefault(symbol, state)
+        return state
+
+    def put(self, symbol, log_id, hwm_price, entry_price, entry_time=None):
+        with self._lock:
+            self._states[symbol] = (log_id, hwm_price, entry_price, entry_time or datetime.datetime.now())
+
+    def set_hwm(self, symbol, hwm_price):
+        with self._lock:
+            log_id, _, entry, entry_time = self._states.get(symbol, self.EMPTY)
+            if not log_id:
+                return
+            self._states[symbol] = (log_id, hwm_price, entry, entry_time)
+            self._dirty[log_id] = hwm_price
+
+    def drop(self, symbol):
+        """Forget a closed trade (pending HWM writes for it are still flushed)."""
+        with self._lock:
+            self._states.pop(symbol, None)
+
+    def retain(self, symbols):
+        """Drop symbols that are no longer held on the exchange."""
+        with self._lock:
+            for symbol in set(self._states) - set(symbols):
+                del self._states[symbol]
+
+    def flush(self):
+        with self._lock:
+            pending, self._dirty = self._dirty, {}
+            self._last_flush = time.monotonic()
+        if not pending or not self.db:
+            return 0
+        if not self.db.update_highest_prices(list(pending.items())):
+            with self._lock:
+                # Keep for the next attempt unless a newer HWM arrived meanwhile
+                for log_id, price in pending.items():
+                    self._dirty.setdefault(log_id, price)
+            return 0
+        with self._lock:
+            self.stats['flushes'] += 1
+            self.stats['rows_flushed'] += len(pending)
+        return len(pending)
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= config.HWM_FLUSH_INTERVAL:
+            return self.flush()
+        return 0
+
 
 class Execution:
-    def __init__(self, client, db_handler=None):
+    def __init__(self, client, db_handler=None, rules=None):
         self.client = client
         self.db = db_handler
+        self.rules = rules or SymbolRules(client) # Shared with MarketData when passed in
+        self.fills = FillTracker(client)
+        self.notifier = get_notifier() # Process-wide queue, sends never block trading threads
+        self.positions = PositionStateCache(db_handler)
+
+    def flush_state(self):
+        """Persist pending HWM updates and in-flight fill confirmations (call on shutdown)."""
+        self.fills.close()
+        return self.positions.flush()
+
+    def track_exit(self, response, row_id, pnl_of=None, label=""):
+        """Once the close order's fill is confirmed, replace the estimated exit of trade_logs row `row_id`."""
+        if not self.db or not row_id:
+            return None
+        return self.fills.track(
+            response,
+            lambda price: self.db.update_exit_fill(row_id, price, pnl_of(price) if pnl_of else None),
+            label=label)
+
+    def _record_close(self, symbol, response, exit_price, est_price, avg_price, qty, status):
+        """Logs the close with the best price known now; a pending fill corrects it later. Returns PnL."""
+        def pnl_of(price):
+            return (price - avg_price) * qty if qty > 0 else (avg_price - price) * abs(qty)
+
+        final_price = exit_price if exit_price > 0 else est_price
+        pnl_amount = pnl_of(final_price)
+        if self.db:
+            row_id = self.db.log_pnl(symbol, final_price, pnl_amount, status)
+            if not exit_price:
+                self.track_exit(response, row_id, pnl_of, label=f"{symbol} exit")
+        self.positions.drop(symbol)
+        return pnl_amount
 
     def validate_signal(self, signal):
         if not signal:
@@ -30,10 +179,7 @@ class Execution:
 
 
     def execute_trade(self, signal, symbol):
-        # NEW: Init Notifier locally to avoid passing it everywhere (or pass in init)
-        # Ideally, pass in __init__, but for minimal diff we import here or use passed client
-        from notifier import TelegramNotifier
-        notifier = TelegramNotifier()
+        notifier = self.notifier
         
         try:
             action = signal.get('action')
@@ -49,14 +195,13 @@ class Execution:
                  print("⚠️ Signal missing entry price, skipping trade.")
                  return None
 
-            # 2. Get Trading Rules (Filters)
-            rules = self.client.get_exchange_info(symbol)
-            base_tick = 0.01 # Default fallback
-            min_notional = 10.0 # Default
-            
-            if rules and 'data' in rules:
-                base_tick = float(rules['data'].get('base_tick', 0.01))
-                min_notional = float(rules['data'].get('min_notional', 10.0))
+            # 2. Get Trading Rules (Filters) - from memory, no request on the order path
+            rules = self.rules.get(symbol)
+            if not rules:
+                print(f"❌ No trading rules known for {symbol}, skipping trade.")
+                return None
+            base_tick = rules['base_tick']
+            min_notional = rules.get('min_notional', 0.0)
 
             # 3. Calculate Quantity
             # qty = Target Value / Price
@@ -106,24 +251,10 @@ class Execution:
                 # Extract executed price roughly
                 executed_price = float(response.get('data', {}).get('average_executed_price', 0))
                 
-                # Robust Fallback: Verify with Position Data
-                # If API didn't return fill price (async), check actual position
-                if executed_price == 0:
-                    print("⏳ Waiting for fill confirmation...")
-                    time.sleep(1) # Give exchange a moment to process
-                    # We need access to market data headers to fetch position
-                    # Since execution class doesn't have 'md' in init, we rely on passed arguments or fetching
-                    # Strategy: Use existing client to get position info directly
-                    try:
-                        pos_info = self.client.get_one_position_info(symbol)
-                        if pos_info and 'data' in pos_info:
-                             executed_price = float(pos_info['data'].get('average_open_price', 0))
-                             print(f"🔄 Fetched actual Entry Price from Position: {executed_price}")
-                    except Exception as e:
-                        print(f"⚠️ Failed to fetch position info: {e}")
-
-                if executed_price == 0:
-                     executed_price = float(signal.get('entry_price', 0)) # Final Fallback
+                # Async fill: log the signal price now, the FillTracker corrects it once confirmed
+                pending_fill = executed_price == 0
+                if pending_fill:
+                     executed_price = float(signal.get('entry_price', 0)) # Estimate until the fill is confirmed
 
                 print(f"✅ Trade executed: {action} {order_quantity} {symbol} @ {executed_price}")
                 
@@ -131,19 +262,27 @@ class Execution:
                 notifier.send_message(
                     f"🚀 **Order Executed**\n"
                     f"{side} {order_quantity} `{symbol}`\n"
-                    f"Price: {executed_price}\n"
-                    f"Val: {order_quantity * executed_price:.2f} USDC"
+                    f"Price: {executed_price}{' (est.)' if pending_fill else ''}\n"
+                    f"Val: {order_quantity * executed_price:.2f} USDC",
+                    priority=PRIORITY_HIGH
                 )
 
                 # DB Logging
-                if self.db and signal.get('log_id'):
-                    self.db.log_trade(signal.get('log_id'), executed_price, "OPEN")
+                log_id = signal.get('log_id')
+                if self.db and log_id:
+                    self.db.log_trade(log_id, executed_price, "OPEN")
+                    self.positions.put(symbol, log_id, executed_price, executed_price)
+                    if pending_fill:
+                        def on_fill(price, symbol=symbol, log_id=log_id):
+                            self.positions.put(symbol, log_id, price, price)
+                            self.db.update_entry_price(log_id, price)
+                        self.fills.track(response, on_fill, label=f"{symbol} entry")
                 
                 print(f"✅ Order placed: {response}")
                 return response
             else:
                 print(f"❌ Order failed or not successful: {response}")
-                notifier.send_message(f"⚠️ **Order Failed**: {symbol}\nResponse: {response}")
+                notifier.send_message(f"⚠️ **Order Failed**: {symbol}\nResponse: {response}", priority=PRIORITY_HIGH)
                 return None
             
         except Exception as e:
@@ -151,8 +290,7 @@ class Execution:
             return None
 
     def close_position(self, symbol, quantity, side):
-        from notifier import TelegramNotifier
-        notifier = TelegramNotifier()
+        notifier = self.notifier
         
         """
         Closes a position by placing an opposing market order.
@@ -172,37 +310,74 @@ class Execution:
             # 1. Try to get executed price from immediate response
             executed_price = float(response.get('data', {}).get('average_executed_price', 0))
             
-            # 2. If 0 (Async), fetch order details
+            # 2. If 0 (Async), the caller logs an estimate and FillTracker confirms it (no blocking wait)
             if executed_price == 0 and response.get('success'):
-                order_id = response.get('data', {}).get('order_id')
-                if order_id:
-                    print(f"⏳ Closing Order {order_id} sent. Waiting for confirmation...")
-                    time.sleep(1) # Wait for matching
-                    try:
-                        order_info = self.client.get_order(order_id)
-                        if order_info and 'data' in order_info:
-                             executed_price = float(order_info['data'].get('average_executed_price', 0))
-                             print(f"✅ Position Closed. Actual Exit Price: {executed_price}")
-                    except Exception as e:
-                        print(f"⚠️ Failed to fetch close order info: {e}")
+                print(f"⏳ Closing Order {FillTracker.order_id(response)} sent. Fill will be confirmed in background.")
 
             print(f"✅ Position Closed: {response}")
             return response, executed_price
         except Exception as e:
             print(f"❌ Close failed: {e}")
-            notifier.send_message(f"⚠️ **Close Failed**: {symbol}\nError: {e}")
+            notifier.send_message(f"⚠️ **Close Failed**: {symbol}\nError: {e}", priority=PRIORITY_HIGH)
             return None, 0
 
+    def close_all(self, positions):
+        """
+        Panic path: flattens every non-zero position at once.
+
+        All reduce-only market orders are sent concurrently (paced by the order
+        rate limit, high-priority lane) and each worker confirms its own fill,
+        so the last close no longer waits behind the others. Exits are then
+        written in one statement. Unconfirmed fills fall back to the mark price.
+        Returns {'closed': [...], 'failed': [...], 'time_to_flat': seconds}.
+        """
+        active = [p for p in positions if float(p.get('position_qty', 0)) != 0]
+        if not active:
+            return {'closed': [], 'failed': [], 'time_to_flat': 0.0}
+
+        started = time.monotonic()
+
+        def flatten(pos):
+            qty = float(pos['position_qty'])
+            with priority(PRIORITY_HIGH):
+                print(f"🚨 Panic Closing {pos['symbol']} ({qty})...")
+                resp, exit_price = self.close_position(pos['symbol'], abs(qty), "SELL" if qty > 0 else "BUY")
+                if not resp or not resp.get('success'):
+                    return pos['symbol'], None, None
+                if not exit_price and FillTracker.order_id(resp):
+                    exit_price = self.fills.wait(FillTracker.order_id(resp))
+            return pos['symbol'], exit_price, time.monotonic() - started
+
+        workers = max(1, min(len(active), config.PANIC_CLOSE_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="panic") as pool:
+            results = list(pool.map(flatten, active))
+
+        marks = {p['symbol']: float(p.get('mark_price') or 0) for p in active}
+        closed = [(sym, price, t) for sym, price, t in results if t is not None]
+        failed = [sym for sym, _, t in results if t is None]
+        time_to_flat = max((t for _, _, t in closed), default=0.0)
+
+        if self.db and closed:
+            # Confirmed fill where we have one, else the mark price as an estimate
+            self.db.close_trades({sym: price or marks.get(sym) or None for sym, price, _ in closed})
+        for sym, _, _ in closed:
+            self.positions.drop(sym)
+        return {'closed': [sym for sym, _, _ in closed], 'failed': failed, 'time_to_flat': time_to_flat}
+
     def monitor_risks(self, positions, md):
-        from notifier import TelegramNotifier
-        notifier = TelegramNotifier()
+        notifier = self.notifier
         
         """
         Checks open positions against TP/SL thresholds.
         supports multi-token monitoring.
         """
-        if not positions or not isinstance(positions, list):
+        if not isinstance(positions, list):
             return
+        # Positions list is the full exchange state: forget trades that are gone
+        self.positions.retain(p.get('symbol') for p in positions if float(p.get('position_qty', 0)) != 0)
+
+        # One pass for all prices (positions mark / all-markets info), orderbook only as fallback
+        prices = PriceSnapshot.capture(md, positions)
 
         for pos in positions:
             symbol = pos.get('symbol')
@@ -210,46 +385,11 @@ class Execution:
             if qty == 0:
                 continue
             
-            # Fetch current market price for this specific symbol
-            # We use the MarketData handler passed in
-            current_price = 0
-            
-            # 1. Try Orderbook (Best Accuracy)
-            for attempt in range(3):
-                try:
-                    ob = md.get_orderbook(symbol)
-                    # Handle Orderly SDK response structure: {'success': True, 'data': {'asks':..., 'bids':...}}
-                    if ob and 'data' in ob and 'asks' in ob['data'] and 'bids' in ob['data']:
-                        asks = ob['data']['asks']
-                        bids = ob['data']['bids']
-                        if len(asks) > 0 and len(bids) > 0:
-                            best_ask = float(asks[0]['price'])
-                            best_bid = float(bids[0]['price'])
-                            current_price = (best_ask + best_bid) / 2
-                            break # Success
-                    # Fallback for flat structure (just in case mock or different version)
-                    elif ob and 'asks' in ob and 'bids' in ob and len(ob['asks']) > 0:
-                        best_ask = float(ob['asks'][0]['price'])
-                        best_bid = float(ob['bids'][0]['price'])
-                        current_price = (best_ask + best_bid) / 2
-                        break
-                except Exception as e:
-                    time.sleep(0.5) # Short backoff
-            
-            # 2. Fallback to Candles (If OB failed)
-            if current_price == 0:
-                print(f"⚠️ Orderbook failed for {symbol}, trying fallback (OHLCV)...")
-                try:
-                    # Request 1 minute candle for latest price
-                    candles = md.get_ohlcv(symbol, timeframe="1m", limit=1)
-                    if candles and len(candles) > 0:
-                        current_price = float(candles[-1]['close'])
-                        print(f"✅ Fallback successful: {current_price}")
-                except Exception as e:
-                    print(f"❌ Fallback failed for {symbol}: {e}")
+            # Price from the snapshot taken for all held symbols at once
+            current_price = prices.get(symbol)
             
             if current_price == 0:
-                 print(f"❌ Could not fetch price for {symbol} after retries. Skipping risk check.")
+                 print(f"❌ Could not fetch price for {symbol} from any source. Skipping risk check.")
                  continue
 
             # Determine direction & avg price
@@ -269,12 +409,13 @@ class Execution:
                 base_sl = avg_price * (1 - config.SL_PERCENT)
                 
                 # Fetch High Water Mark (Highest Price) from DB
-                log_id, hwm_price, db_entry, entry_time = self.db.get_open_trade_state(symbol) if self.db else (None, 0, 0, None)
+                log_id, hwm_price, db_entry, entry_time = self.positions.get(symbol)
                 
                 # Adopt Orphan Position (If not in DB)
                 if self.db and not log_id:
                     log_id = self.db.register_orphan_trade(symbol, avg_price, 'BUY')
                     hwm_price = avg_price
+                    if log_id: self.positions.put(symbol, log_id, hwm_price, avg_price)
 
                 # Check DB Stale/Mismatch: If DB Entry differs significantly from API Entry, ignore DB
                 # Check DB Stale/Mismatch
@@ -290,8 +431,8 @@ class Execution:
                 # Update HWM if current price is higher
                 if current_price > hwm_price:
                     hwm_price = current_price
-                    if self.db and log_id:
-                        self.db.update_highest_price(log_id, hwm_price)
+                    if log_id:
+                        self.positions.set_hwm(symbol, hwm_price)  # persisted write-behind
 
                 # Stepped Trailing Stop Logic (Stateful)
                 # We use HWM to check if a Tier was EVER reached
@@ -311,31 +452,26 @@ class Execution:
                     sl_type = "TS Tier 1 (Fees Covered)"
                 
                 # Check
-                print(f"📊 LONG {qty} {symbol} | Entry: {avg_price:.4f} | Mark: {current_price:.4f} | CurPnL: {current_pnl_pct*100:.2f}% | MaxPnL: {max_pnl_pct*100:.2f}%")
+                print(f"📊 LONG {qty} {symbol} | Entry: {avg_price:.4f} | Mark: {current_price:.4f} ({prices.source(symbol)}, {prices.age(symbol):.1f}s) | CurPnL: {current_pnl_pct*100:.2f}% | MaxPnL: {max_pnl_pct*100:.2f}%")
                 print(f"   🎯 TP: {tp_price:.4f} | 🛑 {sl_type}: {effective_sl:.4f}")
                 
                 if current_price >= tp_price:
                     print(f"💰 TP Triggered for LONG {symbol}: Price {current_price} >= {tp_price}")
-                    _, exit_price = self.close_position(symbol, abs_qty, "SELL")
-                    if self.db:
-                        # Use real exit price if available, else current_price
-                        final_price = exit_price if exit_price > 0 else current_price
-                        pnl_amount = (final_price - avg_price) * abs_qty
-                        self.db.log_pnl(symbol, final_price, pnl_amount, "CLOSED_TP")
+                    resp, exit_price = self.close_position(symbol, abs_qty, "SELL")
+                    # Real exit price if available, else current_price until the fill is confirmed
+                    pnl_amount = self._record_close(symbol, resp, exit_price, current_price, avg_price, qty, "CLOSED_TP")
                     
                     # Notify
-                    notifier.send_message(f"💰 **Take Profit**\n`{symbol}` LONG Closed.\nPnL: {pnl_amount:.2f} USDC")
+                    notifier.send_message(f"💰 **Take Profit**\n`{symbol}` LONG Closed.\nPnL: {pnl_amount:.2f} USDC", priority=PRIORITY_HIGH)
                         
                 elif current_price <= effective_sl:
                     print(f"🛑 SL Triggered ({sl_type}) for LONG {symbol}: Price {current_price} <= {effective_sl}")
-                    _, exit_price = self.close_position(symbol, abs_qty, "SELL")
-                    if self.db:
-                        final_price = exit_price if exit_price > 0 else current_price
-                        pnl_amount = (final_price - avg_price) * abs_qty
-                        self.db.log_pnl(symbol, final_price, pnl_amount, "CLOSED_SL")
+                    resp, exit_price = self.close_position(symbol, abs_qty, "SELL")
+                    # Real exit price if available, else current_price until the fill is confirmed
+                    pnl_amount = self._record_close(symbol, resp, exit_price, current_price, avg_price, qty, "CLOSED_SL")
                     
                     # Notify
-                    notifier.send_message(f"🛑 **Stop Loss ({sl_type})**\n`{symbol}` LONG Closed.\nPnL: {pnl_amount:.2f} USDC")
+                    notifier.send_message(f"🛑 **Stop Loss ({sl_type})**\n`{symbol}` LONG Closed.\nPnL: {pnl_amount:.2f} USDC", priority=PRIORITY_HIGH)
                     
             else:
                 # SHORT: TP < Entry, SL > Entry
@@ -344,12 +480,13 @@ class Execution:
                 
                 # Fetch High Water Mark (Lowest Price for Short) from DB
                 # Note: We reuse 'highest_price' column to store the 'Best Price' seen
-                log_id, hwm_price, db_entry, entry_time = self.db.get_open_trade_state(symbol) if self.db else (None, 0, 0, None)
+                log_id, hwm_price, db_entry, entry_time = self.positions.get(symbol)
                 
                 # Adopt Orphan Position (If not in DB)
                 if self.db and not log_id:
                     log_id = self.db.register_orphan_trade(symbol, avg_price, 'SELL')
                     hwm_price = avg_price
+                    if log_id: self.positions.put(symbol, log_id, hwm_price, avg_price)
 
                 # Check DB Stale/Mismatch
                 if db_entry and abs(db_entry - avg_price) > (avg_price * 0.01):
@@ -364,8 +501,8 @@ class Execution:
                 # Update HWM (Best Price) if current price is LOWER (Better for Short)
                 if current_price < hwm_price:
                     hwm_price = current_price
-                    if self.db and log_id:
-                        self.db.update_highest_price(log_id, hwm_price)
+                    if log_id:
+                        self.positions.set_hwm(symbol, hwm_price)  # persisted write-behind
 
                 # Stepped Trailing Stop Logic (Stateful)
                 # Max PnL for Short = (Entry - Lowest_Price) / Entry
@@ -385,34 +522,32 @@ class Execution:
                     sl_type = "TS Tier 1 (Fees Covered)"
                 
                 # Check
-                print(f"📊 SHORT {abs_qty} {symbol} | Entry: {avg_price:.4f} | Mark: {current_price:.4f} | CurPnL: {current_pnl_pct*100:.2f}% | MaxPnL: {max_pnl_pct*100:.2f}%")
+                print(f"📊 SHORT {abs_qty} {symbol} | Entry: {avg_price:.4f} | Mark: {current_price:.4f} ({prices.source(symbol)}, {prices.age(symbol):.1f}s) | CurPnL: {current_pnl_pct*100:.2f}% | MaxPnL: {max_pnl_pct*100:.2f}%")
                 print(f"   🎯 TP: {tp_price:.4f} | 🛑 {sl_type}: {effective_sl:.4f}")
                 
                 if current_price <= tp_price:
                     print(f"💰 TP Triggered for SHORT {symbol}: Price {current_price} <= {tp_price}")
-                    _, exit_price = self.close_position(symbol, abs_qty, "BUY")
-                    if self.db:
-                        final_price = exit_price if exit_price > 0 else current_price
-                        pnl_amount = (avg_price - final_price) * abs_qty
-                        self.db.log_pnl(symbol, final_price, pnl_amount, "CLOSED_TP")
+                    resp, exit_price = self.close_position(symbol, abs_qty, "BUY")
+                    # Real exit price if available, else current_price until the fill is confirmed
+                    pnl_amount = self._record_close(symbol, resp, exit_price, current_price, avg_price, qty, "CLOSED_TP")
                     
                     # Notify
-                    notifier.send_message(f"💰 **Take Profit**\n`{symbol}` SHORT Closed.\nPnL: {pnl_amount:.2f} USDC")
+                    notifier.send_message(f"💰 **Take Profit**\n`{symbol}` SHORT Closed.\nPnL: {pnl_amount:.2f} USDC", priority=PRIORITY_HIGH)
                         
                 elif current_price >= effective_sl:
                     print(f"🛑 SL Triggered ({sl_type}) for SHORT {symbol}: Price {current_price} >= {effective_sl}")
-                    _, exit_price = self.close_position(symbol, abs_qty, "BUY")
-                    if self.db:
-                        final_price = exit_price if exit_price > 0 else current_price
-                        pnl_amount = (avg_price - final_price) * abs_qty
-                        self.db.log_pnl(symbol, final_price, pnl_amount, "CLOSED_SL")
+                    resp, exit_price = self.close_position(symbol, abs_qty, "BUY")
+                    # Real exit price if available, else current_price until the fill is confirmed
+                    pnl_amount = self._record_close(symbol, resp, exit_price, current_price, avg_price, qty, "CLOSED_SL")
                     
                     # Notify
-                    notifier.send_message(f"🛑 **Stop Loss ({sl_type})**\n`{symbol}` SHORT Closed.\nPnL: {pnl_amount:.2f} USDC")
+                    notifier.send_message(f"🛑 **Stop Loss ({sl_type})**\n`{symbol}` SHORT Closed.\nPnL: {pnl_amount:.2f} USDC", priority=PRIORITY_HIGH)
+
+        # Write-behind: batched HWM persistence with bounded lag
+        self.positions.flush_if_due()
 
     def audit_positions(self, positions, md, ai, force=False):
-        from notifier import TelegramNotifier
-        notifier = TelegramNotifier()
+        notifier = self.notifier
         
         """
         Iterates through active positions and asks AI to review them.
@@ -429,7 +564,7 @@ class Execution:
             if qty == 0: continue
             
             # Fetch State
-            log_id, hwm_price, db_entry, entry_time = self.db.get_open_trade_state(symbol)
+            log_id, hwm_price, db_entry, entry_time = self.positions.get(symbol)
             
             # If no entry time in DB, we can't calc age, but if force=True we might still want to check?
             # For now, if no DB entry, we skip unless we just assume 0 age.
@@ -482,14 +617,11 @@ class Execution:
                 if decision == "CLOSE":
                     print(f"🛑 AI Decided to CLOSE {symbol} (Reason: Trend Invalidated)")
                     side = "SELL" if qty > 0 else "BUY"
-                    _, exit_price = self.close_position(symbol, abs(qty), side)
-                    if self.db:
-                        final_price = exit_price if exit_price > 0 else mark_price
-                        pnl_val = (final_price - avg_price) * qty if qty > 0 else (avg_price - final_price) * abs(qty)
-                        self.db.log_pnl(symbol, final_price, pnl_val, "CLOSED_AI_AUDIT")
+                    resp, exit_price = self.close_position(symbol, abs(qty), side)
+                    self._record_close(symbol, resp, exit_price, mark_price, avg_price, qty, "CLOSED_AI_AUDIT")
                     
-                    notifier.send_message(f"🧠 **AI Close ({audit_reason})**\n`{symbol}` held for {hours_held:.1f}h.\nTrend Invalidated.")
+                    notifier.send_message(f"🧠 **AI Close ({audit_reason})**\n`{symbol}` held for {hours_held:.1f}h.\nTrend Invalidated.", priority=PRIORITY_HIGH)
                 else:
                      print(f"🧘 AI Decided to HOLD {symbol}.")
                      if force:
-                         notifier.send_message(f"🧠 **AI Audit Result**\n`{symbol}`: **HOLD**\n_(Trend still valid)_")
+                         notifier.send_message(f"🧠 **AI Audit Result**\n`{symbol}`: **HOLD**\n_(Trend still valid)_", priority=PRIORITY_LOW)
@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+FILLED = "FILLED"
+DEAD_STATUSES = ("CANCELLED", "REJECTED", "EXPIRED")
+
+
+class FillTracker:
+    """
+    Resolves the executed price of market orders without blocking the order path.
+
+    track() polls get_order on a short exponential schedule (FILL_POLL_START,
+    doubling up to FILL_POLL_MAX) until FILL_TIMEOUT, on a small background
+    pool, and calls on_fill(price) once the fill is confirmed. Polling is the
+    only source of fills: no private execution stream is subscribed.
+    """
+
+    def __init__(self, client, max_workers=4):
+        self.client = client
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fills")
+        self.stats = {'tracked': 0, 'filled': 0, 'timeouts': 0, 'polls': 0}
+
+    @staticmethod
+    def order_id(response):
+        if isinstance(response, dict) and isinstance(response.get('data'), dict):
+            return response['data'].get('order_id')
+        return None
+
+    def _poll(self, order_id):
+        """(price, done) from one get_order call: done is True once the order can no longer fill."""
+        self.stats['polls'] += 1
+        try:
+            info = self.client.get_order(order_id)
+        except Exception as e:
+            print(f"⚠️ Failed to fetch order {order_id}: {e}")
+            return 0.0, False
+        data = info.get('data') if isinstance(info, dict) else None
+        if not isinstance(data, dict):
+            return 0.0, False
+        price = float(data.get('average_executed_price') or 0)
+        status = data.get('status')
+        if status == FILLED and price > 0:
+            return price, True
+        if status in DEAD_STATUSES:
+            return price, True # Partially filled before cancel, or nothing
+        return 0.0, False
+
+    def wait(self, order_id, timeout=None):
+        """Blocks until the order's executed price is known; 0 if not confirmed before the deadline."""
+        deadline = time.monotonic() + (config.FILL_TIMEOUT if timeout is None else timeout)
+        delay = config.FILL_POLL_START
+        while True:
+            price, done = self._poll(order_id)
+            if done:
+                return price
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.stats['timeouts'] += 1
+                return 0.0
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, config.FILL_POLL_MAX)
+
+    def _resolve(self, order_id, on_fill, label):
+        price = self.wait(order_id)
+        if not price:
+            print(f"⚠️ Fill for {label} (order {order_id}) not confirmed within {config.FILL_TIMEOUT}s; keeping estimate.")
+            return 0.0
+        self.stats['filled'] += 1
+        print(f"✅ Fill confirmed for {label}: {price}")
+        try:
+            on_fill(price)
+        except Exception as e:
+            print(f"❌ Fill callback failed for {label}: {e}")
+        return price
+
+    def track(self, response, on_fill, label=""):
+        """
+        Resolves the order in `response` in the background and calls on_fill(price).
+        Returns a Future with the price (0 if unconfirmed), or None if the response has no order id.
+        """
+        order_id = self.order_id(response)
+        if not order_id:
+            return None
+        self.stats['tracked'] += 1
+        return self._pool.submit(self._resolve, order_id, on_fill, label or str(order_id))
+
+    def close(self, wait=True):
+        """Waits for in-flight fills so their DB updates land before shutdown."""
+        self._pool.shutdown(wait=wait)
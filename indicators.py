@@ -1,3 +1,14 @@
+import math
+from collections import deque
+from operator import itemgetter
+
+import numpy as np
+
+import config
+
+# Column order of the OHLCV arrays used by the vectorized engine
+OPEN, HIGH, LOW, CLOSE, VOLUME = range(5)
+
 
 def calculate_sma(prices, period):
     """
@@ -6,27 +17,405 @@ def calculate_sma(prices, period):
     """
     if len(prices) < period:
         return None
-    
+
     # We only need the latest SMA for the prompt context
     # Usually strategy needs the lateset value
     selection = prices[-period:]
     return sum(selection) / period
 
-def calculate_indicators(candles):
+
+# --- Vectorized engine ---
+# Every function works on the last axis, so the same call handles one symbol
+# (shape (candles,)) or the whole universe (shape (symbols, candles)).
+
+_ohlcv_getter = itemgetter('open', 'high', 'low', 'close', 'volume')
+
+
+def to_ohlcv_array(candles):
+    """Raw candle dicts -> float array of shape (candles, 5): open, high, low, close, volume."""
+    try:
+        return np.array([_ohlcv_getter(c) for c in candles], dtype=float).reshape(-1, 5)
+    except (KeyError, TypeError, ValueError):
+        pass
+
+    # Slow path: tolerate candles with only a close (or empty volume)
+    rows = []
+    for c in candles:
+        close = float(c['close'])
+        rows.append((
+            float(c.get('open', close)),
+            float(c.get('high', close)),
+            float(c.get('low', close)),
+            close,
+            float(c.get('volume', 0) or 0),
+        ))
+    return np.array(rows, dtype=float).reshape(-1, 5)
+
+
+def sma_series(x, period):
+    """Rolling mean via cumulative sums. NaN until `period` values are available."""
+    x = np.asarray(x, dtype=float)
+    out = np.full(x.shape, np.nan)
+    n = x.shape[-1]
+    if period <= 0 or n < period:
+        return out
+    c = np.cumsum(x, axis=-1)
+    c = np.concatenate([np.zeros(x.shape[:-1] + (1,)), c], axis=-1)
+    out[..., period - 1:] = (c[..., period:] - c[..., :-period]) / period
+    return out
+
+
+def rolling_std(x, period):
+    """Rolling population standard deviation. NaN until `period` values are available."""
+    x = np.asarray(x, dtype=float)
+    if period <= 0 or x.shape[-1] < period:
+        return np.full(x.shape, np.nan)
+    # Centre each row first so E[x^2] - E[x]^2 does not cancel catastrophically
+    centred = x - x.mean(axis=-1, keepdims=True)
+    var = sma_series(centred * centred, period) - sma_series(centred, period) ** 2
+    return np.sqrt(np.clip(var, 0, None))
+
+
+def _smooth(x, alpha, seed):
     """
-    Takes raw candle data and calculates MA30, MA45, MA60.
+    Vectorized first-order recursion y[t] = (1 - alpha) * y[t-1] + alpha * x[t],
+    starting from y[-1] = seed. Solved block-wise with cumulative sums so the
+    only Python loop is over blocks, and the scaling factors stay finite.
     """
-    closes = [float(c['close']) for c in candles]
-    
-    import config
-    
-    ma_short = calculate_sma(closes, config.MA_SHORT)
-    ma_medium = calculate_sma(closes, config.MA_MEDIUM)
-    ma_long = calculate_sma(closes, config.MA_LONG)
-    
+    x = np.asarray(x, dtype=float)
+    decay = 1.0 - alpha
+    if decay <= 0:
+        return x.copy()
+
+    out = np.empty(x.shape)
+    block = max(1, min(128, int(250 / -math.log10(decay)))) if decay < 1 else x.shape[-1] or 1
+    powers = decay ** np.arange(1, block + 1)
+    prev = np.asarray(seed, dtype=float)
+    for start in range(0, x.shape[-1], block):
+        blk = x[..., start:start + block]
+        p = powers[:blk.shape[-1]]
+        # y_j = decay^(j+1) * prev + alpha * sum_k decay^(j-k) * x_k
+        y = p * (prev[..., None] + alpha * np.cumsum(blk / p, axis=-1))
+        out[..., start:start + blk.shape[-1]] = y
+        prev = y[..., -1]
+    return out
+
+
+def ema_series(x, period):
+    """Exponential moving average (alpha = 2 / (period + 1)), seeded with the first value."""
+    x = np.asarray(x, dtype=float)
+    if x.shape[-1] == 0:
+        return x.copy()
+    return _smooth(x, 2.0 / (period + 1), x[..., 0])
+
+
+def wilder_series(x, period):
+    """Wilder smoothing (alpha = 1 / period), seeded with the SMA of the first `period` values."""
+    x = np.asarray(x, dtype=float)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] < period:
+        return out
+    seed = x[..., :period].mean(axis=-1)
+    out[..., period - 1] = seed
+    out[..., period:] = _smooth(x[..., period:], 1.0 / period, seed)
+    return out
+
+
+def rsi_series(close, period):
+    """Wilder RSI. NaN for the first `period` candles."""
+    close = np.asarray(close, dtype=float)
+    out = np.full(close.shape, np.nan)
+    if close.shape[-1] <= period:
+        return out
+    delta = np.diff(close, axis=-1)
+    avg_gain = wilder_series(np.clip(delta, 0, None), period)
+    avg_loss = wilder_series(np.clip(-delta, 0, None), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    rsi = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi)
+    out[..., 1:] = np.where(np.isnan(avg_gain), np.nan, rsi)
+    return out
+
+
+def atr_series(high, low, close, period):
+    """Wilder Average True Range."""
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    prev_close = np.concatenate([close[..., :1], close[..., :-1]], axis=-1)
+    tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return wilder_series(tr, period)
+
+
+def vwap_series(high, low, close, volume, period):
+    """Rolling VWAP of the typical price over `period` candles (or all candles if fewer)."""
+    high, low, close, volume = (np.asarray(a, dtype=float) for a in (high, low, close, volume))
+    period = max(1, min(period, close.shape[-1]))
+    typical = (high + low + close) / 3
+    pv = sma_series(typical * volume, period)
+    v = sma_series(volume, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(v > 0, pv / v, np.nan)
+
+
+def zscore_series(x, period):
+    """(x - rolling mean) / rolling std; 0 where the window is flat."""
+    x = np.asarray(x, dtype=float)
+    mean = sma_series(x, period)
+    std = rolling_std(x, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (x - mean) / std
+    return np.where(std == 0, 0.0, z)
+
+
+def compute_series(ohlcv):
+    """
+    Full indicator series for an OHLCV array of shape (candles, 5) or (symbols, candles, 5).
+    Returns a dict of arrays shaped (candles,) or (symbols, candles).
+    """
+    ohlcv = np.asarray(ohlcv, dtype=float)
+    o, h, l, c, v = (ohlcv[..., i] for i in range(5))
+    mid = sma_series(c, config.BB_PERIOD)
+    band = rolling_std(c, config.BB_PERIOD) * config.BB_STD
     return {
-        "MA_SHORT": ma_short,
-        "MA_MEDIUM": ma_medium,
-        "MA_LONG": ma_long,
-        "current_price": closes[-1] if closes else 0
+        "MA_SHORT": sma_series(c, config.MA_SHORT),
+        "MA_MEDIUM": sma_series(c, config.MA_MEDIUM),
+        "MA_LONG": sma_series(c, config.MA_LONG),
+        "EMA_FAST": ema_series(c, config.EMA_FAST),
+        "EMA_SLOW": ema_series(c, config.EMA_SLOW),
+        "RSI": rsi_series(c, config.RSI_PERIOD),
+        "ATR": atr_series(h, l, c, config.ATR_PERIOD),
+        "BB_UPPER": mid + band,
+        "BB_MIDDLE": mid,
+        "BB_LOWER": mid - band,
+        "VWAP": vwap_series(h, l, c, v, config.VWAP_PERIOD),
+        "VOLUME_Z": zscore_series(v, config.VOLUME_Z_PERIOD),
+        "current_price": c,
     }
+
+
+def _latest(series):
+    """Last value of each series as plain floats (None for NaN) so the dict stays JSON-safe."""
+    result = {}
+    for key, arr in series.items():
+        value = float(arr[..., -1]) if arr.shape[-1] else float('nan')
+        result[key] = None if math.isnan(value) else value
+    return result
+
+
+def calculate_indicators(candles):
+    """
+    Takes raw candle data and calculates MA30, MA45, MA60 plus EMA, RSI, ATR,
+    Bollinger Bands, VWAP and volume z-score (latest values).
+    """
+    if not candles:
+        return {"MA_SHORT": None, "MA_MEDIUM": None, "MA_LONG": None, "current_price": 0}
+
+    inds = _latest(compute_series(to_ohlcv_array(candles)))
+    if inds["current_price"] is None:
+        inds["current_price"] = 0
+    return inds
+
+
+# --- Streaming engine ---
+# O(1) per closed candle. State lives in the CandleStore between ticks, so the
+# analysis pass only pays for candles that closed since the last one.
+
+class _Rolling:
+    """Rolling sum / sum of squares over the last `period` values."""
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.shift = 0.0  # sums are kept around `shift` to avoid cancellation in the variance
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self._pushes = 0
+
+    def push(self, x):
+        self.window.append(x)
+        d = x - self.shift
+        self.sum += d
+        self.sumsq += d * d
+        if len(self.window) > self.period:
+            old = self.window.popleft() - self.shift
+            self.sum -= old
+            self.sumsq -= old * old
+        self._pushes += 1
+        if self._pushes >= self.period:
+            self._resync()
+
+    def _resync(self):
+        """Exact recompute once per `period` pushes: amortized O(1), no float drift."""
+        self._pushes = 0
+        self.shift = math.fsum(self.window) / len(self.window)
+        self.sum = math.fsum(v - self.shift for v in self.window)
+        self.sumsq = math.fsum((v - self.shift) ** 2 for v in self.window)
+
+    def _peek(self, x):
+        n, s, sq = len(self.window), self.sum, self.sumsq
+        if x is not None:
+            d = x - self.shift
+            s, sq, n = s + d, sq + d * d, n + 1
+            if n > self.period:
+                old = self.window[0] - self.shift
+                s, sq, n = s - old, sq - old * old, n - 1
+        return n, s, sq
+
+    def mean(self, x=None, partial=False):
+        n, s, _ = self._peek(x)
+        if n == 0 or (n < self.period and not partial):
+            return None
+        return self.shift + s / n
+
+    def std(self, x=None):
+        n, s, sq = self._peek(x)
+        if n < self.period:
+            return None
+        return math.sqrt(max(sq / n - (s / n) ** 2, 0.0))
+
+
+class _Ema:
+    def __init__(self, period):
+        self.alpha = 2.0 / (period + 1)
+        self.value = None
+
+    def push(self, x):
+        self.value = self.peek(x)
+
+    def peek(self, x=None):
+        if x is None or self.value is None:
+            return x if self.value is None else self.value
+        return self.alpha * x + (1 - self.alpha) * self.value
+
+
+class _Wilder:
+    """Wilder smoothing seeded with the mean of the first `period` values."""
+
+    def __init__(self, period):
+        self.period = period
+        self.seed = []
+        self.value = None
+
+    def push(self, x):
+        if self.value is None:
+            self.seed.append(x)
+            if len(self.seed) == self.period:
+                self.value = sum(self.seed) / self.period
+                self.seed = None
+        else:
+            self.value = self.peek(x)
+
+    def peek(self, x=None):
+        if x is None:
+            return self.value
+        if self.value is None:
+            return sum(self.seed + [x]) / self.period if len(self.seed) + 1 == self.period else None
+        return self.value + (x - self.value) / self.period
+
+
+class IncrementalIndicators:
+    """
+    Streaming version of calculate_indicators for one (symbol, timeframe).
+
+    update() consumes each closed candle once in O(1); values() returns the same
+    keys as calculate_indicators, optionally previewing the still-open candle
+    without committing it to the state.
+    """
+
+    def __init__(self):
+        self.last_end = None  # end_timestamp of the last consumed candle
+        self.count = 0
+        self.prev_close = None
+        self.ma = {key: _Rolling(getattr(config, key)) for key in ("MA_SHORT", "MA_MEDIUM", "MA_LONG")}
+        self.bb = _Rolling(config.BB_PERIOD)
+        self.ema_fast = _Ema(config.EMA_FAST)
+        self.ema_slow = _Ema(config.EMA_SLOW)
+        self.avg_gain = _Wilder(config.RSI_PERIOD)
+        self.avg_loss = _Wilder(config.RSI_PERIOD)
+        self.atr = _Wilder(config.ATR_PERIOD)
+        self.vwap_pv = _Rolling(config.VWAP_PERIOD)
+        self.vwap_v = _Rolling(config.VWAP_PERIOD)
+        self.volume = _Rolling(config.VOLUME_Z_PERIOD)
+
+    @classmethod
+    def from_candles(cls, candles):
+        state = cls()
+        for candle in candles:
+            state.update(candle)
+        return state
+
+    @staticmethod
+    def _parse(candle):
+        close = float(candle['close'])
+        return (float(candle.get('high', close)), float(candle.get('low', close)),
+                close, float(candle.get('volume', 0) or 0))
+
+    def _inputs(self, candle):
+        """Per-candle values fed to the rolling components."""
+        high, low, close, volume = self._parse(candle)
+        prev = close if self.prev_close is None else self.prev_close
+        delta = None if self.prev_close is None else close - self.prev_close
+        tr = max(high - low, abs(high - prev), abs(low - prev))
+        return close, volume, (high + low + close) / 3 * volume, delta, tr
+
+    def update(self, candle):
+        close, volume, pv, delta, tr = self._inputs(candle)
+        for ma in self.ma.values():
+            ma.push(close)
+        self.bb.push(close)
+        self.ema_fast.push(close)
+        self.ema_slow.push(close)
+        if delta is not None:
+            self.avg_gain.push(max(delta, 0.0))
+            self.avg_loss.push(max(-delta, 0.0))
+        self.atr.push(tr)
+        self.vwap_pv.push(pv)
+        self.vwap_v.push(volume)
+        self.volume.push(volume)
+        self.prev_close = close
+        self.last_end = candle.get('end_timestamp')
+        self.count += 1
+
+    def values(self, open_candle=None):
+        if open_candle is None:
+            if not self.count:
+                return calculate_indicators([])
+            close, volume, pv, delta = self.prev_close, None, None, None
+            c = tr = None
+        else:
+            close, volume, pv, delta, tr = self._inputs(open_candle)
+            c = close
+
+        gain = self.avg_gain.peek(None if delta is None else max(delta, 0.0))
+        loss = self.avg_loss.peek(None if delta is None else max(-delta, 0.0))
+        if gain is None or loss is None:
+            rsi = None
+        elif loss == 0:
+            rsi = 50.0 if gain == 0 else 100.0
+        else:
+            rsi = 100.0 - 100.0 / (1.0 + gain / loss)
+
+        mid = self.bb.mean(c)
+        band = self.bb.std(c)
+        pv_mean = self.vwap_pv.mean(pv, partial=True)
+        v_mean = self.vwap_v.mean(volume, partial=True)
+        vol_mean, vol_std = self.volume.mean(volume), self.volume.std(volume)
+        last_volume = volume if volume is not None else (self.volume.window[-1] if self.volume.window else None)
+        if vol_std is None:
+            volume_z = None
+        else:
+            volume_z = 0.0 if vol_std == 0 else (last_volume - vol_mean) / vol_std
+
+        inds = {key: ma.mean(c) for key, ma in self.ma.items()}
+        inds.update({
+            "EMA_FAST": self.ema_fast.peek(c),
+            "EMA_SLOW": self.ema_slow.peek(c),
+            "RSI": rsi,
+            "ATR": self.atr.peek(tr),
+            "BB_UPPER": None if mid is None else mid + band * config.BB_STD,
+            "BB_MIDDLE": mid,
+            "BB_LOWER": None if mid is None else mid - band * config.BB_STD,
+            "VWAP": pv_mean / v_mean if v_mean else None,
+            "VOLUME_Z": volume_z,
+            "current_price": close,
+        })
+        return inds
@@ -1,15 +1,18 @@
-from database import DatabaseHandler
+from database import DatabaseHandler, DatabaseUnavailable
 import datetime
 
 db = DatabaseHandler()
-if not db.conn:
+try:
+    with db.connection():
+        pass
+except DatabaseUnavailable:
     print("❌ Could not connect to DB")
     exit()
 
 symbol = 'PERP_ETH_USDC'
 print(f"🔍 Fetching last 10 logs for {symbol}...\n")
 
-with db.conn.cursor() as cur:
+with db.cursor() as cur:
     cur.execute("""
         SELECT id, timestamp, ai_action, entry_price, exit_price, pnl, status, log_id 
         FROM trade_logs 
@@ -1,16 +1,420 @@
 from orderly_evm_connector.rest import Rest as OrderlyClient
+from rate_limiter import RateLimitedClient
+from indicators import IncrementalIndicators, calculate_indicators
+from collections import deque
 import config
+import math
+import threading
+import time
 import traceback
 
+# Kline type -> candle length in seconds
+TIMEFRAME_SECONDS = {
+    "1m": 60, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "4h": 14400, "12h": 43200, "1d": 86400, "1w": 604800,
+}
+MAX_KLINE_LIMIT = 1000 # Orderly kline endpoint maximum
+
+
+class CandleStore:
+    """
+    In-memory ring buffer of klines per (symbol, timeframe).
+
+    The first request backfills the buffer; afterwards only the missing tail
+    (plus the still-open last candle) is fetched and merged by end_timestamp.
+    Buffers younger than CANDLE_STORE_MAX_AGE are served without any request.
+
+    Each buffer can also carry an IncrementalIndicators stream that consumes
+    closed candles once as they arrive; it is only rebuilt when the stream no
+    longer connects to the buffer (gap, backfill past it) or is asked for a
+    different window. A (re)built stream is seeded from the same `limit`
+    candles calculate_indicators(candles[-limit:]) would see, so it starts out
+    identical to the vectorized path. Afterwards SMAs, Bollinger, VWAP and the
+    volume z-score stay exact (fixed windows); EMA / RSI / ATR keep the
+    streamed history instead of restarting from the window's first candle.
+    The gap is the seed's decayed weight, e.g. (1 - 2/27)^100 ~ 5e-4 for
+    EMA_SLOW over a 100-candle window (pinned in tests/test_candle_store.py).
+    """
+
+    def __init__(self, fetch, capacity=None, max_age=None):
+        self._fetch = fetch # fetch(symbol, timeframe, limit) -> list of kline rows
+        self.capacity = capacity or config.CANDLE_STORE_CAPACITY
+        self.max_age = config.CANDLE_STORE_MAX_AGE if max_age is None else max_age
+        self._buffers = {}    # (symbol, timeframe) -> deque of rows (oldest first)
+        self._refreshed = {}  # (symbol, timeframe) -> monotonic time of last fetch
+        self._fetched_at = {} # (symbol, timeframe) -> wall time of last fetch
+        self._streams = {}    # (symbol, timeframe) -> IncrementalIndicators over closed candles
+        self._stream_windows = {} # (symbol, timeframe) -> limit the stream was seeded with
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'tail_fetches': 0, 'requests': 0, 'rows_fetched': 0,
+                      'stream_updates': 0, 'stream_rebuilds': 0}
+
+    def _key_lock(self, key):
+        with self._lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def _request(self, symbol, timeframe, limit):
+        rows = self._fetch(symbol, timeframe, min(limit, MAX_KLINE_LIMIT))
+        self._count('requests')
+        if not isinstance(rows, list):
+            return None
+        rows = [r for r in rows if isinstance(r, dict) and r.get('end_timestamp') is not None]
+        self._count('rows_fetched', len(rows))
+        return sorted(rows, key=lambda r: r['end_timestamp'])
+
+    def _backfill(self, key, symbol, timeframe, limit):
+        rows = self._request(symbol, timeframe, limit)
+        if not rows:
+            return False
+        self._buffers[key] = deque(rows, maxlen=max(self.capacity, limit))
+        self._refreshed[key] = time.monotonic()
+        self._fetched_at[key] = time.time()
+        return True
+
+    def _merge_tail(self, key, symbol, timeframe, tf_seconds):
+        buf = self._buffers[key]
+        last_end = buf[-1]['end_timestamp']
+        # Candles closed since our last one, plus the last (possibly still open) one itself
+        elapsed = max(0.0, time.time() - last_end / 1000)
+        missing = math.ceil(elapsed / tf_seconds) + 1
+        if missing >= min(buf.maxlen, MAX_KLINE_LIMIT):
+            return False # Gap too large: caller backfills
+
+        rows = self._request(symbol, timeframe, missing + 1)
+        if not rows:
+            return False
+        if rows[0]['end_timestamp'] > last_end + tf_seconds * 1000:
+            return False # Fetched tail does not connect to the buffer
+
+        # Replace the overlapping suffix, append the rest
+        while buf and buf[-1]['end_timestamp'] >= rows[0]['end_timestamp']:
+            buf.pop()
+        buf.extend(rows)
+        self._refreshed[key] = time.monotonic()
+        self._fetched_at[key] = time.time()
+        return True
+
+    def get(self, symbol, timeframe, limit):
+        tf_seconds = TIMEFRAME_SECONDS.get(timeframe)
+        if tf_seconds is None:
+            self._count('misses')
+            return self._fetch(symbol, timeframe, limit)
+
+        key = (symbol, timeframe)
+        with self._key_lock(key):
+            buf = self._buffers.get(key)
+            if buf is None or len(buf) < limit:
+                self._count('misses')
+                if not self._backfill(key, symbol, timeframe, limit):
+                    return []
+            elif time.monotonic() - self._refreshed.get(key, 0) < self.max_age:
+                self._count('hits')
+            else:
+                self._count('tail_fetches')
+                if not self._merge_tail(key, symbol, timeframe, tf_seconds):
+                    self._count('misses')
+                    if not self._backfill(key, symbol, timeframe, limit):
+                        return []
+            return list(self._buffers[key])[-limit:]
+
+    def _sync_stream(self, key, tf_seconds, limit):
+        """Feed newly closed candles to the key's stream; rebuild it if they do not connect."""
+        buf = self._buffers[key]
+        # Only rows that had already closed when they were fetched are final
+        final_ms = self._fetched_at.get(key, 0) * 1000
+        step = tf_seconds * 1000
+        stream = self._streams.get(key) if self._stream_windows.get(key) == limit else None
+
+        # Closed candles the stream has not seen yet (newest first while scanning)
+        fresh = []
+        for row in reversed(buf):
+            if row['end_timestamp'] > final_ms:
+                continue # still open (or fetched while open)
+            if stream is not None and stream.last_end is not None and row['end_timestamp'] <= stream.last_end:
+                break
+            fresh.append(row)
+        fresh.reverse()
+
+        connected = stream is not None and stream.last_end is not None and (
+            not fresh or fresh[0]['end_timestamp'] == stream.last_end + step)
+        if not connected:
+            closed = [r for r in buf if r['end_timestamp'] <= final_ms]
+            # The window ends with the open candle when there is one (previewed by values())
+            seed = limit - 1 if buf[-1]['end_timestamp'] > final_ms else limit
+            self._streams[key] = IncrementalIndicators.from_candles(closed[-seed:] if seed > 0 else [])
+            self._stream_windows[key] = limit
+            self._count('stream_rebuilds')
+            return self._streams[key]
+
+        for row in fresh:
+            stream.update(row)
+        self._count('stream_updates', len(fresh))
+        return stream
+
+    def indicators(self, symbol, timeframe, limit):
+        """
+        Latest indicators for (symbol, timeframe) from the streaming state,
+        including the still-open candle. Same keys as calculate_indicators;
+        the stream is seeded from the last `limit` candles (see class docstring).
+        """
+        candles = self.get(symbol, timeframe, limit)
+        tf_seconds = TIMEFRAME_SECONDS.get(timeframe)
+        key = (symbol, timeframe)
+        if not candles or tf_seconds is None or key not in self._buffers:
+            return calculate_indicators(candles)
+
+        with self._key_lock(key):
+            stream = self._sync_stream(key, tf_seconds, limit)
+            last = self._buffers[key][-1]
+            is_open = stream.last_end is None or last['end_timestamp'] > stream.last_end
+            return stream.values(last if is_open else None)
+
+    def hit_rate(self):
+        served = self.stats['hits'] + self.stats['tail_fetches'] + self.stats['misses']
+        return self.stats['hits'] / served if served else 0.0
+
+
+def _positive_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return value if value > 0 else 0.0
+
+
+def orderbook_mid(ob):
+    """Mid price from an orderbook snapshot ({'data': {'asks', 'bids'}} or flat), 0 if unusable."""
+    if not isinstance(ob, dict):
+        return 0.0
+    book = ob.get('data') if isinstance(ob.get('data'), dict) else ob
+    asks, bids = book.get('asks'), book.get('bids')
+    if not asks or not bids:
+        return 0.0
+    return (float(asks[0]['price']) + float(bids[0]['price'])) / 2
+
+
+class PriceSnapshot:
+    """
+    Prices for every held symbol, gathered in one pass per risk tick.
+
+    Sources, cheapest first:
+      1. mark_price in the positions rows just fetched (no extra request)
+      2. one get_futures_info_for_all_markets call for whatever is missing
+      3. per-symbol orderbook mid, then a live 1m kline close (not the
+         CandleStore, whose buffers may be CANDLE_STORE_MAX_AGE old) -- only
+         for symbols still missing or older than PRICE_MAX_AGE
+    Each price keeps its source and fetch time so callers can see its age.
+    """
+
+    def __init__(self):
+        self._prices = {}  # symbol -> (price, source, wall time of the quote)
+        self.requests = 0
+
+    @classmethod
+    def capture(cls, md, positions, max_age=None):
+        max_age = config.PRICE_MAX_AGE if max_age is None else max_age
+        snap = cls()
+        now = time.time()
+        held = [p.get('symbol') for p in positions if float(p.get('position_qty', 0)) != 0]
+
+        for p in positions:
+            mark = _positive_float(p.get('mark_price'))
+            if mark:
+                snap._set(p.get('symbol'), mark, 'mark', now)
+
+        missing = [s for s in held if not snap.is_fresh(s, max_age)]
+        if missing:
+            snap.requests += 1
+            marks = md.get_mark_prices()
+            if isinstance(marks, dict):
+                for symbol in missing:
+                    if symbol in marks:
+                        price, ts = marks[symbol]
+                        snap._set(symbol, price, 'futures_info', ts)
+
+        # Freshness fallback, per symbol
+        for symbol in held:
+            if snap.is_fresh(symbol, max_age):
+                continue
+            snap.requests += 1
+            try:
+                mid = orderbook_mid(md.get_orderbook(symbol))
+            except Exception:
+                mid = 0.0
+            if mid:
+                snap._set(symbol, mid, 'orderbook', time.time())
+                continue
+            print(f"⚠️ Orderbook failed for {symbol}, trying fallback (OHLCV)...")
+            snap.requests += 1
+            try:
+                close = md.get_last_close(symbol, timeframe="1m")
+                if close:
+                    snap._set(symbol, close, 'kline_1m', time.time())
+            except Exception as e:
+                print(f"❌ Fallback failed for {symbol}: {e}")
+        return snap
+
+    def _set(self, symbol, price, source, ts):
+        if symbol and price:
+            self._prices[symbol] = (float(price), source, ts)
+
+    def get(self, symbol):
+        """Price for the symbol, 0 if none could be fetched."""
+        return self._prices.get(symbol, (0, None, None))[0]
+
+    def source(self, symbol):
+        return self._prices.get(symbol, (0, None, None))[1]
+
+    def age(self, symbol):
+        """Seconds since the quote was taken, None if there is no price."""
+        entry = self._prices.get(symbol)
+        return max(0.0, time.time() - entry[2]) if entry else None
+
+    def is_fresh(self, symbol, max_age):
+        age = self.age(symbol)
+        return age is not None and age <= max_age
+
+
+class SymbolRules:
+    """
+    Trading rules (base_tick, min_notional, ...) for the whole PERP universe.
+
+    load() bulk-fetches every symbol with one get_available_symbols call.
+    Lookups are answered from memory; once the data is older than
+    SYMBOL_RULES_TTL a background refresh is started and the last known rules
+    keep being served meanwhile (also if that refresh fails). A symbol missing
+    from the bulk list is fetched once on its own.
+    """
+
+    FIELDS = ('base_tick', 'min_notional', 'quote_tick', 'base_min', 'base_max')
+    RETRY_AFTER = 60 # Seconds between bulk load attempts after a failure
+
+    def __init__(self, client, ttl=None):
+        self.client = client
+        self.ttl = config.SYMBOL_RULES_TTL if ttl is None else ttl
+        self._rules = {}       # symbol -> rules dict
+        self._loaded_at = None # monotonic time of the last successful bulk load
+        self._attempted_at = None
+        self._lock = threading.Lock()
+        self._refreshing = None
+        self.stats = {'hits': 0, 'misses': 0, 'bulk_loads': 0, 'failures': 0}
+
+    @classmethod
+    def _parse(cls, row):
+        rules = {'symbol': row.get('symbol')}
+        for field in cls.FIELDS:
+            if row.get(field) is not None:
+                rules[field] = float(row[field])
+        return rules if rules.get('base_tick') else None
+
+    def load(self):
+        """Bulk (re)load of all PERP rules. Returns the number of symbols loaded."""
+        self._attempted_at = time.monotonic()
+        try:
+            response = self.client.get_available_symbols()
+            rows = response['data']['rows'] if response and 'data' in response else []
+            loaded = {}
+            for row in rows:
+                rules = self._parse(row) if str(row.get('symbol', '')).startswith('PERP_') else None
+                if rules:
+                    loaded[rules['symbol']] = rules
+        except Exception as e:
+            print(f"❌ Error loading symbol rules: {e}")
+            loaded = {}
+
+        with self._lock:
+            if not loaded:
+                self.stats['failures'] += 1
+                return 0
+            self._rules.update(loaded)
+            self._loaded_at = time.monotonic()
+            self.stats['bulk_loads'] += 1
+        return len(loaded)
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing and self._refreshing.is_alive():
+                return
+            self._refreshing = threading.Thread(target=self.load, name="symbol-rules", daemon=True)
+            self._refreshing.start()
+
+    def _fetch_one(self, symbol):
+        try:
+            res = self.client.get_exchange_info(symbol)
+            if res and 'data' in res:
+                return self._parse({**res['data'], 'symbol': symbol})
+        except Exception as e:
+            print(f"❌ Error getting symbol rules for {symbol}: {e}")
+        return None
+
+    def get(self, symbol):
+        """Rules for the symbol from memory (None if the exchange never returned any)."""
+        now = time.monotonic()
+        if self._attempted_at is None:
+            self.load() # Not preloaded at startup: load on first use
+        elif (self._loaded_at is None or now - self._loaded_at > self.ttl) and now - self._attempted_at > self.RETRY_AFTER:
+            self._refresh_in_background()
+
+        with self._lock:
+            rules = self._rules.get(symbol)
+            self.stats['hits' if rules else 'misses'] += 1
+        if rules:
+            return rules
+
+        rules = self._fetch_one(symbol)
+        if rules:
+            with self._lock:
+                self._rules[symbol] = rules
+        return rules
+
+
 class MarketData:
     def __init__(self):
-        self.client = OrderlyClient(
+        # All SDK calls (MarketData, Execution, main) share one rate-limited client
+        self.client = RateLimitedClient(OrderlyClient(
             orderly_key=config.ORDERLY_KEY, 
             orderly_secret=config.ORDERLY_SECRET,
             orderly_account_id=config.ORDERLY_ACCOUNT_ID
-        )
+        ))
+        self.candles = CandleStore(self._fetch_klines)
+        self.rules = SymbolRules(self.client)
 
     def get_ohlcv(self, symbol, timeframe="15m", limit=100):
+        """Returns the latest `limit` candles (oldest first), served from the candle store."""
+        try:
+            return self.candles.get(symbol, timeframe, limit)
+        except Exception as e:
+            print(f"Error fetching candles: {e}")
+            traceback.print_exc()
+            return []
+
+    def get_last_close(self, symbol, timeframe="1m"):
+        """Close of the latest kline from a live request (bypasses the candle store). 0 on failure."""
+        rows = self._fetch_klines(symbol, timeframe, 1)
+        if not isinstance(rows, list):
+            return 0.0
+        rows = [r for r in rows if isinstance(r, dict) and r.get('end_timestamp') is not None]
+        if not rows:
+            return 0.0
+        return _positive_float(max(rows, key=lambda r: r['end_timestamp']).get('close'))
+
+    def get_indicators(self, symbol, timeframe="15m", limit=100):
+        """Latest indicators for the symbol, updated incrementally from the candle store."""
+        try:
+            return self.candles.indicators(symbol, timeframe, limit)
+        except Exception as e:
+            print(f"Error calculating indicators: {e}")
+            traceback.print_exc()
+            return calculate_indicators([])
+
+    def _fetch_klines(self, symbol, timeframe, limit):
         try:
             # Type is the timeframe e.g. "1m", "5m", "15m", "30m", "1h", "1d"
             response = self.client.get_kline(symbol, type=timeframe, limit=limit)
@@ -28,23 +432,32 @@ class MarketData:
             traceback.print_exc()
             return []
 
-    def get_symbol_rules(self, symbol):
+    def get_mark_prices(self):
         """
-        Fetch trading rules: base_tick (min qty step) and min_notional.
+        Mark prices for all markets in one request: { "SYMBOL": (mark_price, quote wall time) }.
+        Returns None on failure.
         """
         try:
-            # Try to get from individual info first
-            res = self.client.get_exchange_info(symbol)
-            if res and 'data' in res:
-                return {
-                    'base_tick': float(res['data'].get('base_tick', 0)),
-                    'min_notional': float(res['data'].get('min_notional', 0)),
-                    'symbol': symbol
-                }
+            response = self.client.get_futures_info_for_all_markets()
+            if response and 'data' in response and 'rows' in response['data']:
+                ts = response.get('timestamp')
+                ts = ts / 1000 if ts else time.time()
+                prices = {}
+                for row in response['data']['rows']:
+                    mark = _positive_float(row.get('mark_price'))
+                    if mark:
+                        prices[row['symbol']] = (mark, ts)
+                return prices
             return None
         except Exception as e:
-            print(f"❌ Error getting symbol rules for {symbol}: {e}")
+            print(f"Error fetching mark prices: {e}")
             return None
+
+    def get_symbol_rules(self, symbol):
+        """
+        Trading rules: base_tick (min qty step) and min_notional, from the in-memory registry.
+        """
+        return self.rules.get(symbol)
     
     def get_orderbook(self, symbol, max_level=10):
         try:
@@ -0,0 +1,107 @@
+"""
+Versioned schema migrations.
+
+Migrations are the ordered SQL files in schema/, named NNNN_description.sql
+(NNNN is the version). apply() is what every process runs at startup:
+
+- Fast path: one SELECT of the recorded version. When the database is
+  already at the latest file, nothing else runs, so no DDL and no schema
+  locks on busy tables.
+- Otherwise the runner takes a Postgres advisory lock (one migrator at a
+  time across all processes), re-reads the version and applies the pending
+  files in order. Each runs in its own transaction together with its
+  schema_version row, so a failed migration leaves nothing half-applied
+  and is retried on the next start.
+
+Statements are written to be idempotent (IF NOT EXISTS / OR REPLACE /
+guarded DO blocks), so version 1 can be recorded on databases created
+before migrations existed. Indexes are built with a plain CREATE INDEX
+(brief write lock): migrations run at startup, before the bot writes.
+"""
+import os
+import re
+
+import psycopg2
+from psycopg2 import errors
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema")
+LOCK_KEY = 0x6F72646C  # pg_advisory_lock key shared by every process migrating this database
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def load(directory=MIGRATIONS_DIR):
+    """[(version, name, sql)] from the migration files, ordered by version."""
+    migrations, seen = [], set()
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in seen:
+            raise ValueError(f"Duplicate migration version {version} in {directory}")
+        seen.add(version)
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            migrations.append((version, match.group(2).replace("_", " "), f.read()))
+    return sorted(migrations)
+
+
+MIGRATIONS = load()
+
+
+def current_version(cur):
+    """Highest applied version (0 for a database without schema_version). A single SELECT."""
+    try:
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version;")
+    except errors.UndefinedTable:
+        return 0
+    return cur.fetchone()[0]
+
+
+def apply(cur, target=None):
+    """
+    Applies pending migrations (up to `target`) on an autocommit cursor.
+    Returns the versions applied; raises (after rolling back) on the first failure.
+    """
+    goal = max((m[0] for m in MIGRATIONS), default=0) if target is None else target
+    version = current_version(cur)
+    if version >= goal:
+        return []
+
+    # Slow path: one migrator at a time; whoever waited finds the work already done
+    cur.execute("SELECT pg_advisory_lock(%s);", (LOCK_KEY,))
+    try:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ DEFAULT NOW()
+            );
+        """)
+        version = current_version(cur)
+        applied = []
+        for number, name, sql in MIGRATIONS:
+            if number <= version or number > goal:
+                continue
+            cur.execute("BEGIN;")
+            try:
+                cur.execute(sql)
+                cur.execute("INSERT INTO schema_version (version, name) VALUES (%s, %s);", (number, name))
+                cur.execute("COMMIT;")
+            except Exception:
+                cur.execute("ROLLBACK;")
+                raise
+            print(f"🗄️ Migration {number} applied: {name}")
+            applied.append(number)
+        return applied
+    finally:
+        try:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (LOCK_KEY,))
+        except psycopg2.Error:
+            pass  # Broken connection: the pool discards it and the session lock goes with it
+
+
+def migrate(db, target=None):
+    """Brings the database behind a DatabaseHandler up to date."""
+    with db.cursor() as cur:
+        return apply(cur, target)
@@ -1,28 +1,231 @@
+import threading
+import time
+from collections import deque
+
 import requests
+from requests.adapters import HTTPAdapter
+
 import config
+from rate_limiter import TokenBucket, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+
+TELEGRAM_MAX_LENGTH = 4096  # Telegram's limit for one message text
+DIGEST_SEPARATOR = "\n➖➖➖\n"
+
 
 class TelegramNotifier:
+    """
+    Queued Telegram notifier: send_message() only enqueues, a background
+    thread does the HTTP calls over one keep-alive Session.
+
+    The worker waits TELEGRAM_COALESCE_WINDOW after the first queued message
+    and merges everything that arrived meanwhile into one digest (up to
+    Telegram's 4096 characters), so a burst like five signals in one tick
+    becomes a single message. HIGH messages are digested on their own and
+    sent first; they never share a message with NORMAL / LOW chatter.
+    Sends go through a token bucket at TELEGRAM_RATE msg/s, and a 429
+    pauses the bucket for Telegram's retry_after.
+
+    A digest Telegram rejects (typically one message with unbalanced
+    Markdown) is resent one message at a time, and a single rejected
+    message once more as plain text, so one bad message cannot take the
+    others down with it.
+
+    Backpressure: the queue holds TELEGRAM_QUEUE_SIZE messages. When it is
+    full, the oldest PRIORITY_LOW message is dropped to make room; if there
+    is none, a new LOW message is dropped, and a NORMAL or HIGH one pushes
+    out the oldest NORMAL one. HIGH messages (fills, exits, panic) are never
+    dropped.
+
+    Use get_notifier() for the process-wide instance.
+    """
+
     def __init__(self):
         self.bot_token = config.TELEGRAM_BOT_TOKEN
         self.chat_id = config.TELEGRAM_CHAT_ID
         self.api_url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage" if self.bot_token else None
+        self._queue = deque()   # (priority, text, enqueued monotonic)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._busy = False      # worker is sending a batch taken off the queue
+        self._thread = None
+        self._session = None
+        self.bucket = TokenBucket("telegram", config.TELEGRAM_RATE, config.TELEGRAM_BURST)
+        self.stats = {'queued': 0, 'sent': 0, 'merged': 0, 'dropped': 0, 'rejected': 0, 'failed': 0}
 
-    def send_message(self, message):
+    @property
+    def enabled(self):
+        return bool(self.api_url and self.chat_id)
+
+    def send_message(self, message, priority=PRIORITY_NORMAL):
         """
-        Sends a message to Telegram.
-        Non-blocking behavior: If network fails, it just logs error and returns.
+        Queues a message for Telegram and returns immediately.
+        Silently ignored when Telegram is not configured.
         """
-        if not self.api_url or not self.chat_id:
-            # Silent fail if not configured
+        if not self.enabled:
             return
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._queue) >= config.TELEGRAM_QUEUE_SIZE and not self._make_room(priority):
+                self.stats['dropped'] += 1
+                return
+            self._queue.append((priority, message, time.monotonic()))
+            self.stats['queued'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _make_room(self, priority):
+        """Drops one queued message for a newcomer of `priority`. False when the newcomer should be dropped."""
+        for victim in (PRIORITY_LOW, PRIORITY_NORMAL):
+            if victim == PRIORITY_NORMAL and priority == PRIORITY_LOW:
+                return False
+            for i, queued in enumerate(self._queue):
+                if queued[0] == victim:
+                    del self._queue[i]
+                    self.stats['dropped'] += 1
+                    return True
+        # Only HIGH messages queued: let a HIGH newcomer overflow, drop anything else
+        return priority == PRIORITY_HIGH
+
+    def _take_batch(self):
+        """Blocks for the first message, lets the coalesce window fill up, then takes the whole queue."""
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return None
+            first_at = self._queue[0][2]
+            while not self._closed:
+                left = first_at + config.TELEGRAM_COALESCE_WINDOW - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(left)
+            batch = [(priority, text) for priority, text, _ in self._queue]
+            self._queue.clear()
+            self._busy = True
+            return batch
+
+    @staticmethod
+    def group(messages):
+        """Splits messages into runs that fit one Telegram message once joined (order preserved)."""
+        groups, current, length = [], [], 0
+        for text in messages:
+            text = text[:TELEGRAM_MAX_LENGTH]
+            if current and length + len(DIGEST_SEPARATOR) + len(text) > TELEGRAM_MAX_LENGTH:
+                groups.append(current)
+                current, length = [], 0
+            length += len(text) + (len(DIGEST_SEPARATOR) if current else 0)
+            current.append(text)
+        if current:
+            groups.append(current)
+        return groups
+
+    @classmethod
+    def digest(cls, messages):
+        """Merges messages into as few texts as fit Telegram's length limit (order preserved)."""
+        return [DIGEST_SEPARATOR.join(group) for group in cls.group(messages)]
+
+    def _run(self):
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                break
+            try:
+                high = [text for priority, text in batch if priority == PRIORITY_HIGH]
+                rest = [text for priority, text in batch if priority != PRIORITY_HIGH]
+                for lane in (high, rest):
+                    groups = self.group(lane)
+                    self.stats['merged'] += len(lane) - len(groups)
+                    for messages in groups:
+                        self._deliver(messages)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+        self._session.close()
+
+    def _deliver(self, messages):
+        """Sends one digest; if Telegram rejects it, falls back to one message at a time, then plain text."""
+        text = DIGEST_SEPARATOR.join(messages)
+        status = self._post(text)
+        if status is None or status < 400:
+            return
+        if status >= 500:
+            self.stats['failed'] += 1
+            return
+        self.stats['rejected'] += 1
+        if len(messages) > 1:
+            for message in messages:
+                self._deliver([message])
+            return
+        # A single message Telegram cannot parse as Markdown: deliver it unformatted
+        if self._post(text, parse_mode=None) != 200:
+            self.stats['failed'] += 1
+
+    def _post(self, text, parse_mode="Markdown"):
+        """
+        One sendMessage call (429s are retried once the bucket allows).
+        Returns 200 when sent, the HTTP status when rejected, None when Telegram was unreachable.
+        """
+        payload = {"chat_id": self.chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        for _ in range(3):
+            self.bucket.acquire()
+            try:
+                response = self._session.post(self.api_url, json=payload, timeout=config.TELEGRAM_TIMEOUT)
+            except Exception as e:
+                print(f"⚠️ Failed to send Telegram notification: {e}")
+                break
+            if response.status_code == 429:
+                # Telegram tells us how long to back off; the bucket holds the next send until then
+                try:
+                    retry_after = float(response.json().get('parameters', {}).get('retry_after', 1))
+                except ValueError:
+                    retry_after = 1.0
+                self.bucket.on_throttled(retry_after)
+                continue
+            if response.status_code >= 400:
+                print(f"⚠️ Telegram rejected notification ({response.status_code}): {response.text[:200]}")
+                return response.status_code
+            self.bucket.on_success()
+            self.stats['sent'] += 1
+            return 200
+        self.stats['failed'] += 1
+        return None
+
+    def flush(self, timeout=10):
+        """Waits until every queued message has been handed to Telegram (or timeout). True when drained."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                left = deadline - time.monotonic()
+                if left <= 0 or self._thread is None:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    def close(self, timeout=10):
+        """Sends what is still queued (within timeout), then stops the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+_instance = None
+_instance_lock = threading.Lock()
+
 
-        try:
-            payload = {
-                "chat_id": self.chat_id,
-                "text": message,
-                "parse_mode": "Markdown"
-            }
-            # Timeout is critical here to prevent blocking the trading loop
-            requests.post(self.api_url, json=payload, timeout=2) 
-        except Exception as e:
-            print(f"⚠️ Failed to send Telegram notification: {e}")
+def get_notifier():
+    """The process-wide TelegramNotifier (one queue, one worker, one HTTP session)."""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = TelegramNotifier()
+        return _instance
@@ -0,0 +1,100 @@
+import bisect
+import threading
+
+import config
+
+
+class PnLSeries:
+    """
+    Running cumulative PnL of closed trades, kept up to date incrementally.
+
+    refresh() only reads trades that closed since the last one seen (minus
+    PNL_REVISION_WINDOW seconds, so a late fill confirmation that revises a
+    recent exit is picked up too). The watermark is the close time, not the
+    row id: ids are assigned when a trade opens, so trades close out of id
+    order. New closes are appended to the running sum; a revision or an
+    out-of-order close rebuilds the sums in memory without touching the DB.
+
+    The rendered chart is cached against `version`, which only moves when
+    the series changes, so repeated /pnl calls reuse the same PNG.
+    """
+
+    def __init__(self, db, points=None, statuses=None):
+        self.db = db
+        self.points = config.PNL_CHART_POINTS if points is None else points
+        self.statuses = statuses  # closed statuses to sum (None: all, see get_closed_pnl_since)
+        self._rows = []         # (closed_at, id, pnl) in close order
+        self._cumulative = []   # running sum aligned with _rows
+        self._pnl_by_id = {}
+        self._watermark = None  # latest closed_at seen
+        self._lock = threading.Lock()
+        self.version = 0
+        self._png = None        # (version, png bytes)
+        self.stats = {'refreshes': 0, 'rows_read': 0, 'appended': 0, 'rebuilds': 0}
+
+    @property
+    def total(self):
+        return self._cumulative[-1] if self._cumulative else 0.0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def refresh(self):
+        """Reads closes since the watermark. Returns True when the series changed."""
+        since = None
+        if self._watermark is not None:
+            since = self._watermark.timestamp() - config.PNL_REVISION_WINDOW
+        rows = self.db.get_closed_pnl_since(since, self.statuses)
+
+        with self._lock:
+            self.stats['refreshes'] += 1
+            self.stats['rows_read'] += len(rows)
+            rebuild = False
+            changed = False
+            for row_id, closed_at, pnl in rows:
+                pnl = float(pnl)
+                known = self._pnl_by_id.get(row_id)
+                if known is not None:
+                    if known != pnl:
+                        # Revised exit (confirmed fill price)
+                        i = next(i for i, r in enumerate(self._rows) if r[1] == row_id)
+                        self._rows[i] = (self._rows[i][0], row_id, pnl)
+                        self._pnl_by_id[row_id] = pnl
+                        rebuild = changed = True
+                    continue
+                entry = (closed_at, row_id, pnl)
+                self._pnl_by_id[row_id] = pnl
+                changed = True
+                if not self._rows or entry >= self._rows[-1]:
+                    self._rows.append(entry)
+                    self._cumulative.append(self.total + pnl)
+                    self.stats['appended'] += 1
+                else:
+                    bisect.insort(self._rows, entry)
+                    rebuild = True
+                if self._watermark is None or closed_at > self._watermark:
+                    self._watermark = closed_at
+
+            if rebuild:
+                self.stats['rebuilds'] += 1
+                total, self._cumulative = 0.0, []
+                for _, _, pnl in self._rows:
+                    total += pnl
+                    self._cumulative.append(total)
+            if changed:
+                self.version += 1
+            return changed
+
+    def series(self):
+        """(times, cumulative) of the last `points` closes, for plotting."""
+        with self._lock:
+            tail = self._rows[-self.points:]
+            return [r[0] for r in tail], self._cumulative[-len(tail):] if tail else []
+
+    def cached_png(self):
+        """PNG rendered for the current version, None when the series moved on."""
+        cached = self._png
+        return cached[1] if cached and cached[0] == self.version else None
+
+    def store_png(self, version, png):
+        self._png = (version, png)
@@ -0,0 +1,68 @@
+"""
+Rule-based pre-screen in front of the AI call.
+
+screen() takes calculate_indicators() output for many symbols and decides in
+one vectorized pass which ones could possibly produce a tradable setup.
+A symbol passes when its ATR regime is wide enough to clear costs AND it
+shows at least one sign of directional intent: aligned MAs, price stretched
+away from MA_LONG, or a volume spike. Everything else (flat MAs, price
+chopping around MA_LONG on ordinary volume) is skipped with a reason.
+
+Symbols without enough history for these indicators are passed through, so
+the gate never hides a symbol the AI would otherwise have seen.
+"""
+import numpy as np
+
+import config
+
+FIELDS = ('current_price', 'MA_SHORT', 'MA_MEDIUM', 'MA_LONG', 'ATR', 'VOLUME_Z')
+
+
+def _matrix(indicators_by_symbol):
+    """(symbols, n x len(FIELDS) float matrix with NaN for missing values)."""
+    symbols = list(indicators_by_symbol)
+    m = np.full((len(symbols), len(FIELDS)), np.nan)
+    for i, symbol in enumerate(symbols):
+        inds = indicators_by_symbol[symbol] or {}
+        for j, field in enumerate(FIELDS):
+            value = inds.get(field)
+            if value is not None:
+                m[i, j] = value
+    return symbols, m
+
+
+def screen(indicators_by_symbol):
+    """
+    { symbol: indicators } -> { symbol: None (pass) or skip reason }.
+    Thresholds: PREFILTER_MIN_ATR_PCT, PREFILTER_MIN_MA_DISTANCE, PREFILTER_VOLUME_Z.
+    """
+    if not indicators_by_symbol:
+        return {}
+    if not config.PREFILTER_ENABLED:
+        return dict.fromkeys(indicators_by_symbol)
+
+    symbols, m = _matrix(indicators_by_symbol)
+    price, ma_s, ma_m, ma_l, atr, vol_z = m.T
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        incomplete = np.isnan(m).any(axis=1) | (price <= 0) | (ma_l <= 0)
+        aligned = ((ma_s > ma_m) & (ma_m > ma_l)) | ((ma_s < ma_m) & (ma_m < ma_l))
+        ma_distance = np.abs(price - ma_l) / ma_l
+        stretched = ma_distance >= config.PREFILTER_MIN_MA_DISTANCE
+        spike = vol_z >= config.PREFILTER_VOLUME_Z
+        atr_pct = atr / price
+        quiet = atr_pct < config.PREFILTER_MIN_ATR_PCT
+
+    flat = ~(aligned | stretched | spike)
+    skip = ~incomplete & (quiet | flat)
+
+    result = {}
+    for i, symbol in enumerate(symbols):
+        if not skip[i]:
+            result[symbol] = None
+        elif quiet[i]:
+            result[symbol] = f"ATR regime too quiet ({atr_pct[i]:.2%} < {config.PREFILTER_MIN_ATR_PCT:.2%})"
+        else:
+            result[symbol] = (f"flat: MAs not aligned, price {ma_distance[i]:.2%} from MA{config.MA_LONG}, "
+                              f"volume z {vol_z[i]:.1f}")
+    return result
@@ -0,0 +1,134 @@
+"""
+Compact prompt encoding for the AI analyst.
+
+The legacy prompt (AIAnalyst._create_prompt) sends full-precision floats and
+millisecond timestamps row by row and repeats the whole instruction block in
+every user message. This encoding:
+
+- numbers candles by how many bars ago they closed (t=0 is the latest),
+- writes every price level as a % offset from the latest close (`ref`), with
+  just enough decimals for ~3 significant digits over the window's range,
+- writes volume as a multiple of the window's mean volume,
+- keeps the legend and trading instructions in a static system prefix, which
+  is byte-identical across calls so providers can reuse it.
+
+encode_symbol() is used both for single-symbol prompts and for each block
+of a batched prompt.
+"""
+import math
+
+import config
+
+MARKET_FORMAT = ('{"action": "BUY/SELL/HOLD", "confidence": 0.8, "entry_price": 0.0, "stop_loss": 0.0, '
+                 '"take_profit": 0.0, "reasoning": "string"}')
+BATCH_FORMAT = ('{"signals": [{"symbol": "PERP_X_USDC", "action": "BUY/SELL/HOLD", "confidence": 0.8, '
+                '"entry_price": 0.0, "stop_loss": 0.0, "take_profit": 0.0, "reasoning": "string"}]}')
+
+
+def _instructions():
+    return (
+        "Data format: ref = latest close. Candle rows are t,o,h,l,c,v with t = 15m bars ago (0 = latest), "
+        "o/h/l/c = % from ref, v = volume / window mean. Indicator levels (MA, BB, VWAP) are % from ref, "
+        "ATR is % of ref. Answer price fields as absolute prices (ref * (1 + pct/100)).\n"
+        "Instructions:\n"
+        f"1. Trend Filter: Use MAs to determine trend. If MA{config.MA_SHORT} < MA{config.MA_MEDIUM} < MA{config.MA_LONG}, it is a Strong Downtrend.\n"
+        f"2. Momentum Focus: If price breaks BELOW MA{config.MA_LONG} with high volume, IGNORE oversold conditions (RSI) and signal SELL.\n"
+        "3. Valid signals must align with the momentum.\n"
+        "4. RECENT EXIT lines: no revenge trading. Signal BUY/SELL only if the exit reason has been clearly "
+        "invalidated by new price action, otherwise HOLD.\n"
+    )
+
+
+def market_system_prompt():
+    """Static system prefix for one-symbol prompts (identical on every call)."""
+    return ("You are a trading bot backend analysing 15m candles for short-term trades. "
+            "You MUST output ONLY valid JSON, no Markdown. Format: " + MARKET_FORMAT + "\n" + _instructions())
+
+
+def batch_system_prompt():
+    """Static system prefix for batched prompts: one signal per ### symbol block."""
+    return ("You are a trading bot backend analysing 15m candles for short-term trades. "
+            "Judge every ### symbol block independently and return exactly one signal per symbol. "
+            "You MUST output ONLY valid JSON, no Markdown. Format: " + BATCH_FORMAT + "\n" + _instructions())
+
+
+def _fmt(value, decimals):
+    text = f"{value:.{decimals}f}"
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return "0" if text in ("-0", "") else text
+
+
+def price_decimals(range_pct):
+    """Decimals giving ~3 significant digits over a window spanning `range_pct` percent."""
+    if not range_pct > 0:
+        return 2
+    return min(4, max(1, 2 - math.floor(math.log10(range_pct))))
+
+
+def encode_symbol(symbol, candles, indicators=None, last_exit=None, rows=20):
+    """One compact block: header with ref price, indicator line, exit note, last `rows` candles."""
+    window = [c for c in candles[-rows:] if c.get('close') is not None]
+    if not window:
+        return f"### {symbol}\nno data"
+    ref = float(window[-1]['close'])
+    if ref <= 0:
+        return f"### {symbol}\nno data"
+
+    def pct(price):
+        return (float(price) / ref - 1) * 100
+
+    highs = [float(c.get('high', c['close'])) for c in window]
+    lows = [float(c.get('low', c['close'])) for c in window]
+    d = price_decimals((max(highs) - min(lows)) / ref * 100)
+    volumes = [float(c.get('volume') or 0) for c in window]
+    mean_vol = sum(volumes) / len(volumes) or 1.0
+
+    lines = [f"### {symbol} ref={ref:.6g}"]
+    if indicators:
+        def level(key):
+            value = indicators.get(key)
+            return "na" if value is None else _fmt(pct(value), d)
+
+        def plain(key, scale=1.0, decimals=1):
+            value = indicators.get(key)
+            return "na" if value is None else _fmt(value * scale, decimals)
+
+        lines.append(
+            f"MA{config.MA_SHORT}={level('MA_SHORT')} MA{config.MA_MEDIUM}={level('MA_MEDIUM')} "
+            f"MA{config.MA_LONG}={level('MA_LONG')} BB={level('BB_LOWER')}/{level('BB_MIDDLE')}/{level('BB_UPPER')} "
+            f"VWAP={level('VWAP')} RSI={plain('RSI')} ATR={plain('ATR', 100 / ref, d)} VolZ={plain('VOLUME_Z')}")
+    if last_exit:
+        lines.append(f"RECENT EXIT {last_exit.get('candles_ago', 0)} bars ago via {last_exit.get('reason', 'UNKNOWN')}")
+    lines.append("t,o,h,l,c,v")
+    n = len(window)
+    for i, c in enumerate(window):
+        lines.append(",".join((
+            str(n - 1 - i),
+            _fmt(pct(c.get('open', c['close'])), d), _fmt(pct(highs[i]), d), _fmt(pct(lows[i]), d),
+            _fmt(pct(c['close']), d), _fmt(volumes[i] / mean_vol, 2))))
+    return "\n".join(lines)
+
+
+def estimate_tokens(text):
+    """
+    Rough BPE-style token count (no tokenizer dependency): runs of letters,
+    digit groups of up to 3 and single punctuation marks each count as one.
+    Good enough to compare two encodings of the same data.
+    """
+    tokens, i, n = 0, 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch.isspace():
+            i += 1
+            continue
+        j = i + 1
+        if ch.isalpha():
+            while j < n and text[j].isalpha():
+                j += 1
+        elif ch.isdigit():
+            while j < n and j - i < 3 and text[j].isdigit():
+                j += 1
+        tokens += 1
+        i = j
+    return tokens
@@ -0,0 +1,171 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+# Priority lanes (lower value is served first)
+PRIORITY_HIGH = 0    # Order placement, risk-price fetches
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2     # Analytics (Top N scan, analysis candles)
+
+_local = threading.local()
+
+
+@contextmanager
+def priority(level):
+    """Sets the rate-limit lane for every Orderly call made by this thread inside the block."""
+    previous = getattr(_local, 'priority', None)
+    _local.priority = level
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def current_priority(default=PRIORITY_NORMAL):
+    level = getattr(_local, 'priority', None)
+    return default if level is None else level
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with priority lanes and AIMD rate adaptation.
+
+    Waiters are served strictly in (priority, arrival) order. A 429 halves the
+    refill rate and blocks the bucket for an exponentially growing backoff;
+    every successful call adds the rate back slowly until the configured max.
+    """
+
+    def __init__(self, name, rate, capacity):
+        self.name = name
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._backoff = config.RATE_LIMIT_BACKOFF_START
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+        self.stats = {'calls': 0, 'waited': 0, 'wait_time': 0.0, 'throttled': 0}
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, level=PRIORITY_NORMAL):
+        started = time.monotonic()
+        with self._cond:
+            ticket = (level, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == ticket and now >= self._blocked_until and self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+                    # Time until the next token (or end of backoff) for the head of the queue
+                    wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate, 0.001)
+                    self._cond.wait(timeout=wait)
+
+                waited = time.monotonic() - started
+                self.stats['calls'] += 1
+                if waited > 0.001:
+                    self.stats['waited'] += 1
+                    self.stats['wait_time'] += waited
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def on_throttled(self, retry_after=None):
+        """
+        Exchange answered 429: back off and lower the sustained rate (multiplicative decrease).
+        When the server says how long to wait (retry_after seconds), the bucket pauses exactly
+        that long instead of the exponential backoff.
+        """
+        with self._cond:
+            self.stats['throttled'] += 1
+            self.rate = max(self.rate / 2, config.RATE_LIMIT_MIN_RATE)
+            pause = self._backoff if retry_after is None else retry_after
+            self._blocked_until = time.monotonic() + pause
+            self._tokens = 0
+            print(f"🐢 Rate limited on '{self.name}': backing off {pause:.1f}s, rate now {self.rate:.1f}/s")
+            if retry_after is None:
+                self._backoff = min(self._backoff * 2, config.RATE_LIMIT_BACKOFF_MAX)
+            self._cond.notify_all()
+
+    def on_success(self):
+        """Additive increase back towards the configured rate."""
+        if self.rate < self.max_rate or self._backoff > config.RATE_LIMIT_BACKOFF_START:
+            with self._cond:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+                self._backoff = config.RATE_LIMIT_BACKOFF_START
+
+
+def endpoint_class(method_name):
+    """Maps an Orderly SDK method to its rate-limit bucket: 'order', 'market' or 'account'."""
+    if method_name.startswith(('create_', 'edit_', 'cancel_', 'batch_')):
+        return 'order'
+    if method_name in MARKET_METHODS or method_name.startswith(('get_futures_info', 'get_tradingview')):
+        return 'market'
+    return 'account'
+
+
+MARKET_METHODS = {
+    'get_kline', 'get_orderbook_snapshot', 'get_exchange_info', 'get_available_symbols',
+    'get_market_trades', 'get_volume_statistics', 'get_token_info',
+    'get_predicted_funding_rate_for_all_markets', 'get_predicted_funding_rate_for_one_market',
+    'get_funding_rate_history_for_one_market',
+}
+
+
+def is_rate_limit_error(e):
+    return getattr(e, 'status_code', None) == 429
+
+
+class RateLimitedClient:
+    """
+    Wraps the Orderly REST client so every call goes through a shared token bucket.
+    One bucket per endpoint class (market data / private account / order placement),
+    sized by config.RATE_LIMITS. Order placement always uses the high-priority lane.
+    """
+
+    def __init__(self, client, limits=None):
+        self._client = client
+        limits = limits or config.RATE_LIMITS
+        self.buckets = {name: TokenBucket(name, rate, burst) for name, (rate, burst) in limits.items()}
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        bucket = self.buckets[endpoint_class(name)]
+
+        def call(*args, **kwargs):
+            level = PRIORITY_HIGH if bucket.name == 'order' else current_priority()
+            for attempt in range(config.RATE_LIMIT_RETRIES + 1):
+                bucket.acquire(level)
+                try:
+                    result = attr(*args, **kwargs)
+                except Exception as e:
+                    if is_rate_limit_error(e) and attempt < config.RATE_LIMIT_RETRIES:
+                        bucket.on_throttled()
+                        continue
+                    if is_rate_limit_error(e):
+                        bucket.on_throttled()
+                    raise
+                bucket.on_success()
+                return result
+
+        call.__name__ = name
+        return call
+
+    def stats(self):
+        return {name: dict(b.stats, rate=round(b.rate, 2)) for name, b in self.buckets.items()}
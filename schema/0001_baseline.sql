@@ -0,0 +1,109 @@
+-- Baseline schema: the tables init_db used to create on every start.
+-- Idempotent, so databases created before migrations existed are recorded as version 1.
+
+CREATE TABLE IF NOT EXISTS trade_logs (
+    id SERIAL PRIMARY KEY,
+    log_id TEXT UNIQUE,
+    timestamp TIMESTAMPTZ DEFAULT NOW(),
+    symbol TEXT,
+    ai_action TEXT,
+    ai_confidence FLOAT,
+    ai_reasoning TEXT,
+    ma_state JSONB,
+    entry_price FLOAT,
+    exit_price FLOAT,
+    pnl FLOAT,
+    status TEXT
+);
+ALTER TABLE trade_logs ADD COLUMN IF NOT EXISTS log_id TEXT UNIQUE;
+ALTER TABLE trade_logs ADD COLUMN IF NOT EXISTS highest_price FLOAT DEFAULT 0;
+ALTER TABLE trade_logs ADD COLUMN IF NOT EXISTS exit_timestamp TIMESTAMPTZ;
+
+-- Key-value store shared with tg_bot.py
+CREATE TABLE IF NOT EXISTS bot_configs (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+INSERT INTO bot_configs (key, value) VALUES
+    ('is_paused', 'false'),
+    ('position_size', '30.0')
+ON CONFLICT (key) DO NOTHING;
+
+-- Remote commands from tg_bot.py
+CREATE TABLE IF NOT EXISTS command_queue (
+    id SERIAL PRIMARY KEY,
+    command TEXT NOT NULL,
+    params JSONB DEFAULT '{}'::jsonb,
+    status TEXT DEFAULT 'PENDING',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    executed_at TIMESTAMPTZ
+);
+
+-- AI decision cache (signal_cache.py), survives restarts
+CREATE TABLE IF NOT EXISTS ai_signal_cache (
+    cache_key TEXT PRIMARY KEY,
+    symbol TEXT,
+    signal JSONB,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Per-symbol totals over the whole trade_logs history for the dashboard, kept
+-- current by a row trigger (old row's contribution out, new one in)
+CREATE TABLE IF NOT EXISTS trade_stats (
+    symbol TEXT PRIMARY KEY,
+    signals BIGINT NOT NULL DEFAULT 0,   -- every logged row
+    trades BIGINT NOT NULL DEFAULT 0,    -- OPEN or CLOSED_*
+    closed BIGINT NOT NULL DEFAULT 0,    -- CLOSED_* with a pnl
+    wins BIGINT NOT NULL DEFAULT 0,      -- CLOSED_* with pnl > 0
+    pnl DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+CREATE OR REPLACE FUNCTION trade_stats_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.symbol IS NOT DISTINCT FROM NEW.symbol
+       AND OLD.status IS NOT DISTINCT FROM NEW.status AND OLD.pnl IS NOT DISTINCT FROM NEW.pnl THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE trade_stats SET
+            signals = signals - 1,
+            trades = trades - CASE WHEN OLD.status = 'OPEN' OR OLD.status LIKE 'CLOSED%' THEN 1 ELSE 0 END,
+            closed = closed - CASE WHEN OLD.status LIKE 'CLOSED%' AND OLD.pnl IS NOT NULL THEN 1 ELSE 0 END,
+            wins = wins - CASE WHEN OLD.status LIKE 'CLOSED%' AND OLD.pnl > 0 THEN 1 ELSE 0 END,
+            pnl = pnl - CASE WHEN OLD.status LIKE 'CLOSED%' THEN COALESCE(OLD.pnl, 0) ELSE 0 END
+        WHERE symbol = COALESCE(OLD.symbol, '');
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO trade_stats AS s (symbol, signals, trades, closed, wins, pnl) VALUES (
+            COALESCE(NEW.symbol, ''), 1,
+            CASE WHEN NEW.status = 'OPEN' OR NEW.status LIKE 'CLOSED%' THEN 1 ELSE 0 END,
+            CASE WHEN NEW.status LIKE 'CLOSED%' AND NEW.pnl IS NOT NULL THEN 1 ELSE 0 END,
+            CASE WHEN NEW.status LIKE 'CLOSED%' AND NEW.pnl > 0 THEN 1 ELSE 0 END,
+            CASE WHEN NEW.status LIKE 'CLOSED%' THEN COALESCE(NEW.pnl, 0) ELSE 0 END)
+        ON CONFLICT (symbol) DO UPDATE SET
+            signals = s.signals + EXCLUDED.signals, trades = s.trades + EXCLUDED.trades,
+            closed = s.closed + EXCLUDED.closed, wins = s.wins + EXCLUDED.wins, pnl = s.pnl + EXCLUDED.pnl;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger
+                   WHERE tgname = 'trade_stats_sync' AND tgrelid = 'trade_logs'::regclass) THEN
+        -- Same transaction as the backfill: no write slips in between
+        LOCK TABLE trade_logs IN SHARE ROW EXCLUSIVE MODE;
+        CREATE TRIGGER trade_stats_sync
+            AFTER INSERT OR DELETE OR UPDATE OF symbol, status, pnl ON trade_logs
+            FOR EACH ROW EXECUTE FUNCTION trade_stats_sync();
+        DELETE FROM trade_stats;
+        INSERT INTO trade_stats (symbol, signals, trades, closed, wins, pnl)
+        SELECT COALESCE(symbol, ''), COUNT(*),
+               COUNT(*) FILTER (WHERE status = 'OPEN' OR status LIKE 'CLOSED%'),
+               COUNT(*) FILTER (WHERE status LIKE 'CLOSED%' AND pnl IS NOT NULL),
+               COUNT(*) FILTER (WHERE status LIKE 'CLOSED%' AND pnl > 0),
+               COALESCE(SUM(pnl) FILTER (WHERE status LIKE 'CLOSED%'), 0)
+        FROM trade_logs GROUP BY COALESCE(symbol, '');
+    END IF;
+END
+$$;
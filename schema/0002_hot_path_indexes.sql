@@ -0,0 +1,23 @@
+-- Indexes for the trade_logs / command_queue hot queries (see bench_indexes.py).
+
+-- Open trade per symbol: get_open_trade_state(s), get_active_trade_details, log_pnl,
+-- close_zombie_trade, close_trades, get_all_open_symbols (index-only)
+CREATE INDEX IF NOT EXISTS trade_logs_open_symbol_idx
+    ON trade_logs (symbol, id DESC) WHERE status = 'OPEN';
+
+-- Last exit per symbol (re-entry cooldown): get_last_exit_info
+CREATE INDEX IF NOT EXISTS trade_logs_last_exit_idx
+    ON trade_logs (symbol, (COALESCE(exit_timestamp, timestamp)) DESC, id DESC) WHERE status LIKE 'CLOSED%';
+
+-- Closes in close order with their PnL (index-only): get_closed_pnl_since / PnLSeries
+CREATE INDEX IF NOT EXISTS trade_logs_closed_pnl_idx
+    ON trade_logs ((COALESCE(exit_timestamp, timestamp)), id) INCLUDE (pnl)
+    WHERE status IN ('CLOSED', 'CLOSED_TP', 'CLOSED_SL', 'CLOSED_MANUAL', 'CLOSED_AI_STALE') AND pnl IS NOT NULL;
+
+-- Signal history, newest first, covering everything but the reasoning text: get_recent_signals
+CREATE INDEX IF NOT EXISTS trade_logs_signal_history_idx
+    ON trade_logs (id DESC) INCLUDE (symbol, ai_action, ai_confidence, timestamp)
+    WHERE status = 'SIGNAL_GENERATED';
+
+-- Pending remote commands: get_pending_commands
+CREATE INDEX IF NOT EXISTS command_queue_pending_idx ON command_queue (id) WHERE status = 'PENDING';
@@ -0,0 +1,47 @@
+-- trade_stats with the definitions the dashboard has always shown (before it read trade_stats):
+--   trades = rows with status OPEN, CLOSED_TP or CLOSED_SL ("Executed Trades")
+--   closed = CLOSED_TP / CLOSED_SL rows with a pnl
+--   wins   = those trades with pnl > 0 (win rate = wins / trades)
+--   pnl    = sum of their pnl ("Realized PnL")
+-- Manual, AI-audit and stale closes still count as signals only, as before.
+
+CREATE OR REPLACE FUNCTION trade_stats_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.symbol IS NOT DISTINCT FROM NEW.symbol
+       AND OLD.status IS NOT DISTINCT FROM NEW.status AND OLD.pnl IS NOT DISTINCT FROM NEW.pnl THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE trade_stats SET
+            signals = signals - 1,
+            trades = trades - CASE WHEN OLD.status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL') THEN 1 ELSE 0 END,
+            closed = closed - CASE WHEN OLD.status IN ('CLOSED_TP', 'CLOSED_SL') AND OLD.pnl IS NOT NULL THEN 1 ELSE 0 END,
+            wins = wins - CASE WHEN OLD.status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL') AND OLD.pnl > 0 THEN 1 ELSE 0 END,
+            pnl = pnl - CASE WHEN OLD.status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL') THEN COALESCE(OLD.pnl, 0) ELSE 0 END
+        WHERE symbol = COALESCE(OLD.symbol, '');
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO trade_stats AS s (symbol, signals, trades, closed, wins, pnl) VALUES (
+            COALESCE(NEW.symbol, ''), 1,
+            CASE WHEN NEW.status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL') THEN 1 ELSE 0 END,
+            CASE WHEN NEW.status IN ('CLOSED_TP', 'CLOSED_SL') AND NEW.pnl IS NOT NULL THEN 1 ELSE 0 END,
+            CASE WHEN NEW.status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL') AND NEW.pnl > 0 THEN 1 ELSE 0 END,
+            CASE WHEN NEW.status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL') THEN COALESCE(NEW.pnl, 0) ELSE 0 END)
+        ON CONFLICT (symbol) DO UPDATE SET
+            signals = s.signals + EXCLUDED.signals, trades = s.trades + EXCLUDED.trades,
+            closed = s.closed + EXCLUDED.closed, wins = s.wins + EXCLUDED.wins, pnl = s.pnl + EXCLUDED.pnl;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+-- Recount under the new definitions; the lock keeps writers out until this migration commits
+LOCK TABLE trade_logs IN SHARE ROW EXCLUSIVE MODE;
+DELETE FROM trade_stats;
+INSERT INTO trade_stats (symbol, signals, trades, closed, wins, pnl)
+SELECT COALESCE(symbol, ''), COUNT(*),
+       COUNT(*) FILTER (WHERE status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL')),
+       COUNT(*) FILTER (WHERE status IN ('CLOSED_TP', 'CLOSED_SL') AND pnl IS NOT NULL),
+       COUNT(*) FILTER (WHERE status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL') AND pnl > 0),
+       COALESCE(SUM(pnl) FILTER (WHERE status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL')), 0)
+FROM trade_logs GROUP BY COALESCE(symbol, '');
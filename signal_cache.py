@@ -0,0 +1,118 @@
+import copy
+import hashlib
+import operator
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+import config
+
+CANDLE_FIELDS = ('end_timestamp', 'open', 'high', 'low', 'close', 'volume')
+_candle_fields = operator.itemgetter(*CANDLE_FIELDS)
+
+
+class SignalCache:
+    """
+    Content-addressed cache of AI decisions, so an unchanged market is not re-asked.
+
+    The key hashes the prompt inputs that only move when a candle closes: the
+    symbol, every closed candle passed in and the last-exit context. The
+    still-open candle, and the live indicator preview computed from it, are
+    left out on purpose. They change on every tick, so keeping them in the
+    key would make every lookup a miss.
+
+    The candles passed in are the whole indicator window, not just the 20
+    the prompt prints: the engine fetches candles and indicators with the
+    same `limit`, and CandleStore seeds its indicator stream from exactly
+    those candles. So the closed-state indicators (EMA / RSI / ATR
+    included) cannot change without the key changing too.
+
+    Entries expire after AI_SIGNAL_CACHE_TTL and the least recently used are
+    evicted beyond AI_SIGNAL_CACHE_SIZE. With a database handler, entries are
+    written through to Postgres on a background thread and load() warms the
+    cache after a restart.
+    """
+
+    def __init__(self, db=None, ttl=None, maxsize=None):
+        self.db = db
+        self.ttl = config.AI_SIGNAL_CACHE_TTL if ttl is None else ttl
+        self.maxsize = config.AI_SIGNAL_CACHE_SIZE if maxsize is None else maxsize
+        self._entries = OrderedDict() # key -> (created_at wall time, symbol, signal)
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="signal-cache") if db else None
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'loaded': 0}
+
+    @staticmethod
+    def key(symbol, candles, last_exit=None, now=None):
+        """Hex digest of the closed candles (indicator window) and exit context. `now` (epoch seconds) decides which candle is still open."""
+        now_ms = (time.time() if now is None else now) * 1000
+        end = len(candles)
+        # Candles are oldest first: only the tail can still be open
+        while end and float(candles[end - 1].get('end_timestamp') or 0) > now_ms:
+            end -= 1
+        h = hashlib.blake2b(digest_size=16)
+        h.update(symbol.encode())
+        window = candles[:end]
+        try:
+            h.update(array('d', chain.from_iterable(map(_candle_fields, window))).tobytes())
+        except (KeyError, TypeError, ValueError):
+            # Slow path: tolerate missing or non-numeric fields
+            h.update(repr([tuple(c.get(f) for f in CANDLE_FIELDS) for c in window]).encode())
+        if last_exit:
+            h.update(repr((last_exit.get('reason'), last_exit.get('candles_ago'))).encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        """Copy of the cached signal (callers annotate it), None on a miss or once expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            if time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return copy.deepcopy(entry[2])
+
+    def _insert(self, key, created_at, symbol, signal):
+        self._entries[key] = (created_at, symbol, signal)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def put(self, key, symbol, signal):
+        signal = copy.deepcopy(signal)
+        created_at = time.time()
+        with self._lock:
+            self._insert(key, created_at, symbol, signal)
+        if self._writer:
+            self._writer.submit(self.db.save_cached_signal, key, symbol, signal)
+
+    def load(self):
+        """Warms the cache from Postgres (entries younger than the TTL). Returns the number loaded."""
+        if not self.db:
+            return 0
+        rows = self.db.load_cached_signals(self.ttl, self.maxsize)
+        now = time.time()
+        with self._lock:
+            # Oldest first, so the LRU order matches creation order
+            for key, symbol, signal, age in sorted(rows, key=lambda r: -r[3]):
+                self._insert(key, now - age, symbol, signal)
+            self.stats['loaded'] += len(rows)
+        return len(rows)
+
+    def hit_rate(self):
+        served = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / served if served else 0.0
+
+    def close(self):
+        if self._writer:
+            self._writer.shutdown(wait=True)
@@ -0,0 +1,24 @@
+import unittest
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseHandler
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Tests against a local Postgres (config DB_*), skipped when none is reachable.
+
+    Each test gets a live DatabaseHandler as self.db. It is closed after the
+    subclass's tearDown, so tearDown can still use it to delete test rows.
+    """
+
+    def setUp(self):
+        self.db = DatabaseHandler()
+        if not self.db.pool.available():
+            self.db.close()
+            self.skipTest("PostgreSQL not available")
+        self.addCleanup(self.db.close)
@@ -0,0 +1,280 @@
+import unittest
+from unittest.mock import AsyncMock
+import asyncio
+import json
+import threading
+import time
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+
+import config
+from ai_analyst import AIAnalyst
+from ai_client import CircuitBreaker
+from prompt_encoding import estimate_tokens
+
+
+class StubAIServer:
+    """Local stand-in for the Surf AI endpoint: fixed (+ per prompt token) latency, scripted error statuses."""
+
+    def __init__(self, delay=0.0, statuses=(), per_token=0.0):
+        self.delay = delay
+        self.per_token = per_token      # extra seconds per prompt token (simulated prefill cost)
+        self.statuses = list(statuses)  # returned (in order) before answering 200
+        self.peers = set()              # distinct client sockets = TCP connections opened
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.batch_sizes = []
+        self.drop = set()               # symbols left out of batched answers
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    async def handle(self, request):
+        self.requests += 1
+        self.peers.add(request.transport.get_extra_info('peername'))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            body = await request.json()
+            system, user = body['messages'][0]['content'], body['messages'][1]['content']
+            await asyncio.sleep(self.delay + self.per_token * estimate_tokens(system + user))
+            if self.statuses:
+                return web.Response(status=self.statuses.pop(0))
+            if '"signals"' in system:
+                # Batched prompt: one entry per "### SYMBOL" block, minus any we were told to drop
+                symbols = [line[4:].split()[0] for line in user.splitlines() if line.startswith("### ")]
+                self.batch_sizes.append(len(symbols))
+                content = json.dumps({"signals": [
+                    {"symbol": s, "action": "SELL", "confidence": 0.7, "reasoning": "stub"}
+                    for s in symbols if s not in self.drop]})
+            else:
+                action = "CLOSE" if "Risk Manager" in system else "BUY"
+                content = json.dumps({"action": action, "confidence": 0.8, "reasoning": "stub"})
+            return web.json_response({"choices": [{"message": {"content": content}}]})
+        finally:
+            self.in_flight -= 1
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_post("/chat/completions", self.handle)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/chat/completions"
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+
+def make_candles(n=20):
+    return [{'open': 1, 'high': 1, 'low': 1, 'close': 1, 'volume': 1, 'end_timestamp': i} for i in range(n)]
+
+
+class TestAIClient(unittest.TestCase):
+    def setUp(self):
+        self.original_config_vals = {k: getattr(config, k) for k in (
+            'AI_API_URL', 'AI_MAX_CONCURRENCY', 'AI_DEADLINE', 'AI_BACKOFF_BASE', 'AI_BACKOFF_MAX',
+            'AI_BATCH_SIZE', 'AI_BREAKER_MIN_SAMPLES', 'AI_BREAKER_COOLDOWN')}
+        config.AI_MAX_CONCURRENCY = 4
+        config.AI_BACKOFF_BASE = 0.01
+        config.AI_BACKOFF_MAX = 0.05
+        self.server = None
+        self.ai = None
+
+    def tearDown(self):
+        if self.ai:
+            self.ai.close()
+        if self.server:
+            self.server.stop()
+        for k, v in self.original_config_vals.items():
+            setattr(config, k, v)
+
+    def start(self, **kwargs):
+        self.server = StubAIServer(**kwargs).start()
+        config.AI_API_URL = self.server.url
+        self.ai = AIAnalyst()
+
+    def test_pooled_concurrent_requests(self):
+        """40 calls share <= AI_MAX_CONCURRENCY keep-alive connections and never stall the caller's loop."""
+        self.start(delay=0.05)
+        n = 40
+
+        async def runner():
+            ticks = 0
+            done = asyncio.Event()
+
+            async def ticker():
+                nonlocal ticks
+                while not done.is_set():
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            task = asyncio.create_task(ticker())
+            started = time.monotonic()
+            signals = await asyncio.gather(*(
+                self.ai.analyze_market_async(f"PERP_T{i}_USDC", make_candles()) for i in range(n)))
+            elapsed = time.monotonic() - started
+            done.set()
+            await task
+            return signals, elapsed, ticks
+
+        signals, elapsed, ticks = asyncio.run(runner())
+
+        self.assertTrue(all(s['action'] == "BUY" and s['confidence'] == 0.8 for s in signals))
+        self.assertLessEqual(self.server.max_in_flight, config.AI_MAX_CONCURRENCY)
+        self.assertLessEqual(len(self.server.peers), config.AI_MAX_CONCURRENCY)
+        self.assertGreaterEqual(elapsed, n * 0.05 / config.AI_MAX_CONCURRENCY * 0.9)
+        self.assertGreater(ticks, elapsed / 0.01 * 0.5)  # event loop kept running
+
+        # The blocking path reuses the same warm connections
+        self.assertEqual(self.ai.evaluate_stale_position("PERP_T0_USDC", -0.01, 30, make_candles()), "CLOSE")
+        self.assertLessEqual(len(self.server.peers), config.AI_MAX_CONCURRENCY)
+
+        stats = self.ai.http.stats
+        print(f"\n⏱️ stub AI: {n} calls in {elapsed:.2f}s ({n / elapsed:.0f} req/s), "
+              f"mean {stats['latency_total'] / stats['requests'] * 1000:.0f}ms, "
+              f"{len(self.server.peers)} connections")
+
+    def test_retries_with_backoff(self):
+        self.start(statuses=[503, 429])
+        signal = self.ai.analyze_market("PERP_ETH_USDC", make_candles())
+        self.assertEqual(signal['action'], "BUY")
+        self.assertEqual(self.ai.http.stats['retries'], 2)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_non_retryable_status(self):
+        self.start(statuses=[400])
+        self.assertIsNone(self.ai.analyze_market("PERP_ETH_USDC", make_candles()))
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.ai.evaluate_stale_position("PERP_ETH_USDC", 0, 30, make_candles()), "CLOSE")
+
+    def test_deadline_bounds_the_call(self):
+        config.AI_DEADLINE = 0.3
+        self.start(delay=2)
+        started = time.monotonic()
+        self.assertIsNone(self.ai.analyze_market("PERP_ETH_USDC", make_candles()))
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(self.ai.http.stats['deadline_exceeded'], 1)
+        # Stale audit fails safe
+        self.assertEqual(self.ai.evaluate_stale_position("PERP_ETH_USDC", 0, 30, make_candles()), "HOLD")
+
+    def test_batch_mode_with_fallback(self):
+        """12 symbols -> 2 batched requests (+1 fallback for the symbol the batch answer left out)."""
+        config.AI_BATCH_SIZE = 10
+        self.start(delay=0.05)
+        self.server.drop = {"PERP_T3_USDC"}
+        items = [{'symbol': f"PERP_T{i}_USDC", 'candles': make_candles(), 'indicators': None, 'last_exit': None}
+                 for i in range(12)]
+
+        started = time.monotonic()
+        signals = asyncio.run(self.ai.analyze_batch_async(items))
+        batched = time.monotonic() - started
+
+        self.assertEqual(sorted(self.server.batch_sizes), [2, 10])
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(signals["PERP_T3_USDC"]['action'], "BUY")  # per-symbol fallback answer
+        for i in (0, 5, 11):
+            self.assertEqual(signals[f"PERP_T{i}_USDC"], {"action": "SELL", "confidence": 0.7, "reasoning": "stub"})
+        self.assertEqual(self.ai.batch_stats, {'batches': 2, 'symbols': 12, 'fallbacks': 1})
+
+        async def one_by_one():
+            return await asyncio.gather(*(self.ai.analyze_market_async(i['symbol'], i['candles']) for i in items))
+        started = time.monotonic()
+        asyncio.run(one_by_one())
+        single = time.monotonic() - started
+        print(f"\n⏱️ 12 symbols: batch {batched:.2f}s / 3 requests vs per-symbol {single:.2f}s / 12 requests")
+
+    def test_unparseable_batch_falls_back(self):
+        self.start()
+        items = [{'symbol': s, 'candles': make_candles()} for s in ("PERP_ETH_USDC", "PERP_BTC_USDC")]
+        self.ai.http.post = AsyncMock(side_effect=[
+            "not json", '{"action": "HOLD"}', '{"action": "BUY"}'])
+        signals = asyncio.run(self.ai.analyze_batch_async(items))
+        self.assertEqual({s['action'] for s in signals.values()}, {"HOLD", "BUY"})
+        self.assertEqual(self.ai.batch_stats['fallbacks'], 2)
+
+    def test_open_circuit_short_circuits(self):
+        """Once the endpoint keeps failing, calls are refused locally instead of waiting on retries."""
+        config.AI_BREAKER_MIN_SAMPLES = 3
+        config.AI_BREAKER_COOLDOWN = 60
+        self.start(statuses=[503] * 10)
+        self.assertIsNone(self.ai.analyze_market("PERP_ETH_USDC", make_candles()))
+        self.assertEqual(self.ai.circuit()['state'], "OPEN")
+
+        sent = self.server.requests
+        started = time.monotonic()
+        self.assertIsNone(self.ai.analyze_market("PERP_BTC_USDC", make_candles()))
+        self.assertLess(time.monotonic() - started, 0.05)
+        self.assertEqual(self.server.requests, sent)
+        self.assertEqual(self.ai.http.stats['short_circuited'], 1)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.original_config_vals = {k: getattr(config, k) for k in (
+            'AI_BREAKER_WINDOW', 'AI_BREAKER_MIN_SAMPLES', 'AI_BREAKER_ERROR_RATE', 'AI_BREAKER_P95',
+            'AI_BREAKER_COOLDOWN')}
+        config.AI_BREAKER_WINDOW = 10
+        config.AI_BREAKER_MIN_SAMPLES = 4
+        config.AI_BREAKER_ERROR_RATE = 0.5
+        config.AI_BREAKER_P95 = 5.0
+        config.AI_BREAKER_COOLDOWN = 30
+        self.now = 1000.0
+        self.breaker = CircuitBreaker(clock=lambda: self.now)
+
+    def tearDown(self):
+        for k, v in self.original_config_vals.items():
+            setattr(config, k, v)
+
+    def test_opens_on_error_rate(self):
+        for healthy in (True, False, True):
+            self.breaker.record(healthy, 0.5)
+        self.assertEqual(self.breaker.state, "CLOSED")  # below AI_BREAKER_MIN_SAMPLES
+        self.breaker.record(False, 0.5)
+        self.assertEqual(self.breaker.state, "OPEN")
+        self.assertEqual(self.breaker.reason, "error rate 50%")
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats['rejected'], 1)
+
+    def test_opens_on_p95_latency(self):
+        for latency in (0.5, 0.6, 0.7, 9.0):
+            self.breaker.record(True, latency)
+        self.assertEqual(self.breaker.snapshot()['state'], "OPEN")
+        self.assertIn("p95", self.breaker.reason)
+
+    def test_half_open_probe(self):
+        for _ in range(4):
+            self.breaker.record(False, 0.1)
+        self.now += 31
+        self.assertEqual(self.breaker.snapshot()['state'], "HALF_OPEN")
+        self.assertTrue(self.breaker.allow())   # the probe
+        self.assertFalse(self.breaker.allow())  # everyone else waits for it
+        self.breaker.record(False, 0.1)
+        self.assertEqual(self.breaker.state, "OPEN")
+
+        self.now += 31
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record(True, 0.2)
+        self.assertEqual(self.breaker.state, "CLOSED")
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.snapshot()['samples'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
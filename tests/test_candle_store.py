@@ -0,0 +1,148 @@
+import math
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_data import CandleStore
+import indicators
+
+
+class FakeExchange:
+    """Serves 15m klines up to a movable 'now', newest first like the Orderly API."""
+    def __init__(self, now, price=float):
+        self.now = now
+        self.price = price  # end timestamp (s) -> close
+        self.calls = []
+
+    def fetch(self, symbol, timeframe, limit):
+        self.calls.append(limit)
+        open_end = (int(self.now) // 900 + 1) * 900  # end of the still-open candle
+        rows = []
+        for i in range(limit):
+            end = open_end - i * 900
+            close = self.price(end)
+            rows.append({'end_timestamp': end * 1000, 'close': close, 'open': close, 'high': close * 1.002,
+                         'low': close * 0.998, 'volume': 1 + end % 7})
+        return rows
+
+
+class TestCandleStore(unittest.TestCase):
+    def setUp(self):
+        self.now = 1_700_000_000.0
+        self.exchange = FakeExchange(self.now)
+        self.store = CandleStore(self.exchange.fetch, capacity=200, max_age=30)
+
+    def get(self, limit=100, timeframe="15m"):
+        with patch('time.time', return_value=self.exchange.now):
+            return self.store.get("PERP_ETH_USDC", timeframe, limit)
+
+    def test_backfill_sorted_oldest_first(self):
+        candles = self.get(100)
+        self.assertEqual(len(candles), 100)
+        ends = [c['end_timestamp'] for c in candles]
+        self.assertEqual(ends, sorted(ends))
+        self.assertEqual(self.store.stats['misses'], 1)
+        self.assertEqual(self.store.stats['requests'], 1)
+
+    def test_fresh_buffer_served_from_memory(self):
+        self.get(100)
+        self.get(20)
+        self.get(100)
+        self.assertEqual(self.store.stats['requests'], 1)
+        self.assertEqual(self.store.stats['hits'], 2)
+
+    def test_only_tail_fetched_after_new_candles(self):
+        self.store.max_age = 0
+        first = self.get(100)
+
+        # Two more 15m candles close
+        self.exchange.now += 1800
+        candles = self.get(100)
+
+        self.assertEqual(self.store.stats['requests'], 2)
+        self.assertLessEqual(self.exchange.calls[-1], 5)  # tail only, not 100
+        self.assertEqual(candles[-1]['end_timestamp'] - first[-1]['end_timestamp'], 1800 * 1000)
+        ends = [c['end_timestamp'] for c in candles]
+        self.assertEqual(len(set(ends)), len(ends))  # no duplicates after merge
+        self.assertEqual(ends, list(range(ends[0], ends[-1] + 1, 900 * 1000)))  # no gaps
+
+    def test_open_candle_is_replaced(self):
+        self.store.max_age = 0
+        self.get(10)
+        self.exchange.now += 60  # same open candle, new close
+        candles = self.get(10)
+        self.assertEqual(len(candles), 10)
+        self.assertEqual(len({c['end_timestamp'] for c in candles}), 10)
+
+    def test_large_gap_triggers_backfill(self):
+        self.store.max_age = 0
+        self.get(100)
+        self.exchange.now += 900 * 400  # longer than the buffer
+        self.get(100)
+        self.assertEqual(self.exchange.calls[-1], 100)
+        self.assertEqual(self.store.stats['misses'], 2)
+
+    def indicators(self, limit=100):
+        with patch('time.time', return_value=self.exchange.now):
+            return self.store.indicators("PERP_ETH_USDC", "15m", limit)
+
+    def test_indicator_stream_updates_incrementally(self):
+        self.store.max_age = 0
+        first = self.indicators()
+        self.assertEqual(self.store.stats['stream_rebuilds'], 1)
+
+        self.exchange.now += 1800  # two more candles close
+        inds = self.indicators()
+        self.assertEqual(self.store.stats['stream_rebuilds'], 1)
+        self.assertEqual(self.store.stats['stream_updates'], 2)
+        self.assertGreater(inds['current_price'], first['current_price'])
+
+        # Same values as recomputing over everything the buffer holds
+        expected = indicators.calculate_indicators(list(self.store._buffers[("PERP_ETH_USDC", "15m")]))
+        for key in ("MA_SHORT", "MA_MEDIUM", "MA_LONG", "EMA_SLOW", "RSI", "ATR", "BB_MIDDLE"):
+            self.assertAlmostEqual(inds[key], expected[key], places=6)
+
+    def test_indicator_stream_rebuilt_on_gap(self):
+        self.store.max_age = 0
+        self.indicators()
+        self.exchange.now += 900 * 400  # buffer backfilled, no longer connects
+        self.indicators()
+        self.assertEqual(self.store.stats['stream_rebuilds'], 2)
+
+    def test_indicator_stream_seeded_from_limit_window(self):
+        self.get(200)  # buffer holds more history than the window asked for
+        inds = self.indicators(50)
+        expected = indicators.calculate_indicators(self.get(50))
+        for key, value in expected.items():
+            self.assertAlmostEqual(inds[key], value, places=6, msg=key)
+
+    def test_streamed_values_vs_vectorized_window(self):
+        """
+        Pins how far the stream drifts from calculate_indicators(candles[-limit:]) once it has
+        consumed candles past its seed window: fixed-window indicators stay exact, EMA / RSI / ATR
+        differ only by the decayed weight of the window's first candles.
+        """
+        self.exchange.price = lambda end: 2000 + 50 * math.sin(end / 5000) + (end % 13)
+        self.store.max_age = 0
+        self.indicators(100)
+        self.exchange.now += 900 * 30  # 30 more candles close and stream in
+        inds = self.indicators(100)
+        self.assertEqual(self.store.stats['stream_rebuilds'], 1)
+
+        expected = indicators.calculate_indicators(self.get(100))
+        for key in ("MA_SHORT", "MA_MEDIUM", "MA_LONG", "BB_UPPER", "BB_MIDDLE", "BB_LOWER", "VWAP", "VOLUME_Z", "current_price"):
+            self.assertAlmostEqual(inds[key], expected[key], places=6, msg=key)
+        for key, tolerance in (("EMA_FAST", 1e-6), ("EMA_SLOW", 1e-4), ("RSI", 5e-3), ("ATR", 1e-3)):
+            self.assertNotEqual(inds[key], expected[key], msg=key)
+            self.assertLess(abs(inds[key] - expected[key]) / abs(expected[key]), tolerance, msg=key)
+
+    def test_failed_fetch_returns_empty(self):
+        store = CandleStore(lambda *a: [], capacity=50)
+        self.assertEqual(store.get("PERP_ETH_USDC", "15m", 10), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from unittest.mock import MagicMock
+import time
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_case import DatabaseTestCase
+from dashboard_data import TradeFeed, summarize
+
+SYMBOL = 'PERP_DASHTEST_USDC'
+
+
+def row(row_id, status, pnl=None, symbol="PERP_ETH_USDC"):
+    return (row_id, None, symbol, 'BUY', 0.8, status, pnl)
+
+
+class TestDashboardData(unittest.TestCase):
+    def test_summarize(self):
+        metrics, by_symbol = summarize([
+            ("PERP_ETH_USDC", 10, 4, 3, 2, 5.0),
+            ("PERP_BTC_USDC", 5, 1, 1, 0, -2.0),
+            ("PERP_ARB_USDC", 2, 1, 0, 0, 0.0),   # one trade, still open
+            ("PERP_SOL_USDC", 3, 0, 0, 0, 0.0),
+        ])
+        # Win rate over executed trades (open ones included), as the dashboard always showed it
+        self.assertEqual(metrics, {'signals': 20, 'trades': 6, 'closed': 4, 'realized_pnl': 3.0,
+                                   'win_rate': 2 / 6 * 100})
+        self.assertEqual(list(by_symbol['symbol']), ["PERP_ETH_USDC", "PERP_BTC_USDC", "PERP_ARB_USDC"])
+        self.assertEqual(summarize([])[0]['win_rate'], 0.0)
+
+    def test_feed_reads_only_new_and_pending_rows(self):
+        db = MagicMock()
+        feed = TradeFeed(db, size=3)
+        db.get_trade_feed.return_value = [row(1, 'CLOSED_TP', 1.0), row(2, 'OPEN'), row(3, 'SIGNAL_GENERATED')]
+        frame = feed.refresh()
+        db.get_trade_feed.assert_called_with(0, 3)
+        db.get_trade_rows.assert_not_called()
+        self.assertEqual(list(frame['id']), [3, 2, 1])
+
+        # Trade 2 closed meanwhile, one new signal arrived
+        db.get_trade_feed.return_value = [row(4, 'SIGNAL_GENERATED')]
+        db.get_trade_rows.return_value = [row(2, 'CLOSED_SL', -0.5), row(3, 'SKIPPED')]
+        frame = feed.refresh()
+        db.get_trade_feed.assert_called_with(3, 3)
+        self.assertEqual(sorted(db.get_trade_rows.call_args[0][0]), [2, 3])  # closed row 1 is not re-read
+        self.assertEqual(list(frame['id']), [4, 3, 2])
+        self.assertEqual(frame.set_index('id').loc[2, 'status'], 'CLOSED_SL')
+        self.assertEqual(feed.last_seen, 4)
+
+
+class TestTradeStats(DatabaseTestCase):
+    """trade_stats trigger against a local Postgres."""
+
+    def tearDown(self):
+        with self.db.cursor() as cur:
+            cur.execute("DELETE FROM trade_logs WHERE symbol = %s;", (SYMBOL,))
+            cur.execute("DELETE FROM trade_stats WHERE symbol = %s;", (SYMBOL,))
+
+    def stats(self):
+        return next((r[1:] for r in self.db.get_trade_stats() if r[0] == SYMBOL), None)
+
+    def recomputed(self):
+        with self.db.cursor() as cur:
+            cur.execute("""
+                SELECT COUNT(*),
+                       COUNT(*) FILTER (WHERE status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL')),
+                       COUNT(*) FILTER (WHERE status IN ('CLOSED_TP', 'CLOSED_SL') AND pnl IS NOT NULL),
+                       COUNT(*) FILTER (WHERE status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL') AND pnl > 0),
+                       COALESCE(SUM(pnl) FILTER (WHERE status IN ('OPEN', 'CLOSED_TP', 'CLOSED_SL')), 0)
+                FROM trade_logs WHERE symbol = %s;
+            """, (SYMBOL,))
+            return tuple(cur.fetchone())
+
+    def test_trigger_tracks_lifecycle(self):
+        ids = []
+        for n in range(3):
+            ids.append(self.db.log_signal(SYMBOL, {'log_id': f"dash_{n}_{time.time()}", 'action': 'BUY',
+                                                   'confidence': 0.8, 'reasoning': 'x'}, {}))
+        self.assertEqual(self.stats(), (3, 0, 0, 0, 0.0))
+
+        with self.db.cursor() as cur:
+            cur.execute("UPDATE trade_logs SET status = 'OPEN', entry_price = 100 WHERE id = ANY(%s);", (ids[:2],))
+            cur.execute("UPDATE trade_logs SET highest_price = 101 WHERE id = %s;", (ids[0],))  # no-op for stats
+        self.assertEqual(self.stats(), (3, 2, 0, 0, 0.0))
+
+        self.assertEqual(self.db.log_pnl(SYMBOL, 102.0, 2.0, "CLOSED_TP"), ids[1])
+        self.db.update_exit_fill(ids[1], 103.0, 3.0)  # revised exit
+        self.assertEqual(self.stats(), self.recomputed())
+        self.assertEqual(self.stats(), (3, 2, 1, 1, 3.0))
+
+        # Manual closes were never counted as executed trades on the dashboard
+        self.db.close_trades({SYMBOL: 102.0})
+        self.assertEqual(self.stats(), self.recomputed())
+        self.assertEqual(self.stats(), (3, 1, 1, 1, 3.0))
+
+        with self.db.cursor() as cur:
+            cur.execute("DELETE FROM trade_logs WHERE id = %s;", (ids[2],))
+        self.assertEqual(self.stats(), self.recomputed())
+
+    def test_stats_read_cost_independent_of_history(self):
+        with self.db.cursor() as cur:
+            cur.execute("""
+                INSERT INTO trade_logs (symbol, ai_action, status, pnl)
+                SELECT %s, 'BUY', CASE WHEN g %% 3 = 0 THEN 'CLOSED_TP' ELSE 'SIGNAL_GENERATED' END,
+                       CASE WHEN g %% 3 = 0 THEN 1.0 END
+                FROM generate_series(1, 5000) g;
+            """, (SYMBOL,))
+        self.assertEqual(self.stats(), self.recomputed())
+
+        started = time.perf_counter()
+        for _ in range(20):
+            self.db.get_trade_stats()
+        summary = (time.perf_counter() - started) / 20
+        started = time.perf_counter()
+        for _ in range(20):
+            self.recomputed()
+        scan = (time.perf_counter() - started) / 20
+        print(f"\n⏱️ dashboard metrics: trade_stats {summary * 1000:.2f}ms vs aggregate scan {scan * 1000:.2f}ms")
+
+if __name__ == '__main__':
+    unittest.main()
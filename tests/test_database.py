@@ -3,16 +3,18 @@ from unittest.mock import MagicMock, patch
 import sys
 import os
 import datetime
+import psycopg2
 
 # Add parent dir
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import DatabaseHandler
+from database import DatabaseHandler, DatabaseUnavailable
 
 class TestDatabase(unittest.TestCase):
     def setUp(self):
         # Mock psycopg2 connection
         self.mock_conn = MagicMock()
+        self.mock_conn.closed = 0
         self.mock_cursor = MagicMock()
         self.mock_conn.cursor.return_value.__enter__.return_value = self.mock_cursor
         
@@ -20,7 +22,7 @@ class TestDatabase(unittest.TestCase):
         # Since DatabaseHandler connects in __init__, we need to patch connect
         with patch('psycopg2.connect', return_value=self.mock_conn):
              self.db = DatabaseHandler()
-             self.db.conn = self.mock_conn # Ensure it's set
+             self.db.pool.reset([self.mock_conn]) # Ensure it's pooled
 
     def test_get_open_trade_state_success(self):
         # Setup Mock Return
@@ -97,5 +99,69 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(params, (new_price, new_price, log_id))
         print("\n✅ Test Passed: update_entry_price updates both entry and HWM")
 
+    def test_dropped_connection_is_replaced(self):
+        """A connection-level error discards the socket; the next call checks out a fresh one."""
+        self.mock_cursor.execute.side_effect = psycopg2.OperationalError("server closed the connection")
+        self.assertEqual(self.db.get_all_open_symbols(), [])
+
+        fresh_conn = MagicMock()
+        fresh_conn.closed = 0
+        fresh_cursor = fresh_conn.cursor.return_value.__enter__.return_value
+        fresh_cursor.fetchall.return_value = [('PERP_ETH_USDC',)]
+        with patch('psycopg2.connect', return_value=fresh_conn):
+            self.assertEqual(self.db.get_all_open_symbols(), ['PERP_ETH_USDC'])
+        self.mock_conn.close.assert_called()
+        self.assertEqual(self.db.pool.stats['discarded'], 1)
+
+    def test_reconnect_backs_off(self):
+        """While the DB is down, connects are retried with backoff instead of on every call."""
+        self.db.pool.reset()
+        with patch('psycopg2.connect', side_effect=psycopg2.OperationalError("down")) as connect:
+            self.assertEqual(self.db.get_all_open_symbols(), [])
+            self.assertEqual(self.db.get_all_open_symbols(), [])
+            self.assertIsNone(self.db.get_config("is_paused"))
+        self.assertEqual(connect.call_count, 1)
+        self.assertFalse(self.db.pool.available())
+
+    def test_concurrent_checkouts_use_separate_connections(self):
+        self.db.pool.reset()
+        conns = []
+        def new_conn(**kwargs):
+            conn = MagicMock()
+            conn.closed = 0
+            conns.append(conn)
+            return conn
+
+        with patch('psycopg2.connect', side_effect=new_conn):
+            with self.db.cursor():
+                with self.db.cursor():
+                    pass
+            with self.db.cursor():
+                pass
+        self.assertEqual(len(conns), 2)  # third checkout reuses an idle connection
+
+    def test_handler_pool_size(self):
+        """tg_bot.py builds its handler with a small pool of its own: extra checkouts wait, then fail."""
+        with patch('psycopg2.connect', side_effect=lambda **kwargs: MagicMock(closed=0)):
+            db = DatabaseHandler(maxconn=2)
+            db.pool.timeout = 0.05
+            with db.connection(), db.connection():
+                with self.assertRaises(DatabaseUnavailable):
+                    with db.connection():
+                        pass
+        self.assertEqual(db.pool.maxconn, 2)
+
+    def test_connection_is_not_shared_while_checked_out(self):
+        other = MagicMock()
+        other.closed = 0
+        with patch('psycopg2.connect', return_value=other):
+            with self.db.connection() as conn:
+                self.assertIs(conn, self.mock_conn)
+                with self.db.cursor():
+                    pass  # a concurrent caller gets a second connection
+                self.assertTrue(other.cursor.called)
+                self.assertEqual(self.db.pool._in_use, 1)
+        self.assertEqual(self.db.pool._in_use, 0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,261 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+import asyncio
+import json
+import datetime
+import time
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import indicators
+from engine import TradingEngine
+
+
+def make_candles(n=100, price=100.0):
+    return [{'open': price, 'high': price, 'low': price, 'close': price, 'volume': 1.0,
+             'end_timestamp': 1700000000000 + i * 900000} for i in range(n)]
+
+
+class TestTradingEngine(unittest.TestCase):
+    def setUp(self):
+        self.md = MagicMock()
+        self.ai = MagicMock()
+        self.exec_mod = MagicMock()
+        self.db = MagicMock()
+        self.notifier = MagicMock()
+        self.ai.analyze_market_async = AsyncMock()
+        self.ai.circuit.return_value = {'state': 'CLOSED', 'reason': None}
+
+        self.md.get_positions.return_value = {'data': {'rows': []}}
+        self.md.get_ohlcv.return_value = make_candles()
+        self.md.get_indicators.side_effect = lambda *a, **k: indicators.calculate_indicators(make_candles())
+        self.db.get_config.side_effect = lambda key, default=None: default
+        self.db.get_pending_commands.return_value = []
+        self.db.get_last_exit_info.return_value = (None, None)
+        self.db.get_all_open_symbols.return_value = []
+        self.db.listen.return_value = None  # no LISTEN thread: commands are polled
+
+        self.original_config_vals = {k: getattr(config, k) for k in (
+            'RISK_INTERVAL', 'COMMAND_POLL_INTERVAL', 'POLL_INTERVAL', 'SCAN_INTERVAL',
+            'STALE_CHECK_INTERVAL', 'ENABLE_TOP_10', 'MAX_OPEN_POSITIONS',
+            'ANALYSIS_WORKERS', 'PREFILTER_ENABLED', 'AI_BATCH_MODE', 'AI_TICK_BUDGET')}
+        config.PREFILTER_ENABLED = False  # flat test candles would be screened out; see test_prefilter_gate
+        config.RISK_INTERVAL = 0.05
+        config.COMMAND_POLL_INTERVAL = 0.05
+        config.POLL_INTERVAL = 0.05
+        config.SCAN_INTERVAL = 3600
+        config.STALE_CHECK_INTERVAL = 3600
+
+        self.engine = TradingEngine(self.md, self.ai, self.exec_mod, self.db, self.notifier)
+
+    def tearDown(self):
+        self.engine.close()
+        for k, v in self.original_config_vals.items():
+            setattr(config, k, v)
+
+    def run_engine(self, seconds):
+        async def runner():
+            try:
+                await asyncio.wait_for(self.engine.run(), timeout=seconds)
+            except asyncio.TimeoutError:
+                pass
+        asyncio.run(runner())
+
+    def test_risk_monitor_not_blocked_by_slow_ai(self):
+        """Risk ticks keep their cadence while an AI call takes 10x the risk period."""
+        config.ENABLE_TOP_10 = False
+
+        async def slow_ai(*args, **kwargs):
+            await asyncio.sleep(0.5)
+            return {'action': 'HOLD', 'confidence': 0.5}
+        self.ai.analyze_market_async.side_effect = slow_ai
+        self.exec_mod.validate_signal.return_value = False
+
+        self.run_engine(0.6)
+
+        self.ai.analyze_market_async.assert_called()
+        # 0.6s / 0.05s period -> expect ~12 risk checks, not 1-2
+        self.assertGreaterEqual(self.exec_mod.monitor_risks.call_count, 8)
+        print("\n✅ Test Passed: risk monitor kept ticking during slow AI call")
+
+    def test_cooldown_skips_ai(self):
+        """A fresh exit on the current candle skips the AI call for that symbol."""
+        self.db.get_last_exit_info.return_value = (datetime.datetime.now(), "CLOSED_SL")
+
+        async def runner():
+            self.engine._positions_ready.set()
+            self.engine.top_list = ["PERP_ETH_USDC"]
+            await self.engine.analysis_tick()
+        asyncio.run(runner())
+
+        self.ai.analyze_market_async.assert_not_called()
+        self.assertIn("PERP_ETH_USDC", self.engine.analysis_timers)
+
+    def test_max_open_positions_respected(self):
+        """Entries placed in this pass count towards MAX_OPEN_POSITIONS before the next snapshot."""
+        config.MAX_OPEN_POSITIONS = 1
+        self.ai.analyze_market_async.return_value = {'action': 'BUY', 'confidence': 0.9}
+        self.exec_mod.validate_signal.return_value = True
+
+        async def runner():
+            self.engine._positions_ready.set()
+            self.engine.top_list = ["PERP_ETH_USDC", "PERP_BTC_USDC"]
+            await self.engine.analysis_tick()
+        asyncio.run(runner())
+
+        self.assertEqual(self.exec_mod.execute_trade.call_count, 1)
+        self.assertEqual(len(self.engine.held_symbols()), 1)
+
+    def test_concurrent_workers_share_last_slot(self):
+        """Two workers with BUY signals and one slot left -> exactly one order."""
+        config.MAX_OPEN_POSITIONS = 2
+        config.ANALYSIS_WORKERS = 4
+        self.engine.active_symbols = {"PERP_DOGE_USDC"}
+
+        async def slow_buy(*args, **kwargs):
+            await asyncio.sleep(0.1)
+            return {'action': 'BUY', 'confidence': 0.9}
+        self.ai.analyze_market_async.side_effect = slow_buy
+        self.exec_mod.validate_signal.return_value = True
+
+        async def runner():
+            self.engine._positions_ready.set()
+            self.engine.top_list = ["PERP_ETH_USDC", "PERP_BTC_USDC", "PERP_SOL_USDC"]
+            await self.engine.analysis_tick()
+        asyncio.run(runner())
+
+        self.assertEqual(self.ai.analyze_market_async.call_count, 3)
+        self.assertEqual(self.exec_mod.execute_trade.call_count, 1)
+        self.assertEqual(len(self.engine.held_symbols()), 2)
+
+    def test_workers_reduce_pass_wall_time(self):
+        """4 symbols x 0.2s AI with 4 workers finishes well under the 0.8s serial time."""
+        config.MAX_OPEN_POSITIONS = 10
+        config.ANALYSIS_WORKERS = 4
+
+        async def slow_hold(*args, **kwargs):
+            await asyncio.sleep(0.2)
+            return {'action': 'HOLD', 'confidence': 0.5}
+        self.ai.analyze_market_async.side_effect = slow_hold
+        self.exec_mod.validate_signal.return_value = False
+
+        async def runner():
+            self.engine._positions_ready.set()
+            self.engine.top_list = [f"PERP_T{i}_USDC" for i in range(4)]
+            await self.engine.analysis_tick()
+        asyncio.run(runner())
+
+        stats = self.engine.last_analysis_pass
+        self.assertEqual(stats['symbols'], 4)
+        self.assertGreaterEqual(stats['serial'], 0.8)
+        self.assertLess(stats['wall'], 0.5)
+
+    def test_prefilter_gate(self):
+        """Flat candles never reach the AI; trending ones do, with their prefetched indicators."""
+        config.PREFILTER_ENABLED = True
+        trending = [{'open': 100 + i, 'high': 101 + i, 'low': 99 + i, 'close': 100 + i, 'volume': 1.0,
+                     'end_timestamp': 1700000000000 + i * 900000} for i in range(100)]
+        self.md.get_indicators.side_effect = lambda symbol, **k: indicators.calculate_indicators(
+            trending if symbol == "PERP_ETH_USDC" else make_candles())
+        self.ai.analyze_market_async.return_value = {'action': 'HOLD', 'confidence': 0.5}
+        self.exec_mod.validate_signal.return_value = False
+
+        async def runner():
+            self.engine._positions_ready.set()
+            self.engine.top_list = ["PERP_ETH_USDC", "PERP_BTC_USDC", "PERP_SOL_USDC"]
+            await self.engine.analysis_tick()
+        asyncio.run(runner())
+
+        self.assertEqual(self.engine.last_prefilter, {'passed': 1, 'skipped': 2})
+        self.ai.analyze_market_async.assert_called_once()
+        self.assertEqual(self.ai.analyze_market_async.call_args[0][0], "PERP_ETH_USDC")
+        self.assertEqual(self.md.get_indicators.call_count, 3)  # not fetched again for the AI call
+
+    def test_open_circuit_skips_ai(self):
+        """No AI calls while the circuit is open; the state change is published for /status."""
+        self.ai.circuit.return_value = {'state': 'OPEN', 'reason': 'error rate 60%'}
+
+        async def runner():
+            self.engine._positions_ready.set()
+            self.engine.top_list = ["PERP_ETH_USDC", "PERP_BTC_USDC"]
+            await self.engine.analysis_tick()
+            await self.engine.analysis_tick()
+        asyncio.run(runner())
+
+        self.ai.analyze_market_async.assert_not_called()
+        self.assertEqual(self.engine.last_analysis_pass['shed'], 2)
+        circuit_writes = [c for c in self.db.set_config.call_args_list if c[0][0] == "ai_circuit"]
+        self.assertEqual(len(circuit_writes), 1)  # only on change
+        self.assertEqual(json.loads(circuit_writes[0][0][1])['state'], "OPEN")
+
+    def test_tick_budget_sheds_symbols(self):
+        """Symbols still queued when AI_TICK_BUDGET runs out wait for the next pass, without a cooldown."""
+        config.AI_TICK_BUDGET = 0.15
+        config.ANALYSIS_WORKERS = 1
+        self.exec_mod.validate_signal.return_value = False
+
+        async def slow_hold(symbol, *a, **k):
+            await asyncio.sleep(0.1)
+            return {'action': 'HOLD', 'confidence': 0.5}
+        self.ai.analyze_market_async.side_effect = slow_hold
+
+        async def runner():
+            self.engine._positions_ready.set()
+            self.engine.top_list = ["PERP_ETH_USDC", "PERP_BTC_USDC", "PERP_SOL_USDC", "PERP_ARB_USDC"]
+            await self.engine.analysis_tick()
+        asyncio.run(runner())
+
+        self.assertEqual(self.ai.analyze_market_async.call_count, 2)
+        self.assertEqual(self.engine.last_analysis_pass['shed'], 2)
+        self.assertLessEqual(self.ai.analyze_market_async.call_args_list[1][1]['timeout'], 0.05 + 0.01)
+
+    def test_batch_mode_one_ai_call(self):
+        """AI_BATCH_MODE: all queued symbols go to the AI together; slots still bound the entries."""
+        config.AI_BATCH_MODE = True
+        config.MAX_OPEN_POSITIONS = 2
+        symbols = ["PERP_ETH_USDC", "PERP_BTC_USDC", "PERP_SOL_USDC"]
+        self.ai.analyze_batch_async = AsyncMock(return_value={s: {'action': 'BUY', 'confidence': 0.9} for s in symbols})
+        self.exec_mod.validate_signal.return_value = True
+
+        async def runner():
+            self.engine._positions_ready.set()
+            self.engine.top_list = symbols
+            await self.engine.analysis_tick()
+        asyncio.run(runner())
+
+        self.ai.analyze_batch_async.assert_awaited_once()
+        self.assertEqual([i['symbol'] for i in self.ai.analyze_batch_async.call_args[0][0]], symbols)
+        self.ai.analyze_market_async.assert_not_called()
+        self.assertEqual(self.exec_mod.execute_trade.call_count, 2)
+        self.assertEqual(self.engine.last_analysis_pass['symbols'], 3)
+
+    def test_reconcile_closes_zombie(self):
+        """OPEN in DB but flat on exchange -> CLOSED_MANUAL with estimated price."""
+        self.db.get_all_open_symbols.return_value = ["PERP_SOL_USDC"]
+        self.md.get_ohlcv.return_value = [{'close': 150.0}]
+
+        asyncio.run(self.engine.reconcile_tick())
+
+        self.db.close_zombie_trade.assert_called_with("PERP_SOL_USDC", 150.0)
+
+    def test_close_all_reports_time_to_flat(self):
+        self.md.get_positions.return_value = {'data': {'rows': [
+            {'symbol': "PERP_ETH_USDC", 'position_qty': 1.0}, {'symbol': "PERP_SOL_USDC", 'position_qty': -2.0}]}}
+        self.exec_mod.close_all.return_value = {
+            'closed': ["PERP_ETH_USDC"], 'failed': ["PERP_SOL_USDC"], 'time_to_flat': 0.42}
+
+        asyncio.run(self.engine.handle_command("CLOSE_ALL", {}))
+
+        self.assertTrue(self.engine.is_paused)
+        self.exec_mod.close_all.assert_called_once()
+        self.db.close_zombie_trade.assert_not_called()
+        summary = self.notifier.send_message.call_args[0][0]
+        self.assertIn("Closed 1/2 positions in 0.42s", summary)
+        self.assertIn("PERP_SOL_USDC", summary)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import time
 
 # Add parent dir to path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -81,11 +82,9 @@ class TestExecution(unittest.TestCase):
         with patch('sys.stdout', new_callable=MagicMock) as mock_stdout:
             self.exec_mod.monitor_risks([pos], self.mock_md)
             
-            # Verify DB HWM Update was called with 1025
-            self.mock_db.update_highest_price.assert_called()
-            # Check args: (log_id, new_hwm)
-            args, _ = self.mock_db.update_highest_price.call_args
-            self.assertEqual(args[1], 1025.0)
+            # HWM is written behind: verify the batched flush carries 1025
+            self.exec_mod.flush_state()
+            self.mock_db.update_highest_prices.assert_called_with([("log_123", 1025.0)])
             
             # Verify NO close happened yet (Stop shouldn't be hit at peak)
             self.exec_mod.close_position.assert_not_called()
@@ -146,9 +145,9 @@ class TestExecution(unittest.TestCase):
         
         self.exec_mod.monitor_risks([pos], self.mock_md)
         
-        # Verify HWM Update (Lowest Price)
-        args, _ = self.mock_db.update_highest_price.call_args
-        self.assertEqual(args[1], 975.0)
+        # Verify HWM Update (Lowest Price), flushed in a batch
+        self.exec_mod.flush_state()
+        self.mock_db.update_highest_prices.assert_called_with([("log_123", 975.0)])
         self.exec_mod.close_position.assert_not_called()
         
         # --- Step 2: Market bounces to 990 (Callback) ---
@@ -166,5 +165,156 @@ class TestExecution(unittest.TestCase):
         
         self.exec_mod.close_position.assert_called_with(symbol, 0.1, "BUY")
 
+    def test_state_cached_and_hwm_coalesced(self):
+        """Risk ticks read state from memory and persist many HWM moves as one batched write."""
+        config.HWM_FLUSH_INTERVAL, original = 3600, config.HWM_FLUSH_INTERVAL
+        try:
+            self.mock_db.get_open_trade_states.return_value = {
+                "PERP_BTC_USDC": ("log_btc", 1000.0, 1000.0, None),
+                "PERP_ETH_USDC": ("log_eth", 100.0, 100.0, None),
+            }
+            positions = [
+                {'symbol': "PERP_BTC_USDC", 'position_qty': 0.1, 'average_open_price': 1000.0},
+                {'symbol': "PERP_ETH_USDC", 'position_qty': -1.0, 'average_open_price': 100.0},
+            ]
+            with patch('sys.stdout', new_callable=MagicMock):
+                for step in range(1, 6):
+                    self.mock_md.get_orderbook.side_effect = lambda s, step=step: {'data': {
+                        'asks': [{'price': 1000 + step if 'BTC' in s else 100 - step * 0.1}],
+                        'bids': [{'price': 1000 + step if 'BTC' in s else 100 - step * 0.1}]}}
+                    self.exec_mod.monitor_risks(positions, self.mock_md)
+
+            self.mock_db.get_open_trade_states.assert_called_once()
+            self.mock_db.get_open_trade_state.assert_not_called()
+            self.mock_db.update_highest_prices.assert_not_called()
+            self.mock_db.update_highest_price.assert_not_called()
+
+            self.assertEqual(self.exec_mod.flush_state(), 2)
+            updates = dict(self.mock_db.update_highest_prices.call_args[0][0])
+            self.assertEqual(updates["log_btc"], 1005.0)
+            self.assertAlmostEqual(updates["log_eth"], 99.5)
+        finally:
+            config.HWM_FLUSH_INTERVAL = original
+
+    def test_prices_from_positions_payload(self):
+        """mark_price in the positions rows is used directly: no per-symbol requests, whatever the count."""
+        self.mock_db.get_open_trade_states.return_value = {}
+        self.mock_db.get_open_trade_state.return_value = ("log_x", 100.0, 100.0, None)
+        positions = [{'symbol': f"PERP_T{i}_USDC", 'position_qty': 1.0, 'average_open_price': 100.0,
+                      'mark_price': 100.5} for i in range(20)]
+        with patch('sys.stdout', new_callable=MagicMock):
+            self.exec_mod.monitor_risks(positions, self.mock_md)
+        self.mock_md.get_orderbook.assert_not_called()
+        self.mock_md.get_mark_prices.assert_not_called()
+        self.mock_md.get_ohlcv.assert_not_called()
+
+    def test_missing_marks_fetched_in_one_call(self):
+        from market_data import PriceSnapshot
+        now = time.time()
+        self.mock_md.get_mark_prices.return_value = {"PERP_ETH_USDC": (2000.0, now), "PERP_SOL_USDC": (150.0, now - 60)}
+        self.mock_md.get_orderbook.return_value = {'data': {'asks': [{'price': 151}], 'bids': [{'price': 149}]}}
+        positions = [
+            {'symbol': "PERP_BTC_USDC", 'position_qty': 0.1, 'mark_price': 60000.0},
+            {'symbol': "PERP_ETH_USDC", 'position_qty': 1.0},
+            {'symbol': "PERP_SOL_USDC", 'position_qty': -2.0},  # all-markets quote too old
+        ]
+        snap = PriceSnapshot.capture(self.mock_md, positions, max_age=10)
+
+        self.assertEqual((snap.get("PERP_BTC_USDC"), snap.source("PERP_BTC_USDC")), (60000.0, 'mark'))
+        self.assertEqual((snap.get("PERP_ETH_USDC"), snap.source("PERP_ETH_USDC")), (2000.0, 'futures_info'))
+        self.assertEqual((snap.get("PERP_SOL_USDC"), snap.source("PERP_SOL_USDC")), (150.0, 'orderbook'))
+        self.assertLess(snap.age("PERP_SOL_USDC"), 1)
+        self.mock_md.get_mark_prices.assert_called_once()
+        self.mock_md.get_orderbook.assert_called_once_with("PERP_SOL_USDC")
+
+    def test_kline_fallback_bypasses_warm_candle_store(self):
+        """Orderbook down: the 1m fallback must not serve a store buffer fetched seconds ago as a fresh quote."""
+        from market_data import MarketData, PriceSnapshot
+        with patch('market_data.OrderlyClient') as rest:
+            md = MarketData()
+        client = rest.return_value
+        def kline(close):
+            end = (int(time.time()) // 60 + 1) * 60 * 1000
+            return {'data': {'rows': [{'end_timestamp': end, 'close': close, 'open': close, 'high': close,
+                                       'low': close, 'volume': 1}]}}
+
+        client.get_kline.return_value = kline(100.0)
+        md.get_ohlcv("PERP_ETH_USDC", "1m", 1)  # store warm...
+        key = ("PERP_ETH_USDC", "1m")
+        md.candles._refreshed[key] -= 20        # ...but 20s old, still inside CANDLE_STORE_MAX_AGE
+        md.candles._fetched_at[key] -= 20
+        self.assertEqual(md.get_ohlcv("PERP_ETH_USDC", "1m", 1)[-1]['close'], 100.0)
+
+        client.get_orderbook_snapshot.side_effect = Exception("orderbook down")
+        client.get_kline.return_value = kline(95.0)  # market moved since
+        positions = [{'symbol': "PERP_ETH_USDC", 'position_qty': 1.0}]
+        with patch('sys.stdout', new_callable=MagicMock):
+            snap = PriceSnapshot.capture(md, positions, max_age=10)
+
+        self.assertEqual((snap.get("PERP_ETH_USDC"), snap.source("PERP_ETH_USDC")), (95.0, 'kline_1m'))
+        self.assertLess(snap.age("PERP_ETH_USDC"), 1)
+
+    def test_load_does_not_block_hwm_updates(self):
+        """A first get() querying the DB must not hold the lock the risk threads use."""
+        import threading
+        positions = self.exec_mod.positions
+        positions.put("PERP_ETH_USDC", "log_eth", 100.0, 100.0)
+        querying, release = threading.Event(), threading.Event()
+        def slow_states():
+            querying.set()
+            release.wait(5)
+            return {"PERP_BTC_USDC": ("log_btc", 1000.0, 1000.0, None), "PERP_ETH_USDC": ("stale", 0, 0, None)}
+        self.mock_db.get_open_trade_states.side_effect = slow_states
+
+        reader = threading.Thread(target=positions.get, args=("PERP_BTC_USDC",))
+        reader.start()
+        self.assertTrue(querying.wait(5))
+        started = time.monotonic()
+        positions.set_hwm("PERP_ETH_USDC", 101.0)
+        positions.flush_if_due()
+        self.assertLess(time.monotonic() - started, 0.5)
+        release.set()
+        reader.join(5)
+
+        self.assertEqual(positions.get("PERP_BTC_USDC")[0], "log_btc")
+        self.assertEqual(positions.get("PERP_ETH_USDC")[:2], ("log_eth", 101.0))  # not overwritten by the load
+        self.mock_db.get_open_trade_states.assert_called_once()
+
+    def test_failed_flush_is_retried(self):
+        self.mock_db.get_open_trade_states.return_value = {"PERP_BTC_USDC": ("log_btc", 1000.0, 1000.0, None)}
+        self.exec_mod.positions.get("PERP_BTC_USDC")
+        self.exec_mod.positions.set_hwm("PERP_BTC_USDC", 1010.0)
+
+        self.mock_db.update_highest_prices.return_value = False
+        self.assertEqual(self.exec_mod.flush_state(), 0)
+        self.mock_db.update_highest_prices.return_value = True
+        self.assertEqual(self.exec_mod.flush_state(), 1)
+        self.mock_db.update_highest_prices.assert_called_with([("log_btc", 1010.0)])
+
+    def test_close_all_is_concurrent(self):
+        """5 closes x 0.2s order latency flatten in ~one round-trip, exits written once."""
+        def slow_order(**kwargs):
+            time.sleep(0.2)
+            return {'success': True, 'data': {'order_id': kwargs['symbol'], 'average_executed_price': 0}}
+        self.mock_client.create_order.side_effect = slow_order
+        self.mock_client.get_order.side_effect = lambda oid: {'data': {'status': 'FILLED', 'average_executed_price': 10.5}}
+
+        positions = [{'symbol': f"PERP_T{i}_USDC", 'position_qty': 1.0 if i % 2 else -1.0, 'mark_price': 10.0}
+                     for i in range(5)]
+        positions.append({'symbol': "PERP_FLAT_USDC", 'position_qty': 0})
+
+        started = time.monotonic()
+        result = self.exec_mod.close_all(positions)
+        self.assertLess(time.monotonic() - started, 0.6)
+
+        self.assertEqual(sorted(result['closed']), [f"PERP_T{i}_USDC" for i in range(5)])
+        self.assertEqual(result['failed'], [])
+        self.assertGreaterEqual(result['time_to_flat'], 0.2)
+        self.mock_db.close_trades.assert_called_once_with({f"PERP_T{i}_USDC": 10.5 for i in range(5)})
+        self.mock_client.create_order.assert_any_call(
+            symbol="PERP_T1_USDC", order_type="MARKET", side="SELL", order_quantity=1.0, reduce_only=True)
+        self.mock_client.create_order.assert_any_call(
+            symbol="PERP_T0_USDC", order_type="MARKET", side="BUY", order_quantity=1.0, reduce_only=True)
+
 if __name__ == '__main__':
     unittest.main()
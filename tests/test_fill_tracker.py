@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import MagicMock
+import time
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from fill_tracker import FillTracker
+from execution import Execution
+
+
+def order(status, price=0):
+    return {'success': True, 'data': {'order_id': 42, 'status': status, 'average_executed_price': price}}
+
+
+class TestFillTracker(unittest.TestCase):
+    def setUp(self):
+        self.original_config_vals = {k: getattr(config, k) for k in (
+            'FILL_POLL_START', 'FILL_POLL_MAX', 'FILL_TIMEOUT')}
+        config.FILL_POLL_START = 0.01
+        config.FILL_POLL_MAX = 0.05
+        config.FILL_TIMEOUT = 1
+        self.client = MagicMock()
+        self.tracker = FillTracker(self.client)
+
+    def tearDown(self):
+        self.tracker.close()
+        for k, v in self.original_config_vals.items():
+            setattr(config, k, v)
+
+    def test_polls_until_filled(self):
+        self.client.get_order.side_effect = [order('NEW'), order('NEW'), order('FILLED', 101.5)]
+        fills = []
+        future = self.tracker.track(order('NEW'), fills.append)
+        self.assertEqual(future.result(1), 101.5)
+        self.assertEqual(fills, [101.5])
+        self.assertEqual(self.client.get_order.call_count, 3)
+
+    def test_timeout_keeps_estimate(self):
+        config.FILL_TIMEOUT = 0.1
+        self.client.get_order.return_value = order('NEW')
+        fills = []
+        self.assertEqual(self.tracker.track(order('NEW'), fills.append).result(1), 0)
+        self.assertEqual(fills, [])
+        self.assertEqual(self.tracker.stats['timeouts'], 1)
+
+    def test_execute_trade_does_not_block_on_fill(self):
+        db = MagicMock()
+        rules = MagicMock()
+        rules.get.return_value = {'base_tick': 0.01, 'min_notional': 10}
+        exec_mod = Execution(self.client, db, rules=rules)
+        self.client.create_order.return_value = order('NEW')
+        self.client.get_order.side_effect = [order('NEW'), order('FILLED', 100.4)]
+
+        started = time.monotonic()
+        exec_mod.execute_trade({'action': 'BUY', 'entry_price': 100.0, 'log_id': 'log_1'}, "PERP_ETH_USDC")
+        self.assertLess(time.monotonic() - started, 0.5)
+        db.log_trade.assert_called_with('log_1', 100.0, "OPEN")  # estimate first
+
+        exec_mod.flush_state()  # waits for in-flight fills
+        db.update_entry_price.assert_called_with('log_1', 100.4)
+        self.assertEqual(exec_mod.positions.get("PERP_ETH_USDC")[2], 100.4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import json
+import random
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import config
+import indicators
+
+
+def make_candles(n, seed=7, start=100.0):
+    rng = random.Random(seed)
+    candles, price = [], start
+    for i in range(n):
+        price *= 1 + rng.gauss(0, 0.01)
+        candles.append({'open': price, 'high': price * 1.005, 'low': price * 0.995,
+                        'close': price, 'volume': rng.random() * 10, 'end_timestamp': i})
+    return candles
+
+
+class TestIndicators(unittest.TestCase):
+    def test_smas_match_pure_python(self):
+        candles = make_candles(100)
+        closes = [c['close'] for c in candles]
+        inds = indicators.calculate_indicators(candles)
+
+        self.assertAlmostEqual(inds['MA_SHORT'], indicators.calculate_sma(closes, config.MA_SHORT), places=9)
+        self.assertAlmostEqual(inds['MA_MEDIUM'], indicators.calculate_sma(closes, config.MA_MEDIUM), places=9)
+        self.assertAlmostEqual(inds['MA_LONG'], indicators.calculate_sma(closes, config.MA_LONG), places=9)
+        self.assertEqual(inds['current_price'], closes[-1])
+
+    def test_not_enough_data_returns_none(self):
+        inds = indicators.calculate_indicators(make_candles(40))
+        self.assertIsNotNone(inds['MA_SHORT'])
+        self.assertIsNone(inds['MA_LONG'])
+        empty = indicators.calculate_indicators([])
+        self.assertEqual(empty['current_price'], 0)
+        self.assertIsNone(empty['MA_SHORT'])
+
+    def test_ema_and_rsi_match_reference_loops(self):
+        closes = [c['close'] for c in make_candles(300)]
+
+        alpha = 2 / (config.EMA_FAST + 1)
+        ema = closes[0]
+        for p in closes[1:]:
+            ema = alpha * p + (1 - alpha) * ema
+        self.assertAlmostEqual(indicators.ema_series(closes, config.EMA_FAST)[-1], ema, places=8)
+
+        period = config.RSI_PERIOD
+        deltas = [b - a for a, b in zip(closes, closes[1:])]
+        gain = sum(max(d, 0) for d in deltas[:period]) / period
+        loss = sum(max(-d, 0) for d in deltas[:period]) / period
+        for d in deltas[period:]:
+            gain = (gain * (period - 1) + max(d, 0)) / period
+            loss = (loss * (period - 1) + max(-d, 0)) / period
+        expected = 100 - 100 / (1 + gain / loss)
+        self.assertAlmostEqual(indicators.rsi_series(closes, period)[-1], expected, places=8)
+
+    def test_long_series_stable(self):
+        """Block-wise recursion stays finite and accurate over 100k candles."""
+        closes = np.array([c['close'] for c in make_candles(100_000)])
+        ema = indicators.ema_series(closes, 2)
+        self.assertTrue(np.all(np.isfinite(ema)))
+        rsi = indicators.rsi_series(closes, 14)
+        self.assertTrue(np.all((rsi[15:] >= 0) & (rsi[15:] <= 100)))
+
+    def test_output_is_json_serializable(self):
+        """DatabaseHandler.log_signal stores the dict as JSONB."""
+        inds = indicators.calculate_indicators(make_candles(100))
+        inds['market_rank'] = 1
+        json.dumps(inds)
+        for value in inds.values():
+            self.assertNotIsInstance(value, np.generic)
+
+    def test_incremental_matches_vectorized(self):
+        """Streaming state over closed candles + preview of the open one == full recompute."""
+        for n in (10, 40, 100, 300):
+            candles = make_candles(n)
+            expected = indicators.calculate_indicators(candles)
+            stream = indicators.IncrementalIndicators.from_candles(candles[:-1])
+            got = stream.values(candles[-1])
+            for key, value in expected.items():
+                if value is None:
+                    self.assertIsNone(got[key], f"{key} n={n}")
+                else:
+                    self.assertAlmostEqual(got[key], value, places=7, msg=f"{key} n={n}")
+
+    def test_preview_does_not_commit(self):
+        candles = make_candles(80)
+        stream = indicators.IncrementalIndicators.from_candles(candles[:-1])
+        before = stream.values()
+        stream.values(candles[-1])
+        self.assertEqual(stream.values(), before)
+        self.assertEqual(stream.count, 79)
+
+    def test_incremental_no_drift(self):
+        """Rolling sums are resynced, so long streams agree with a fresh computation."""
+        candles = make_candles(20_000, start=60000.0)
+        stream = indicators.IncrementalIndicators.from_candles(candles)
+        expected = indicators.calculate_indicators(candles[-200:])
+        got = stream.values()
+        for key in ("MA_SHORT", "MA_LONG", "BB_UPPER", "VOLUME_Z", "VWAP"):
+            self.assertAlmostEqual(got[key], expected[key], delta=1e-6 * max(1, abs(expected[key])))
+
+if __name__ == '__main__':
+    unittest.main()
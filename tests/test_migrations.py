@@ -0,0 +1,153 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import threading
+import time
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+
+import config
+import migrations
+
+SCHEMA = "test_migrations"
+VERSIONS = [m[0] for m in migrations.MIGRATIONS]
+
+
+class CountingCursor:
+    """Records the statements sent through a cursor."""
+
+    def __init__(self, cur):
+        self.cur = cur
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql.strip())
+        return self.cur.execute(sql, params)
+
+    def fetchone(self):
+        return self.cur.fetchone()
+
+
+class TestMigrations(unittest.TestCase):
+    """Runs the migrations in a scratch schema of the local Postgres (skipped when none is reachable)."""
+
+    def setUp(self):
+        try:
+            self.conn = psycopg2.connect(host=config.DB_HOST, port=config.DB_PORT, dbname=config.DB_NAME,
+                                         user=config.DB_USER, password=config.DB_PASSWORD,
+                                         options=f"-c search_path={SCHEMA}", connect_timeout=3)
+        except psycopg2.OperationalError:
+            self.skipTest("PostgreSQL not available")
+        self.conn.autocommit = True
+        self.cur = self.conn.cursor()
+        self.cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA};")
+
+    def tearDown(self):
+        self.cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+        self.conn.close()
+
+    def indexes(self):
+        self.cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = %s;", (SCHEMA,))
+        return {r[0] for r in self.cur.fetchall()}
+
+    def test_applies_in_order_once(self):
+        self.assertEqual(migrations.apply(self.cur, target=1), [1])
+        self.assertNotIn("trade_logs_open_symbol_idx", self.indexes())
+        self.assertEqual(migrations.apply(self.cur), VERSIONS[1:])
+        self.assertEqual(migrations.apply(self.cur), [])
+        self.assertEqual(migrations.current_version(self.cur), VERSIONS[-1])
+        self.assertTrue({"trade_logs_open_symbol_idx", "trade_logs_last_exit_idx", "trade_logs_closed_pnl_idx",
+                         "trade_logs_signal_history_idx", "command_queue_pending_idx"} <= self.indexes())
+
+    def test_statements_are_idempotent(self):
+        """A database created before migrations existed (schema present, no versions) upgrades cleanly."""
+        migrations.apply(self.cur)
+        self.cur.execute("DELETE FROM schema_version;")
+        self.assertEqual(migrations.apply(self.cur), VERSIONS)
+        self.cur.execute("SELECT COUNT(*) FROM pg_trigger WHERE tgname = 'trade_stats_sync' AND tgrelid = 'trade_logs'::regclass;")
+        self.assertEqual(self.cur.fetchone()[0], 1)
+
+    def test_failed_migration_rolls_back(self):
+        broken = migrations.MIGRATIONS + [
+            (VERSIONS[-1] + 1, "broken", "CREATE TABLE half_done (id INT); SELECT no_such_column FROM trade_logs;")]
+        with patch.object(migrations, 'MIGRATIONS', broken):
+            with self.assertRaises(psycopg2.Error):
+                migrations.apply(self.cur)
+        self.assertEqual(migrations.current_version(self.cur), VERSIONS[-1])
+        self.cur.execute("SELECT to_regclass('half_done');")
+        self.assertIsNone(self.cur.fetchone()[0])
+
+    def test_up_to_date_costs_one_select(self):
+        migrations.apply(self.cur)
+        cur = CountingCursor(self.cur)
+        started = time.perf_counter()
+        self.assertEqual(migrations.apply(cur), [])
+        elapsed = time.perf_counter() - started
+        self.assertEqual(len(cur.statements), 1)
+        self.assertTrue(cur.statements[0].startswith("SELECT"))
+        print(f"\n⏱️ up-to-date schema check: {elapsed * 1000:.2f}ms")
+
+    def test_concurrent_processes_migrate_once(self):
+        """Several processes starting together: one migrates, the others wait and find it done."""
+        results, failures = [], []
+
+        def start_process():
+            conn = psycopg2.connect(host=config.DB_HOST, port=config.DB_PORT, dbname=config.DB_NAME,
+                                    user=config.DB_USER, password=config.DB_PASSWORD,
+                                    options=f"-c search_path={SCHEMA}")
+            conn.autocommit = True
+            try:
+                results.append(migrations.apply(conn.cursor()))
+            except Exception as e:
+                failures.append(e)
+            finally:
+                conn.close()
+
+        threads = [threading.Thread(target=start_process) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(30)
+
+        self.assertEqual(failures, [])
+        self.assertEqual(sorted(results, key=len), [[], [], [], VERSIONS])
+        self.cur.execute("SELECT version FROM schema_version ORDER BY version;")
+        self.assertEqual([r[0] for r in self.cur.fetchall()], VERSIONS)
+
+    def test_load_orders_files_by_version(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for filename in ("0010_later_change.sql", "0002_add_index.sql", "README.md"):
+                with open(os.path.join(directory, filename), "w") as f:
+                    f.write("SELECT 1;")
+            self.assertEqual([m[:2] for m in migrations.load(directory)],
+                             [(2, "add index"), (10, "later change")])
+            with open(os.path.join(directory, "0002_duplicate.sql"), "w") as f:
+                f.write("SELECT 1;")
+            with self.assertRaises(ValueError):
+                migrations.load(directory)
+
+    def test_hot_queries_use_the_new_indexes(self):
+        migrations.apply(self.cur)
+        self.cur.execute("SET enable_seqscan = off;")  # tiny table: check the indexes are usable at all
+        expected = {
+            "trade_logs_open_symbol_idx":
+                "SELECT id FROM trade_logs WHERE symbol = 'PERP_ETH_USDC' AND status = 'OPEN' ORDER BY id DESC LIMIT 1",
+            "trade_logs_last_exit_idx":
+                "SELECT COALESCE(exit_timestamp, timestamp), status FROM trade_logs "
+                "WHERE symbol = 'PERP_ETH_USDC' AND status LIKE 'CLOSED%' "
+                "ORDER BY COALESCE(exit_timestamp, timestamp) DESC, id DESC LIMIT 1",
+            "trade_logs_signal_history_idx":
+                "SELECT symbol, ai_action FROM trade_logs WHERE status = 'SIGNAL_GENERATED' ORDER BY id DESC LIMIT 5",
+        }
+        for index, sql in expected.items():
+            self.cur.execute("EXPLAIN " + sql)
+            plan = " ".join(r[0] for r in self.cur.fetchall())
+            self.assertIn(index, plan)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import unittest
+import json
+import threading
+import time
+import sys
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from notifier import TelegramNotifier, TELEGRAM_MAX_LENGTH
+from rate_limiter import PRIORITY_HIGH, PRIORITY_LOW
+
+
+class StubTelegram:
+    """Local sendMessage endpoint: records texts, optional latency, scripted 429s, rejects bad Markdown."""
+
+    def __init__(self, delay=0.0, throttle=0, retry_after=0.2):
+        self.delay = delay
+        self.throttle = throttle          # number of 429 answers before accepting
+        self.retry_after = retry_after
+        self.texts = []
+        self.parse_modes = []
+        self.times = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                time.sleep(stub.delay)
+                stub.times.append(time.monotonic())
+                if stub.throttle:
+                    stub.throttle -= 1
+                    self._reply(429, {"ok": False, "parameters": {"retry_after": stub.retry_after}})
+                    return
+                if body.get('parse_mode') == 'Markdown' and any(body['text'].count(c) % 2 for c in '*_`'):
+                    self._reply(400, {"ok": False, "description": "Bad Request: can't parse entities"})
+                    return
+                stub.texts.append(body['text'])
+                stub.parse_modes.append(body.get('parse_mode'))
+                self._reply(200, {"ok": True})
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/sendMessage"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestTelegramNotifier(unittest.TestCase):
+    def setUp(self):
+        self.original_config_vals = {k: getattr(config, k) for k in (
+            'TELEGRAM_BOT_TOKEN', 'TELEGRAM_CHAT_ID', 'TELEGRAM_RATE', 'TELEGRAM_BURST',
+            'TELEGRAM_COALESCE_WINDOW', 'TELEGRAM_QUEUE_SIZE')}
+        config.TELEGRAM_BOT_TOKEN = "test-token"
+        config.TELEGRAM_CHAT_ID = "1"
+        config.TELEGRAM_RATE = 20
+        config.TELEGRAM_BURST = 3
+        config.TELEGRAM_COALESCE_WINDOW = 0.1
+        self.stub = None
+        self.notifier = None
+
+    def tearDown(self):
+        if self.notifier:
+            self.notifier.close()
+        if self.stub:
+            self.stub.stop()
+        for k, v in self.original_config_vals.items():
+            setattr(config, k, v)
+
+    def start(self, **kwargs):
+        self.stub = StubTelegram(**kwargs)
+        self.notifier = TelegramNotifier()
+        self.notifier.api_url = self.stub.url
+        return self.notifier
+
+    def test_burst_becomes_one_digest_without_blocking(self):
+        notifier = self.start(delay=0.5)
+        started = time.monotonic()
+        for i in range(5):
+            notifier.send_message(f"🧠 signal {i}", priority=PRIORITY_LOW)
+        enqueue = time.monotonic() - started
+        self.assertLess(enqueue, 0.01)  # the caller never waits for Telegram
+
+        self.assertTrue(notifier.flush(5))
+        self.assertEqual(len(self.stub.texts), 1)
+        self.assertEqual(self.stub.texts[0].count("🧠 signal"), 5)
+        self.assertLess(self.stub.texts[0].index("signal 0"), self.stub.texts[0].index("signal 4"))
+        self.assertEqual(notifier.stats['merged'], 4)
+        print(f"\n⏱️ 5 notifications enqueued in {enqueue * 1e6:.0f} us, delivered as 1 message")
+
+    def test_digest_respects_length_limit(self):
+        chunks = TelegramNotifier.digest(["a" * 3000, "b" * 3000, "c"])
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(all(len(c) <= TELEGRAM_MAX_LENGTH for c in chunks))
+        self.assertTrue(chunks[1].endswith("c"))
+
+    def test_honours_retry_after(self):
+        notifier = self.start(throttle=1, retry_after=0.3)
+        notifier.send_message("🚀 order", priority=PRIORITY_HIGH)
+        self.assertTrue(notifier.flush(5))
+        self.assertEqual(self.stub.texts, ["🚀 order"])
+        gap = self.stub.times[1] - self.stub.times[0]
+        self.assertGreaterEqual(gap, 0.3)
+        self.assertLess(gap, config.RATE_LIMIT_BACKOFF_START)  # retry_after replaces the bucket backoff, no double wait
+        self.assertEqual(notifier.bucket.stats['throttled'], 1)
+
+    def test_malformed_markdown_does_not_lose_high_messages(self):
+        notifier = self.start()
+        notifier.send_message("🧠 *signal* BTC", priority=PRIORITY_LOW)
+        notifier.send_message("🚀 Filled BUY ETH", priority=PRIORITY_HIGH)
+        notifier.send_message("🧠 reason: max_drawdown *hit", priority=PRIORITY_LOW)  # unbalanced '*'
+        notifier.send_message("🚨 PANIC CLOSE *ALL*", priority=PRIORITY_HIGH)
+        self.assertTrue(notifier.flush(5))
+
+        # HIGH messages go out first, in their own digest, never merged with LOW chatter
+        self.assertEqual(self.stub.texts[0], "🚀 Filled BUY ETH\n➖➖➖\n🚨 PANIC CLOSE *ALL*")
+        # The rejected LOW digest is resent message by message, the bad one as plain text
+        self.assertEqual(self.stub.texts[1:], ["🧠 *signal* BTC", "🧠 reason: max_drawdown *hit"])
+        self.assertEqual(self.stub.parse_modes, ["Markdown", "Markdown", None])
+        self.assertEqual(notifier.stats['rejected'], 2)
+        self.assertEqual(notifier.stats['failed'], 0)
+
+    def test_backpressure_drops_low_priority_first(self):
+        config.TELEGRAM_QUEUE_SIZE = 3
+        config.TELEGRAM_COALESCE_WINDOW = 5  # the worker holds off while the queue fills
+        notifier = self.start()
+        notifier.send_message("low 1", priority=PRIORITY_LOW)
+        notifier.send_message("normal 1")
+        notifier.send_message("low 2", priority=PRIORITY_LOW)
+        notifier.send_message("high 1", priority=PRIORITY_HIGH)  # evicts "low 1"
+        notifier.send_message("low 3", priority=PRIORITY_LOW)    # evicts "low 2"
+        notifier.send_message("high 2", priority=PRIORITY_HIGH)  # evicts "low 3"
+        notifier.send_message("low 4", priority=PRIORITY_LOW)    # nothing lower left: dropped
+        notifier.send_message("high 3", priority=PRIORITY_HIGH)  # evicts "normal 1"
+        notifier.send_message("high 4", priority=PRIORITY_HIGH)  # HIGH is never dropped
+
+        self.assertEqual([m[1] for m in notifier._queue], ["high 1", "high 2", "high 3", "high 4"])
+        self.assertEqual(notifier.stats['dropped'], 5)
+
+        notifier.close()  # closing cuts the window short and sends what is left
+        self.assertEqual(self.stub.texts[0].split("\n➖➖➖\n"), ["high 1", "high 2", "high 3", "high 4"])
+
+    def test_unconfigured_is_a_no_op(self):
+        config.TELEGRAM_BOT_TOKEN = None
+        notifier = TelegramNotifier()
+        notifier.send_message("hello")
+        self.assertIsNone(notifier._thread)
+        self.assertEqual(notifier.stats['queued'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+import asyncio
+import threading
+import time
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from database import DatabaseHandler
+from db_case import DatabaseTestCase
+from engine import TradingEngine
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestNotify(DatabaseTestCase):
+    """Push path against a local Postgres."""
+
+    def setUp(self):
+        super().setUp()
+        # A second handler plays tg_bot.py (another process writing to the same DB)
+        self.remote = DatabaseHandler()
+
+    def tearDown(self):
+        with self.db.cursor() as cur:
+            cur.execute("DELETE FROM command_queue WHERE command = 'TEST_PING';")
+            cur.execute("DELETE FROM bot_configs WHERE key = 'test_notify_key';")
+        self.remote.close()
+
+    def test_config_cache_invalidated_by_notify(self):
+        self.remote.set_config("test_notify_key", "1")
+        listener = self.db.listen()
+        self.assertTrue(wait_for(lambda: listener.connected))
+
+        self.assertEqual(self.db.get_config("test_notify_key"), "1")
+        with patch.object(self.db, 'cursor', side_effect=AssertionError("should be cached")):
+            self.assertEqual(self.db.get_config("test_notify_key"), "1")
+
+        self.remote.set_config("test_notify_key", "2")
+        self.assertTrue(wait_for(lambda: "test_notify_key" not in self.db._config_cache))
+        self.assertEqual(self.db.get_config("test_notify_key"), "2")
+
+    def test_command_latency(self):
+        """Time from add_command() in another handler to handle_command() in the engine."""
+        original = config.COMMAND_SAFETY_POLL
+        config.COMMAND_SAFETY_POLL = 60  # a poll can't explain a fast result
+        engine = TradingEngine(MagicMock(), MagicMock(), MagicMock(), self.db, MagicMock())
+        for stage in ('risk_tick', 'reconcile_tick', 'analysis_tick', 'audit_tick', 'scan_tick'):
+            setattr(engine, stage, AsyncMock())
+
+        latencies, enqueued = [], {}
+        handled = threading.Event()
+
+        async def handle_command(command, params):
+            if command == "TEST_PING":
+                latencies.append(time.monotonic() - enqueued[params['n']])
+                handled.set()
+        engine.handle_command = handle_command
+
+        def producer():
+            wait_for(lambda: engine._listener is not None and engine._listener.connected)
+            time.sleep(0.2)  # let the startup resync tick finish
+            for n in range(5):
+                handled.clear()
+                enqueued[n] = time.monotonic()
+                self.remote.add_command("TEST_PING", {"n": n})
+                handled.wait(5)
+
+        async def runner():
+            task = asyncio.create_task(engine.run())
+            await asyncio.to_thread(producer)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        try:
+            asyncio.run(runner())
+        finally:
+            config.COMMAND_SAFETY_POLL = original
+
+        self.assertEqual(len(latencies), 5)
+        print(f"\n⏱️ enqueue -> execute: max {max(latencies) * 1000:.1f}ms, "
+              f"mean {sum(latencies) / len(latencies) * 1000:.1f}ms")
+        self.assertLess(max(latencies), 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import MagicMock
+import datetime
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from db_case import DatabaseTestCase
+from pnl_series import PnLSeries
+
+T0 = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def at(minutes):
+    return T0 + datetime.timedelta(minutes=minutes)
+
+
+class TestPnLSeries(unittest.TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.series = PnLSeries(self.db, points=3)
+
+    def test_appends_only_new_closes(self):
+        self.db.get_closed_pnl_since.return_value = [(1, at(0), 1.0), (2, at(1), -0.5), (3, at(2), 2.0)]
+        self.assertTrue(self.series.refresh())
+        self.db.get_closed_pnl_since.assert_called_with(None, None)
+        self.assertEqual(self.series.total, 2.5)
+
+        # Next read starts just behind the last close; rows already seen are ignored
+        self.db.get_closed_pnl_since.return_value = [(3, at(2), 2.0), (4, at(3), 1.0)]
+        version = self.series.version
+        self.assertTrue(self.series.refresh())
+        since = self.db.get_closed_pnl_since.call_args[0][0]
+        self.assertEqual(since, at(2).timestamp() - config.PNL_REVISION_WINDOW)
+        self.assertEqual(self.series.version, version + 1)
+        self.assertEqual(self.series.series(), ([at(1), at(2), at(3)], [0.5, 2.5, 3.5]))
+        self.assertEqual(self.series.stats['rebuilds'], 0)
+
+        self.db.get_closed_pnl_since.return_value = [(4, at(3), 1.0)]
+        self.assertFalse(self.series.refresh())
+        self.assertEqual(self.series.version, version + 1)
+
+    def test_revision_and_out_of_order_close(self):
+        self.db.get_closed_pnl_since.return_value = [(1, at(0), 1.0), (5, at(2), 1.0)]
+        self.series.refresh()
+        # Fill confirmation revises trade 5, trade 3 (opened earlier) closed in between
+        self.db.get_closed_pnl_since.return_value = [(3, at(1), -2.0), (5, at(2), 0.5)]
+        self.assertTrue(self.series.refresh())
+        self.assertEqual(self.series.series(), ([at(0), at(1), at(2)], [1.0, -1.0, -0.5]))
+        self.assertEqual(self.series.stats['rebuilds'], 1)
+
+    def test_png_cached_per_version(self):
+        self.db.get_closed_pnl_since.return_value = [(1, at(0), 1.0)]
+        self.series.refresh()
+        self.assertIsNone(self.series.cached_png())
+        self.series.store_png(self.series.version, b"png-1")
+        self.assertEqual(self.series.cached_png(), b"png-1")
+
+        self.db.get_closed_pnl_since.return_value = [(2, at(1), 1.0)]
+        self.series.refresh()
+        self.assertIsNone(self.series.cached_png())
+
+
+class TestClosedPnLQuery(DatabaseTestCase):
+    """get_closed_pnl_since against a local Postgres."""
+
+    def tearDown(self):
+        with self.db.cursor() as cur:
+            cur.execute("DELETE FROM trade_logs WHERE symbol = 'PERP_PNLTEST_USDC';")
+
+    def test_reads_closes_since(self):
+        with self.db.cursor() as cur:
+            cur.execute("""
+                INSERT INTO trade_logs (symbol, ai_action, status, pnl, timestamp, exit_timestamp) VALUES
+                ('PERP_PNLTEST_USDC', 'BUY', 'CLOSED_TP', 1.0, '2024-01-01 00:00+00', '2024-01-01 05:00+00'),
+                ('PERP_PNLTEST_USDC', 'BUY', 'CLOSED_SL', -1.0, '2024-01-01 01:00+00', '2024-01-01 02:00+00'),
+                ('PERP_PNLTEST_USDC', 'BUY', 'OPEN', NULL, '2024-01-01 03:00+00', NULL)
+                RETURNING id;
+            """)
+            first, second, still_open = [r[0] for r in cur.fetchall()]
+
+        ids = [r[0] for r in self.db.get_closed_pnl_since(None) if r[0] in (first, second, still_open)]
+        self.assertEqual(ids, [second, first])  # close order, not entry order
+
+        ids = [r[0] for r in self.db.get_closed_pnl_since(at(3 * 60).timestamp())]
+        self.assertIn(first, ids)
+        self.assertNotIn(second, ids)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import indicators
+import prefilter
+
+
+def make_candles(n=100, step=0.0, wiggle=0.0, spike=False):
+    candles = []
+    for i in range(n):
+        price = 100 + step * i + (wiggle if i % 2 else -wiggle)
+        volume = 50.0 if spike and i == n - 1 else 1.0 + (i % 3) * 0.1
+        candles.append({'open': price, 'high': price * 1.003, 'low': price * 0.997, 'close': price,
+                        'volume': volume, 'end_timestamp': i})
+    return candles
+
+
+class TestPrefilter(unittest.TestCase):
+    def setUp(self):
+        self.original = config.PREFILTER_ENABLED
+        config.PREFILTER_ENABLED = True
+
+    def tearDown(self):
+        config.PREFILTER_ENABLED = self.original
+
+    def screen(self, **universe):
+        return prefilter.screen({s: indicators.calculate_indicators(c) for s, c in universe.items()})
+
+    def test_trend_passes_chop_skipped(self):
+        verdicts = self.screen(TREND=make_candles(step=0.5), CHOP=make_candles(wiggle=0.1))
+        self.assertIsNone(verdicts['TREND'])
+        self.assertTrue(verdicts['CHOP'].startswith("flat"))
+
+    def test_volume_spike_passes_chop(self):
+        self.assertIsNone(self.screen(SPIKE=make_candles(wiggle=0.1, spike=True))['SPIKE'])
+
+    def test_quiet_atr_regime_skipped(self):
+        quiet = [dict(c, high=c['close'], low=c['close']) for c in make_candles(step=0.1)]
+        self.assertIn("ATR regime too quiet", self.screen(QUIET=quiet)['QUIET'])
+
+    def test_incomplete_or_disabled_passes(self):
+        self.assertIsNone(self.screen(SHORT=make_candles(n=30, wiggle=0.1))['SHORT'])
+        self.assertEqual(prefilter.screen({'MISSING': None}), {'MISSING': None})
+        config.PREFILTER_ENABLED = False
+        self.assertIsNone(self.screen(CHOP=make_candles(wiggle=0.1))['CHOP'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import random
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import indicators
+import prompt_encoding
+from ai_analyst import AIAnalyst
+
+
+def make_candles(start, n=100, seed=3):
+    rng = random.Random(seed)
+    candles, price = [], start
+    for i in range(n):
+        price *= 1 + rng.gauss(0, 0.004)
+        candles.append({'open': price, 'high': price * 1.002, 'low': price * 0.997, 'close': price,
+                        'volume': rng.random() * 1000, 'end_timestamp': 1700000000000 + i * 900000})
+    return candles
+
+
+class TestPromptEncoding(unittest.TestCase):
+    def setUp(self):
+        self.original = config.AI_PROMPT_COMPACT
+
+    def tearDown(self):
+        config.AI_PROMPT_COMPACT = self.original
+
+    def test_prices_decode_within_precision(self):
+        """Relative prices decode back to the original closes on any price scale."""
+        for start in (0.00001234, 1.5, 65432.1):
+            candles = make_candles(start)
+            block = prompt_encoding.encode_symbol("PERP_X_USDC", candles)
+            ref = float(block.splitlines()[0].split("ref=")[1])
+            rows = [line.split(",") for line in block.splitlines()[2:]]
+            self.assertEqual([int(r[0]) for r in rows], list(range(19, -1, -1)))
+            for row, candle in zip(rows, candles[-20:]):
+                decoded = ref * (1 + float(row[4]) / 100)
+                self.assertAlmostEqual(decoded / candle['close'], 1, delta=1e-4)
+
+    def test_static_prefix_and_smaller_prompt(self):
+        ai = AIAnalyst()
+        eth, btc = make_candles(2345.6), make_candles(65432.1, seed=4)
+        config.AI_PROMPT_COMPACT = True
+        a = ai._market_payload("PERP_ETH_USDC", eth, indicators.calculate_indicators(eth))
+        b = ai._market_payload("PERP_BTC_USDC", btc, indicators.calculate_indicators(btc))
+        self.assertEqual(a['messages'][0]['content'], b['messages'][0]['content'])
+
+        config.AI_PROMPT_COMPACT = False
+        legacy = ai._market_payload("PERP_ETH_USDC", eth, indicators.calculate_indicators(eth))
+        compact_tokens = prompt_encoding.estimate_tokens(a['messages'][1]['content'])
+        legacy_tokens = prompt_encoding.estimate_tokens(legacy['messages'][1]['content'])
+        self.assertLess(compact_tokens, legacy_tokens * 0.6)
+
+    def test_adaptive_precision(self):
+        self.assertEqual(prompt_encoding.price_decimals(20.0), 1)
+        self.assertEqual(prompt_encoding.price_decimals(5.0), 2)
+        self.assertEqual(prompt_encoding.price_decimals(0.5), 3)
+        self.assertEqual(prompt_encoding.price_decimals(0.0), 2)
+
+if __name__ == '__main__':
+    unittest.main()
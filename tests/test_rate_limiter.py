@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import MagicMock
+import threading
+import time
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from rate_limiter import (TokenBucket, RateLimitedClient, endpoint_class, priority,
+                          PRIORITY_HIGH, PRIORITY_LOW)
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.original_config_vals = {k: getattr(config, k) for k in (
+            'RATE_LIMIT_BACKOFF_START', 'RATE_LIMIT_RETRIES')}
+        config.RATE_LIMIT_BACKOFF_START = 0.05
+
+    def tearDown(self):
+        for k, v in self.original_config_vals.items():
+            setattr(config, k, v)
+
+    def test_endpoint_classes(self):
+        self.assertEqual(endpoint_class('create_order'), 'order')
+        self.assertEqual(endpoint_class('cancel_order'), 'order')
+        self.assertEqual(endpoint_class('get_kline'), 'market')
+        self.assertEqual(endpoint_class('get_orderbook_snapshot'), 'market')
+        self.assertEqual(endpoint_class('get_futures_info_for_all_markets'), 'market')
+        self.assertEqual(endpoint_class('get_all_positions_info'), 'account')
+        self.assertEqual(endpoint_class('get_order'), 'account')
+
+    def test_bucket_enforces_rate(self):
+        """Burst of 2 then 20/s -> 6 calls need at least ~0.2s."""
+        bucket = TokenBucket('test', rate=20, capacity=2)
+        started = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        elapsed = time.monotonic() - started
+        self.assertGreaterEqual(elapsed, 0.18)
+        self.assertEqual(bucket.stats['calls'], 6)
+
+    def test_high_priority_served_first(self):
+        """With the bucket empty, a HIGH waiter that arrives last is served before LOW waiters."""
+        bucket = TokenBucket('test', rate=20, capacity=1)
+        bucket.acquire()  # drain
+        order = []
+
+        def take(label, level):
+            bucket.acquire(level)
+            order.append(label)
+
+        threads = [threading.Thread(target=take, args=(f"low{i}", PRIORITY_LOW)) for i in range(3)]
+        for t in threads:
+            t.start()
+        time.sleep(0.01)
+        high = threading.Thread(target=take, args=("high", PRIORITY_HIGH))
+        high.start()
+        for t in threads + [high]:
+            t.join()
+
+        self.assertIn(order.index("high"), (0, 1))
+
+    def test_429_backs_off_and_retries(self):
+        """A 429 halves the bucket rate, waits out the backoff and retries the call."""
+        sdk = MagicMock()
+        sdk.get_kline.side_effect = [FakeRateLimitError(), {'data': {'rows': []}}]
+        client = RateLimitedClient(sdk, limits={'market': (10, 10), 'account': (10, 10), 'order': (10, 5)})
+
+        started = time.monotonic()
+        result = client.get_kline("PERP_ETH_USDC", type="1m", limit=1)
+
+        self.assertEqual(result, {'data': {'rows': []}})
+        self.assertEqual(sdk.get_kline.call_count, 2)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        stats = client.stats()['market']
+        self.assertEqual(stats['throttled'], 1)
+        self.assertLess(stats['rate'], 10)
+
+    def test_429_gives_up_after_retries(self):
+        config.RATE_LIMIT_RETRIES = 1
+        config.RATE_LIMIT_BACKOFF_START = 0.01
+        sdk = MagicMock()
+        sdk.create_order.side_effect = FakeRateLimitError()
+        client = RateLimitedClient(sdk)
+
+        with self.assertRaises(FakeRateLimitError):
+            client.create_order(symbol="PERP_ETH_USDC")
+        self.assertEqual(sdk.create_order.call_count, 2)
+
+    def test_priority_context_is_thread_local(self):
+        sdk = MagicMock()
+        client = RateLimitedClient(sdk)
+        client.buckets['market'].acquire = MagicMock()
+
+        with priority(PRIORITY_LOW):
+            client.get_kline("PERP_ETH_USDC", type="15m")
+        client.buckets['market'].acquire.assert_called_with(PRIORITY_LOW)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+from unittest.mock import MagicMock
+import time
+import timeit
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from signal_cache import SignalCache
+from ai_analyst import AIAnalyst
+from db_case import DatabaseTestCase
+
+NOW = 1700000000.0
+CANDLE_MS = 900_000
+
+
+def make_candles(n=100, closed=None, price=100.0):
+    """n candles ending at NOW; the last one is still open unless closed=True."""
+    last_end = NOW * 1000 + (CANDLE_MS / 2 if not closed else 0)
+    return [{'open': price + i, 'high': price + i, 'low': price + i, 'close': price + i, 'volume': 1.0,
+             'end_timestamp': last_end - (n - 1 - i) * CANDLE_MS} for i in range(n)]
+
+
+class TestSignalCache(unittest.TestCase):
+    def test_key_ignores_open_candle(self):
+        candles = make_candles()
+        key = SignalCache.key("PERP_ETH_USDC", candles, now=NOW)
+
+        ticked = make_candles()
+        ticked[-1] = dict(ticked[-1], close=123.0, volume=9.0)  # open candle moved
+        self.assertEqual(SignalCache.key("PERP_ETH_USDC", ticked, now=NOW), key)
+
+        # ...but a newly closed candle, another symbol or a new exit context changes it
+        self.assertNotEqual(SignalCache.key("PERP_ETH_USDC", candles, now=NOW + CANDLE_MS / 1000), key)
+        self.assertNotEqual(SignalCache.key("PERP_BTC_USDC", candles, now=NOW), key)
+        exit_ctx = {'reason': 'CLOSED_SL', 'candles_ago': 3}
+        self.assertNotEqual(SignalCache.key("PERP_ETH_USDC", candles, exit_ctx, now=NOW), key)
+
+    def test_key_covers_indicator_window(self):
+        """Older closed candles feed EMA / RSI / ATR, so they are part of the key, not just the 20 printed."""
+        candles = make_candles()
+        key = SignalCache.key("PERP_ETH_USDC", candles, now=NOW)
+        revised = [dict(c) for c in candles]
+        revised[10]['close'] = 50.0
+        self.assertNotEqual(SignalCache.key("PERP_ETH_USDC", revised, now=NOW), key)
+
+        # Candles with missing / non-numeric fields take the slow path, same result every time
+        loose = [dict(c, volume=None) for c in candles]
+        self.assertEqual(SignalCache.key("PERP_ETH_USDC", loose, now=NOW), SignalCache.key("PERP_ETH_USDC", loose, now=NOW))
+        self.assertNotEqual(SignalCache.key("PERP_ETH_USDC", loose, now=NOW), key)
+
+    def test_ttl_and_lru(self):
+        cache = SignalCache(ttl=0.05, maxsize=2)
+        for k in ("a", "b"):
+            cache.put(k, "PERP_ETH_USDC", {'action': k})
+        cache.get("a")              # a is now most recently used
+        cache.put("c", "PERP_ETH_USDC", {'action': 'c'})
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {'action': 'a'})
+        self.assertEqual(cache.stats['evictions'], 1)
+
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual(cache.stats['expired'], 1)
+
+    def test_hit_returns_copy_fast(self):
+        cache = SignalCache()
+        candles = make_candles()
+        key = cache.key("PERP_ETH_USDC", candles, now=NOW)
+        cache.put(key, "PERP_ETH_USDC", {'action': 'BUY', 'confidence': 0.9})
+
+        signal = cache.get(key)
+        signal['log_id'] = "x"  # the engine annotates signals in place
+        self.assertNotIn('log_id', cache.get(key))
+
+        n = 2000
+        lookup = timeit.timeit(lambda: cache.get(cache.key("PERP_ETH_USDC", candles, now=NOW)), number=n) / n
+        print(f"\n⏱️ signal cache key + hit: {lookup * 1e6:.1f} us (hit rate {cache.hit_rate():.0%})")
+        self.assertLess(lookup, 0.001)
+
+    def test_analyst_skips_ai_on_hit(self):
+        ai = AIAnalyst(cache=SignalCache())
+        ai.http = MagicMock()
+        ai.http.post_sync.return_value = '{"action": "BUY", "confidence": 0.9}'
+        candles = make_candles(closed=True)
+
+        first = ai.analyze_market("PERP_ETH_USDC", candles)
+        second = ai.analyze_market("PERP_ETH_USDC", candles)
+        self.assertEqual(first, second)
+        self.assertEqual(ai.http.post_sync.call_count, 1)
+        self.assertEqual(ai.cache.stats['hits'], 1)
+
+        ai.http.post_sync.return_value = None  # failures are not cached
+        ai.analyze_market("PERP_SOL_USDC", candles)
+        ai.analyze_market("PERP_SOL_USDC", candles)
+        self.assertEqual(ai.http.post_sync.call_count, 3)
+
+
+class TestSignalCachePersistence(DatabaseTestCase):
+    """Write-through and warm start against a local Postgres."""
+
+    def tearDown(self):
+        with self.db.cursor() as cur:
+            cur.execute("DELETE FROM ai_signal_cache WHERE symbol = 'PERP_TEST_USDC';")
+
+    def test_survives_restart(self):
+        cache = SignalCache(self.db)
+        cache.put("test-key", "PERP_TEST_USDC", {'action': 'SELL', 'confidence': 0.7})
+        cache.close()  # waits for the background write
+
+        restarted = SignalCache(self.db)
+        self.assertGreaterEqual(restarted.load(), 1)
+        self.assertEqual(restarted.get("test-key"), {'action': 'SELL', 'confidence': 0.7})
+
+if __name__ == '__main__':
+    unittest.main()
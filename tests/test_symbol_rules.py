@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import MagicMock
+import time
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from market_data import SymbolRules
+
+
+def universe():
+    return {'success': True, 'data': {'rows': [
+        {'symbol': 'PERP_ETH_USDC', 'base_tick': 0.001, 'min_notional': 10, 'quote_tick': 0.01},
+        {'symbol': 'PERP_BTC_USDC', 'base_tick': 0.00001, 'min_notional': 10, 'quote_tick': 0.1},
+        {'symbol': 'SPOT_WOO_USDC', 'base_tick': 1, 'min_notional': 1},
+    ]}}
+
+
+class TestSymbolRules(unittest.TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.get_available_symbols.return_value = universe()
+        self.rules = SymbolRules(self.client, ttl=3600)
+
+    def test_bulk_load_serves_from_memory(self):
+        self.assertEqual(self.rules.load(), 2)
+        for _ in range(5):
+            self.assertEqual(self.rules.get('PERP_BTC_USDC')['base_tick'], 0.00001)
+        self.client.get_available_symbols.assert_called_once()
+        self.client.get_exchange_info.assert_not_called()
+        self.assertEqual(self.rules.stats['hits'], 5)
+
+    def test_unknown_symbol_fetched_once(self):
+        self.rules.load()
+        self.client.get_exchange_info.return_value = {'data': {'base_tick': 0.1, 'min_notional': 5}}
+        self.assertEqual(self.rules.get('PERP_NEW_USDC')['min_notional'], 5.0)
+        self.rules.get('PERP_NEW_USDC')
+        self.client.get_exchange_info.assert_called_once_with('PERP_NEW_USDC')
+
+    def test_stale_rules_refreshed_in_background(self):
+        self.rules.load()
+        self.rules._loaded_at -= 7200
+        self.rules._attempted_at -= 7200
+        self.client.get_available_symbols.side_effect = Exception("exchange down")
+
+        # Still answered from the last good load while the refresh fails
+        self.assertEqual(self.rules.get('PERP_ETH_USDC')['base_tick'], 0.001)
+        self.rules._refreshing.join(1)
+        self.assertEqual(self.rules.stats['failures'], 1)
+        self.assertEqual(self.rules.get('PERP_ETH_USDC')['base_tick'], 0.001)
+
+if __name__ == '__main__':
+    unittest.main()
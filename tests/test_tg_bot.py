@@ -0,0 +1,125 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock
+import asyncio
+import datetime
+import time
+import sys
+import os
+
+# Add parent dir to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import tg_bot
+from pnl_series import PnLSeries
+
+LATENCY = 0.2
+
+
+def make_update():
+    update = MagicMock()
+    update.effective_chat.id = 42
+    update.message.reply_text = AsyncMock()
+    update.message.reply_photo = AsyncMock()
+    return update
+
+
+class TestTelegramBot(unittest.TestCase):
+    def setUp(self):
+        self.original_chat_id = config.TELEGRAM_CHAT_ID
+        config.TELEGRAM_CHAT_ID = "42"
+        self.original = (tg_bot.db, tg_bot.md, tg_bot.pnl)
+        tg_bot.db = MagicMock()
+        tg_bot.md = MagicMock()
+
+        def slow(value):
+            def call(*args, **kwargs):
+                time.sleep(LATENCY)
+                return value
+            return call
+
+        tg_bot.db.get_config.side_effect = lambda key, default=None: default
+        tg_bot.db.get_all_open_symbols.return_value = ["PERP_ETH_USDC", "PERP_BTC_USDC", "PERP_SOL_USDC"]
+        tg_bot.db.get_active_trade_details.side_effect = slow((100.0, 105.0, 'BUY', None))
+        tg_bot.md.get_orderbook.side_effect = slow(
+            {'data': {'asks': [{'price': 103.0}], 'bids': [{'price': 101.0}]}})
+
+    def tearDown(self):
+        config.TELEGRAM_CHAT_ID = self.original_chat_id
+        tg_bot.db, tg_bot.md, tg_bot.pnl = self.original
+
+    @classmethod
+    def tearDownClass(cls):
+        if tg_bot._chart_pool:
+            tg_bot._chart_pool.shutdown(wait=True)
+            tg_bot._chart_pool = None
+
+    def test_status_fetches_positions_in_parallel(self):
+        update = make_update()
+        started = time.monotonic()
+        asyncio.run(tg_bot.status(update, MagicMock()))
+        elapsed = time.monotonic() - started
+
+        msg = update.message.reply_text.call_args[0][0]
+        self.assertEqual(msg.count("CurPnL: `2.00%`"), 3)
+        self.assertIn("Active Positions: 3", msg)
+        # 3 positions x (orderbook + DB) serially would be 6 x LATENCY
+        self.assertLess(elapsed, 2 * LATENCY)
+        print(f"\n⏱️ /status with 3 positions: {elapsed * 1000:.0f}ms (serial ≈ {6 * LATENCY * 1000:.0f}ms)")
+
+    def test_commands_not_blocked_by_status(self):
+        """A /start sent while /status is busy answers right away."""
+        async def runner():
+            slow_status = asyncio.create_task(tg_bot.status(make_update(), MagicMock()))
+            await asyncio.sleep(0.01)
+            started = time.monotonic()
+            await tg_bot.start(make_update(), MagicMock())
+            latency = time.monotonic() - started
+            await slow_status
+            return latency
+
+        latency = asyncio.run(runner())
+        self.assertLess(latency, LATENCY / 2)
+        tg_bot.db.set_config.assert_called_with("is_paused", "false")
+
+    def test_pnl_chart_rendered_off_loop_and_cached(self):
+        start = datetime.datetime(2024, 1, 1)
+        tg_bot.db.get_closed_pnl_since.return_value = [
+            (i, start + datetime.timedelta(hours=i), 1.5 if i % 3 else -1.0) for i in range(30)]
+        tg_bot.pnl = PnLSeries(tg_bot.db)
+        update = make_update()
+
+        async def runner():
+            ticks = 0
+            done = asyncio.Event()
+
+            async def ticker():
+                nonlocal ticks
+                while not done.is_set():
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            task = asyncio.create_task(ticker())
+            started = time.monotonic()
+            await tg_bot.pnl_command(update, MagicMock())
+            elapsed = time.monotonic() - started
+            done.set()
+            await task
+            return elapsed, ticks
+
+        elapsed, ticks = asyncio.run(runner())
+        png = update.message.reply_photo.call_args[1]['photo']
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertIn("Total PnL: 20.00 USDC", update.message.reply_photo.call_args[1]['caption'])
+        self.assertGreater(ticks, elapsed / 0.01 * 0.5)  # event loop kept serving meanwhile
+
+        # No new closes: the same PNG comes straight from the cache
+        started = time.monotonic()
+        asyncio.run(tg_bot.pnl_command(update, MagicMock()))
+        cached = time.monotonic() - started
+        self.assertIs(update.message.reply_photo.call_args[1]['photo'], png)
+        self.assertLess(cached, 0.05)
+        print(f"\n⏱️ /pnl: first {elapsed * 1000:.0f}ms (chart process), cached {cached * 1000:.1f}ms")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,17 @@
 import logging
 import asyncio
+import json
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from telegram import Update
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler
 from database import DatabaseHandler
 import config
-import matplotlib.pyplot as plt
-import io
+import charts
 
 from market_data import MarketData
+from pnl_series import PnLSeries
 
 # Setup Logging
 logging.basicConfig(
@@ -15,93 +19,134 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-db = DatabaseHandler()
-md = MarketData()
+# Created in run_tg_bot(), so chart worker processes can import this module cheaply
+db = None
+md = None
+pnl = None
+
+# Blocking psycopg2 / Orderly SDK calls run here, never on the bot's event loop
+_io_pool = ThreadPoolExecutor(max_workers=config.TG_IO_WORKERS, thread_name_prefix="tg-io")
+_chart_pool = None
+
+async def _io(fn, *args, **kwargs):
+    """Runs a blocking DB / exchange call on the I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_pool, lambda: fn(*args, **kwargs))
+
+def chart_pool():
+    """Process pool for matplotlib (CPU-bound, and pyplot is not thread-safe)."""
+    global _chart_pool
+    if _chart_pool is None:
+        _chart_pool = ProcessPoolExecutor(max_workers=config.TG_CHART_WORKERS,
+                                          mp_context=multiprocessing.get_context("spawn"))
+    return _chart_pool
+
+async def _render(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(chart_pool(), fn, *args)
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Resume Trading"""
     if str(update.effective_chat.id) != config.TELEGRAM_CHAT_ID: return
     
-    db.set_config("is_paused", "false")
+    await _io(db.set_config, "is_paused", "false")
     await update.message.reply_text("▶️ Trading Resumed.")
 
 async def stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Pause Trading"""
     if str(update.effective_chat.id) != config.TELEGRAM_CHAT_ID: return
     
-    db.set_config("is_paused", "true")
+    await _io(db.set_config, "is_paused", "true")
     await update.message.reply_text("⏸️ Trading Paused (Finish active trades only).")
 
+def ai_circuit_line(raw):
+    """AI dependency health as published by the engine (bot_configs 'ai_circuit')."""
+    if not raw:
+        return "AI: ❔ (no data yet)\n"
+    try:
+        circuit = json.loads(raw)
+    except ValueError:
+        return "AI: ❔ (unreadable state)\n"
+    emoji = {"CLOSED": "🟢", "HALF_OPEN": "🟡", "OPEN": "⛔"}.get(circuit.get('state'), "❔")
+    line = f"AI: {emoji} {circuit.get('state')}"
+    if circuit.get('samples'):
+        line += f" | Err: {circuit.get('error_rate', 0):.0%} | p95: {circuit.get('p95', 0):.1f}s"
+    if circuit.get('state') != "CLOSED" and circuit.get('reason'):
+        since = circuit.get('since')
+        ago = f" ({int(time.time() - since)}s ago)" if since else ""
+        line += f"\n   Reason: {circuit['reason']}{ago}"
+    return line + "\n"
+
+def mid_price(orderbook):
+    """Mid of best bid/ask, 0 when the book is missing or empty."""
+    if not orderbook:
+        return 0
+    # Robust Parsing (Handle both nested 'data' and flat structures)
+    if 'data' in orderbook and 'asks' in orderbook['data'] and 'bids' in orderbook['data']:
+        asks = orderbook['data']['asks']
+        bids = orderbook['data']['bids']
+    elif 'asks' in orderbook and 'bids' in orderbook:
+        asks = orderbook['asks']
+        bids = orderbook['bids']
+    else:
+        return 0
+    if asks and bids:
+        return (float(asks[0]['price']) + float(bids[0]['price'])) / 2
+    return 0
+
+def format_position(symbol, mark_price, details):
+    entry, highest, action, ts = details
+
+    if entry and entry > 0 and mark_price > 0:
+        # PnL Calculation
+        if action == 'BUY': # LONG
+            pnl_pct = (mark_price - entry) / entry * 100
+            max_pnl_pct = (highest - entry) / entry * 100
+            # Targets
+            tp_price = entry * (1 + config.TP_PERCENT)
+        else: # SHORT
+            pnl_pct = (entry - mark_price) / entry * 100
+            # For Short, 'highest' in DB tracks the lowest price seen (logic in execution.py)
+            max_pnl_pct = (entry - highest) / entry * 100 if highest > 0 else 0
+            tp_price = entry * (1 - config.TP_PERCENT)
+
+        # Emoji Selection
+        pnl_emoji = "🟢" if pnl_pct >= 0 else "🔴"
+
+        return (f"\n📊 **{action}** `{symbol}`\n"
+                f"   Entry: `{entry}` | Mark: `{mark_price:.4f}`\n"
+                f"   {pnl_emoji} CurPnL: `{pnl_pct:.2f}%` | 🚀 MaxPnL: `{max_pnl_pct:.2f}%`\n"
+                f"   🎯 TP: `{tp_price:.4f}`\n")
+    return f"\n⚠️ `{symbol}`: Data Unavailable (Entry={entry}, Mark={mark_price})\n"
+
+async def position_line(symbol):
+    """Orderbook and trade details for one symbol, fetched concurrently."""
+    orderbook, details = await asyncio.gather(
+        _io(md.get_orderbook, symbol), _io(db.get_active_trade_details, symbol))
+    return format_position(symbol, mid_price(orderbook), details)
+
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Check Status with Detailed Position Info"""
     if str(update.effective_chat.id) != config.TELEGRAM_CHAT_ID: return
-    
-    is_paused = db.get_config("is_paused", "false")
-    pos_size_str = db.get_config("position_size", "30.0")
+
+    is_paused, pos_size_str, circuit, open_symbols = await asyncio.gather(
+        _io(db.get_config, "is_paused", "false"),
+        _io(db.get_config, "position_size", "30.0"),
+        _io(db.get_config, "ai_circuit"),
+        _io(db.get_all_open_symbols))
     status_emoji = "⏸️" if is_paused == "true" else "▶️"
-    
+
     msg = f"🤖 **Bot Status**\n"
     msg += f"State: {status_emoji} (Paused={is_paused})\n"
     msg += f"Size: {pos_size_str} USDC\n"
+    msg += ai_circuit_line(circuit)
 
-    # Fetch Active Positions from DB
-    open_symbols = db.get_all_open_symbols()
-    
     if not open_symbols:
         msg += "Active Positions: None (Idle)"
     else:
         msg += f"Active Positions: {len(open_symbols)}\n"
-        for symbol in open_symbols:
-            # 1. Get Live Market Data
-            orderbook = md.get_orderbook(symbol)
-            mark_price = 0
-            
-            # Robust Parsing (Handle both nested 'data' and flat structures)
-            if orderbook:
-                if 'data' in orderbook and 'asks' in orderbook['data'] and 'bids' in orderbook['data']:
-                    asks = orderbook['data']['asks']
-                    bids = orderbook['data']['bids']
-                elif 'asks' in orderbook and 'bids' in orderbook:
-                     asks = orderbook['asks']
-                     bids = orderbook['bids']
-                else:
-                    asks = []
-                    bids = []
-
-                if asks and bids and len(asks) > 0 and len(bids) > 0:
-                    best_ask = float(asks[0]['price'])
-                    best_bid = float(bids[0]['price'])
-                    mark_price = (best_ask + best_bid) / 2
-            
-            # 2. Get Trade Details from DB
-            entry, highest, action, ts = db.get_active_trade_details(symbol)
-            
-            # 3. Calculate Metrics
-            if entry > 0 and mark_price > 0:
-                # PnL Calculation
-                pnl_pct = 0
-                max_pnl_pct = 0
-                
-                if action == 'BUY': # LONG
-                    pnl_pct = (mark_price - entry) / entry * 100
-                    max_pnl_pct = (highest - entry) / entry * 100
-                    # Targets
-                    tp_price = entry * (1 + config.TP_PERCENT)
-                else: # SHORT
-                    pnl_pct = (entry - mark_price) / entry * 100
-                     # For Short, 'highest' in DB tracks the lowest price seen (logic in execution.py)
-                    max_pnl_pct = (entry - highest) / entry * 100 if highest > 0 else 0
-                    tp_price = entry * (1 - config.TP_PERCENT)
-
-                # Emoji Selection
-                pnl_emoji = "🟢" if pnl_pct >= 0 else "🔴"
-                
-                msg += f"\n📊 **{action}** `{symbol}`\n"
-                msg += f"   Entry: `{entry}` | Mark: `{mark_price:.4f}`\n"
-                msg += f"   {pnl_emoji} CurPnL: `{pnl_pct:.2f}%` | 🚀 MaxPnL: `{max_pnl_pct:.2f}%`\n"
-                msg += f"   🎯 TP: `{tp_price:.4f}`\n"
-            else:
-                msg += f"\n⚠️ `{symbol}`: Data Unavailable (Entry={entry}, Mark={mark_price})\n"
+        # All positions in parallel: one orderbook round-trip instead of one per symbol
+        msg += "".join(await asyncio.gather(*(position_line(symbol) for symbol in open_symbols)))
 
     await update.message.reply_text(msg, parse_mode="Markdown")
 
@@ -115,7 +160,7 @@ async def set_size(update: Update, context: ContextTypes.DEFAULT_TYPE):
              await update.message.reply_text("⚠️ Size must be between 10 and 1000.")
              return
              
-        db.set_config("position_size", str(new_size))
+        await _io(db.set_config, "position_size", str(new_size))
         await update.message.reply_text(f"✅ Position Size updated to {new_size} USDC.")
     except (IndexError, ValueError):
         await update.message.reply_text("Usage: /set_size <amount>")
@@ -131,7 +176,7 @@ async def close_position(update: Update, context: ContextTypes.DEFAULT_TYPE):
              # Auto-fix PERP suffix if missing (optional but handy)
              symbol += "_USDC" 
 
-        db.add_command("CLOSE_POSITION", {"symbol": symbol})
+        await _io(db.add_command, "CLOSE_POSITION", {"symbol": symbol})
         await update.message.reply_text(f"⚠️ Close command queued for {symbol}. Will execute on next tick.")
     except (IndexError, ValueError):
         await update.message.reply_text("Usage: /close <symbol> (e.g. PERP_BTC_USDC or just PERP_BTC)")
@@ -140,7 +185,7 @@ async def signals_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """View Recent Signals"""
     if str(update.effective_chat.id) != config.TELEGRAM_CHAT_ID: return
     
-    rows = db.get_recent_signals(limit=5)
+    rows = await _io(db.get_recent_signals, limit=5)
     if not rows:
         await update.message.reply_text("📭 No recent signals found.")
         return
@@ -157,48 +202,34 @@ async def pnl_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Generate PnL Chart"""
     if str(update.effective_chat.id) != config.TELEGRAM_CHAT_ID: return
     
-    rows = db.get_pnl_history(limit=50)
-    if not rows:
+    # Only trades closed since the last call are read
+    await _io(pnl.refresh)
+    if not len(pnl):
         await update.message.reply_text("📭 No PnL history to plot.")
         return
 
-    # Data Prep
-    times = [r[0] for r in rows]
-    pnls = [r[1] for r in rows]
-    cumulative = []
-    total = 0
-    for p in pnls:
-        total += p
-        cumulative.append(total)
-
-    # Plotting
-    plt.figure(figsize=(10, 5))
-    plt.plot(times, cumulative, marker='o', linestyle='-', color='g')
-    plt.title(f"Cumulative PnL (Last {len(rows)} Trades)")
-    plt.xlabel("Time")
-    plt.ylabel("USDC")
-    plt.grid(True)
-    
-    # Save to Buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    plt.close()
+    png = pnl.cached_png()
+    if png is None:
+        # Plotting happens in the chart process, the bot keeps answering meanwhile
+        version = pnl.version
+        times, cumulative = pnl.series()
+        png = await _render(charts.render_pnl_chart, times, cumulative)
+        pnl.store_png(version, png)
 
-    await update.message.reply_photo(photo=buf, caption=f"💰 Total PnL: {total:.2f} USDC")
+    await update.message.reply_photo(photo=png, caption=f"💰 Total PnL: {pnl.total:.2f} USDC")
 
 async def audit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Force AI Audit of Positions"""
     if str(update.effective_chat.id) != config.TELEGRAM_CHAT_ID: return
     
-    db.add_command("FORCE_ANALYZE", {})
+    await _io(db.add_command, "FORCE_ANALYZE", {})
     await update.message.reply_text("🔍 **Manual Audit Requested**\nAI will review all positions on next tick.")
 
 async def close_all_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Panic Button: Close All & Pause"""
     if str(update.effective_chat.id) != config.TELEGRAM_CHAT_ID: return
     
-    db.add_command("CLOSE_ALL", {})
+    await _io(db.add_command, "CLOSE_ALL", {})
     await update.message.reply_text("⚠️ **PANIC INITIATED**\nQueueing CLOSE ALL and PAUSING bot...")
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -233,7 +264,16 @@ def run_tg_bot():
         print("❌ TELEGRAM_BOT_TOKEN not set!")
         return
 
-    application = ApplicationBuilder().token(config.TELEGRAM_BOT_TOKEN).build()
+    global db, md, pnl
+    # Small pool of its own: a burst of commands waits for these few connections
+    # instead of taking connections the trading process needs from the server
+    db = DatabaseHandler(maxconn=config.TG_DB_POOL_MAX)
+    md = MarketData()
+    pnl = PnLSeries(db)
+    chart_pool().submit(charts.warm) # Load matplotlib in the background before the first /pnl
+
+    # Handlers run concurrently, so a slow /status or /pnl never holds up other commands
+    application = ApplicationBuilder().token(config.TELEGRAM_BOT_TOKEN).concurrent_updates(True).build()
     
     application.add_handler(CommandHandler('start', start))
     application.add_handler(CommandHandler('stop', stop))
@@ -252,7 +292,12 @@ def run_tg_bot():
     application.add_handler(CommandHandler('help', help_command))
     
     print("🤖 Telegram Bot Listening...")
-    application.run_polling()
+    try:
+        application.run_polling()
+    finally:
+        _io_pool.shutdown(wait=False)
+        chart_pool().shutdown(wait=True)
+        db.close()
 
 if __name__ == '__main__':
     run_tg_bot()